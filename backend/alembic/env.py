@@ -17,6 +17,9 @@ from app.models import (
     file_blob,
     file_version,
     upload_session,
+    upload_part,
+    user_storage_usage,
+    job_cursor,
 )  # noqa: F401
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,48 @@
+"""add multipart upload mode and upload parts manifest
+
+Revision ID: 20260301_0007
+Revises: 20260216_0006
+Create Date: 2026-03-01 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "20260301_0007"
+down_revision: Union[str, None] = "20260216_0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "upload_sessions",
+        sa.Column("upload_mode", sa.String(length=16), nullable=False, server_default="stream"),
+    )
+    op.add_column("upload_sessions", sa.Column("total_size_bytes", sa.BigInteger(), nullable=True))
+    op.add_column("upload_sessions", sa.Column("part_size_bytes", sa.Integer(), nullable=True))
+
+    op.create_table(
+        "upload_parts",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("upload_id", sa.String(length=64), nullable=False),
+        sa.Column("part_number", sa.Integer(), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("etag", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+        sa.ForeignKeyConstraint(["upload_id"], ["upload_sessions.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("upload_id", "part_number", name="uq_upload_parts_upload_part"),
+    )
+    op.create_index(op.f("ix_upload_parts_upload_id"), "upload_parts", ["upload_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_upload_parts_upload_id"), table_name="upload_parts")
+    op.drop_table("upload_parts")
+    op.drop_column("upload_sessions", "part_size_bytes")
+    op.drop_column("upload_sessions", "total_size_bytes")
+    op.drop_column("upload_sessions", "upload_mode")
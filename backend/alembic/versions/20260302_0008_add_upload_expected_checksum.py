@@ -0,0 +1,27 @@
+"""add client-declared checksum to upload sessions
+
+Revision ID: 20260302_0008
+Revises: 20260301_0007
+Create Date: 2026-03-02 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "20260302_0008"
+down_revision: Union[str, None] = "20260301_0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("upload_sessions", sa.Column("expected_sha256", sa.String(length=64), nullable=True))
+    op.add_column("upload_sessions", sa.Column("expected_size_bytes", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("upload_sessions", "expected_size_bytes")
+    op.drop_column("upload_sessions", "expected_sha256")
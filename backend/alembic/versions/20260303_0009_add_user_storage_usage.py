@@ -0,0 +1,47 @@
+"""add per-user storage usage counters and upload reservations
+
+Revision ID: 20260303_0009
+Revises: 20260302_0008
+Create Date: 2026-03-03 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "20260303_0009"
+down_revision: Union[str, None] = "20260302_0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_storage_usage",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("used_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("reserved_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.execute(
+        """
+        INSERT INTO user_storage_usage (user_id, used_bytes, reserved_bytes)
+        SELECT software_packages.owner_id, COALESCE(SUM(file_versions.size_bytes), 0), 0
+        FROM file_versions
+        JOIN software_packages ON software_packages.id = file_versions.package_id
+        GROUP BY software_packages.owner_id
+        """
+    )
+    op.add_column(
+        "upload_sessions",
+        sa.Column("reserved_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("upload_sessions", "reserved_bytes")
+    op.drop_table("user_storage_usage")
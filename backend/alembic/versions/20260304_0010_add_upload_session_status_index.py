@@ -0,0 +1,28 @@
+"""index upload sessions by status and last activity for the upload reaper
+
+Revision ID: 20260304_0010
+Revises: 20260303_0009
+Create Date: 2026-03-04 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "20260304_0010"
+down_revision: Union[str, None] = "20260303_0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_upload_sessions_status_updated_at",
+        "upload_sessions",
+        ["status", "updated_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_upload_sessions_status_updated_at", table_name="upload_sessions")
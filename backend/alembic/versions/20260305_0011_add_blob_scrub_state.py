@@ -0,0 +1,37 @@
+"""track blob verification and quarantine, and persist background job cursors
+
+Revision ID: 20260305_0011
+Revises: 20260304_0010
+Create Date: 2026-03-05 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "20260305_0011"
+down_revision: Union[str, None] = "20260304_0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("file_blobs", sa.Column("last_verified_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("file_blobs", sa.Column("quarantined_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("file_blobs", sa.Column("quarantine_reason", sa.String(length=255), nullable=True))
+    op.create_table(
+        "job_cursors",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("position", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("job_cursors")
+    op.drop_column("file_blobs", "quarantine_reason")
+    op.drop_column("file_blobs", "quarantined_at")
+    op.drop_column("file_blobs", "last_verified_at")
@@ -0,0 +1,27 @@
+"""persist the upload hash midstate at progress milestones
+
+Revision ID: 20260306_0012
+Revises: 20260305_0011
+Create Date: 2026-03-06 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "20260306_0012"
+down_revision: Union[str, None] = "20260305_0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("upload_sessions", sa.Column("hash_state", sa.LargeBinary(), nullable=True))
+    op.add_column("upload_sessions", sa.Column("hash_state_offset", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("upload_sessions", "hash_state_offset")
+    op.drop_column("upload_sessions", "hash_state")
@@ -0,0 +1,32 @@
+"""track in-flight writers and rewrites of multipart upload parts
+
+Revision ID: 20260307_0013
+Revises: 20260306_0012
+Create Date: 2026-03-07 00:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "20260307_0013"
+down_revision: Union[str, None] = "20260306_0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("upload_parts", sa.Column("writer_token", sa.String(length=32), nullable=True))
+    op.add_column("upload_parts", sa.Column("revision", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column(
+        "upload_parts",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("upload_parts", "updated_at")
+    op.drop_column("upload_parts", "revision")
+    op.drop_column("upload_parts", "writer_token")
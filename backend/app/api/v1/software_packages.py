@@ -1,20 +1,28 @@
 from __future__ import annotations
 
 import logging
+import secrets
 import time
-from pathlib import Path
+from dataclasses import asdict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from typing import AsyncIterator
 
-from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Request, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, Header, HTTPException, Query, Request, UploadFile
 from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.security import admin_access, get_current_user
-from app.core.unit_of_work import UnitOfWork
-from app.database.db_setup import get_db
-from app.infrastructure.storage.local_fs import LocalFileSystemStorage
-from app.infrastructure.storage.object_storage import ObjectStorageBackend
+from app.core.unit_of_work import AsyncUnitOfWork, UnitOfWork
+from app.database.db_setup import get_async_db, get_db
+from app.infrastructure.download_shaper import download_shaper, shape_stream
+from app.infrastructure.file_response import RangeFileResponse
+from app.infrastructure.storage.base import StorageBackend
+from app.infrastructure.storage.factory import build_storage_backend
+from app.infrastructure.transfer_admission import LeasedStreamingResponse, transfer_admission
 from app.schemas.software_package import (
     SoftwarePackageAdminItemRead,
     SoftwarePackageAdminSummaryRead,
@@ -22,58 +30,190 @@ from app.schemas.software_package import (
     SoftwarePackageRead,
     UploadAppendResponse,
     UploadCompleteResponse,
+    UploadPartResponse,
     UploadSessionInitRequest,
     UploadSessionInitResponse,
 )
-from app.services.software_package_service import SoftwarePackageService
+from app.services.blob_gc import collect_blob_garbage, delete_released_objects
+from app.services.software_package_service import DownloadTicket, SoftwarePackageService
+from app.services.storage_scrubber import storage_scrubber_metrics
+from app.services.upload_reaper import upload_reaper_metrics
 
 router = APIRouter(prefix="/api/v1/software-packages", tags=["Software Packages"])
 
 
-def _build_storage_backend():
-    if settings.PACKAGE_STORAGE_BACKEND == "local":
-        return LocalFileSystemStorage(Path(settings.UPLOAD_ROOT) / "software_packages")
-    if settings.PACKAGE_STORAGE_BACKEND == "object":
-        return ObjectStorageBackend()
-    raise RuntimeError(f"Unsupported PACKAGE_STORAGE_BACKEND: {settings.PACKAGE_STORAGE_BACKEND}")
-
-
-def get_service(db: Session = Depends(get_db)) -> SoftwarePackageService:
+def get_service(
+    db: Session = Depends(get_db),
+    async_db: AsyncSession = Depends(get_async_db),
+) -> SoftwarePackageService:
     return SoftwarePackageService(
         uow=UnitOfWork(session=db),
-        storage=_build_storage_backend(),
+        async_uow=AsyncUnitOfWork(session=async_db),
+        storage=build_storage_backend(),
     )
 
 
-def _parse_range(range_header: str | None, total_size: int) -> tuple[int, int] | None:
+def _parse_ranges(range_header: str | None, total_size: int) -> list[tuple[int, int]] | None:
+    """
+    Parse an RFC 7233 bytes Range header into sorted, coalesced (start, end) pairs.
+    Unsatisfiable specs are dropped; the header fails only if none remain.
+    """
     if not range_header:
         return None
-    if not range_header.startswith("bytes="):
-        raise ValueError("Invalid Range header")
-    raw = range_header.removeprefix("bytes=").strip()
-    if "," in raw:
-        raise ValueError("Multiple byte ranges are not supported")
-    start_s, sep, end_s = raw.partition("-")
-    if sep != "-":
+    unit, sep, raw = range_header.partition("=")
+    if sep != "=" or unit.strip().lower() != "bytes":
         raise ValueError("Invalid Range header")
-    if not start_s and not end_s:
+    specs = [spec.strip() for spec in raw.split(",") if spec.strip()]
+    if not specs:
         raise ValueError("Invalid Range header")
-    try:
+    if len(specs) > settings.PACKAGE_DOWNLOAD_MAX_RANGES:
+        raise ValueError("Too many byte ranges")
+
+    ranges: list[tuple[int, int]] = []
+    for spec in specs:
+        start_s, sep, end_s = (part.strip() for part in spec.partition("-"))
+        if sep != "-" or not (start_s or end_s):
+            raise ValueError("Invalid Range header")
+        if not (start_s or "0").isdigit() or not (end_s or "0").isdigit():
+            raise ValueError("Invalid Range header")
         if start_s:
             start = int(start_s)
             end = int(end_s) if end_s else total_size - 1
+            if end < start:
+                raise ValueError("Invalid Range header")
         else:
-            tail = int(end_s)
-            if tail <= 0:
-                raise ValueError("Invalid Range suffix")
-            start = max(0, total_size - tail)
+            suffix = int(end_s)
+            if suffix == 0:
+                continue
+            start = max(0, total_size - suffix)
             end = total_size - 1
-    except ValueError as exc:
-        raise ValueError("Invalid Range header") from exc
-    if start < 0 or end < start or start >= total_size:
+        if start >= total_size:
+            continue
+        ranges.append((start, min(end, total_size - 1)))
+    if not ranges:
         raise ValueError("Requested range is not satisfiable")
-    end = min(end, total_size - 1)
-    return start, end
+
+    # Overlapping or touching ranges are merged so a client cannot make us send the same bytes twice.
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _entity_tag(checksum_sha256: str) -> str:
+    return f'"{checksum_sha256}"'
+
+
+def _etag_in_list(header_value: str, etag: str) -> bool:
+    """Weak comparison against an If-None-Match list; bare checksums from older clients also match."""
+    if header_value.strip() == "*":
+        return True
+    opaque = etag.strip('"')
+    for candidate in header_value.split(","):
+        candidate = candidate.strip().removeprefix("W/").strip('"')
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive timestamps; they are stored in UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value), usegmt=True)
+
+
+def _parse_http_date(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return _as_utc(parsed)
+
+
+def _is_not_modified(ticket: DownloadTicket, if_none_match: str | None, if_modified_since: str | None) -> bool:
+    # RFC 7232 section 6: If-Modified-Since is only consulted when If-None-Match is absent.
+    if if_none_match is not None:
+        return _etag_in_list(if_none_match, _entity_tag(ticket.checksum_sha256))
+    since = _parse_http_date(if_modified_since)
+    if since is None:
+        return False
+    return int(_as_utc(ticket.last_modified).timestamp()) <= int(since.timestamp())
+
+
+def _if_range_matches(ticket: DownloadTicket, if_range: str | None) -> bool:
+    """If-Range needs a strong match: the exact entity tag, or exactly the Last-Modified date."""
+    if if_range is None:
+        return True
+    value = if_range.strip()
+    if value.startswith("W/"):
+        return False
+    if value.startswith('"'):
+        return value == _entity_tag(ticket.checksum_sha256)
+    return value == _http_date(ticket.last_modified)
+
+
+def _validator_headers(ticket: DownloadTicket) -> dict[str, str]:
+    return {
+        "ETag": _entity_tag(ticket.checksum_sha256),
+        "Last-Modified": _http_date(ticket.last_modified),
+    }
+
+
+def _byteranges_delimiters(
+    ranges: list[tuple[int, int]],
+    *,
+    total_size: int,
+    media_type: str,
+    boundary: str,
+) -> tuple[list[bytes], bytes]:
+    """Per-part headers and the closing delimiter of a multipart/byteranges body."""
+    prefixes = []
+    for index, (start, end) in enumerate(ranges):
+        separator = "" if index == 0 else "\r\n"
+        prefixes.append(
+            (
+                f"{separator}--{boundary}\r\n"
+                f"Content-Type: {media_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{total_size}\r\n\r\n"
+            ).encode("latin-1")
+        )
+    return prefixes, f"\r\n--{boundary}--\r\n".encode("latin-1")
+
+
+async def _stream_byteranges(
+    storage: StorageBackend,
+    storage_key: str,
+    ranges: list[tuple[int, int]],
+    prefixes: list[bytes],
+    closing: bytes,
+) -> AsyncIterator[bytes]:
+    for (start, end), prefix in zip(ranges, prefixes):
+        yield prefix
+        async for chunk in storage.stream_object(
+            storage_key,
+            start=start,
+            end=end,
+            chunk_size=settings.PACKAGE_UPLOAD_CHUNK_SIZE_BYTES,
+        ):
+            yield chunk
+    yield closing
+
+
+def _declared_body_size(request: Request) -> int:
+    try:
+        return max(0, int(request.headers.get("content-length", "0")))
+    except ValueError:
+        return 0
 
 
 async def _upload_file_chunk_stream(upload_file: UploadFile) -> AsyncIterator[bytes]:
@@ -98,18 +238,20 @@ async def upload_package(
 ):
     started = time.perf_counter()
     resolved_version = (version or "").strip() or "v1.0.0"
-    upload_id, version_id = await service.upload_single_request(
-        user_id=int(current_user["user_id"]),
-        package_name=name,
-        package_description=description,
-        package_category=category,
-        package_language=language,
-        package_version=resolved_version,
-        is_public=is_public,
-        file_name=file.filename or "package.bin",
-        content_type=file.content_type,
-        chunk_stream=_upload_file_chunk_stream(file),
-    )
+    user_id = int(current_user["user_id"])
+    async with transfer_admission.admit(user_id=user_id, kind="upload", nbytes=file.size or 0):
+        upload_id, version_id = await service.upload_single_request(
+            user_id=user_id,
+            package_name=name,
+            package_description=description,
+            package_category=category,
+            package_language=language,
+            package_version=resolved_version,
+            is_public=is_public,
+            file_name=file.filename or "package.bin",
+            content_type=file.content_type,
+            chunk_stream=_upload_file_chunk_stream(file),
+        )
     elapsed_ms = int((time.perf_counter() - started) * 1000)
     logging.info(
         "[software_package_upload] user_id=%s version_id=%s elapsed_ms=%s",
@@ -126,7 +268,7 @@ async def init_upload_session(
     service: SoftwarePackageService = Depends(get_service),
     current_user: dict = Depends(get_current_user),
 ):
-    initialized = service.init_upload_session(
+    initialized = await service.init_upload_session(
         user_id=int(current_user["user_id"]),
         package_name=payload.package_name,
         package_description=payload.package_description,
@@ -137,12 +279,22 @@ async def init_upload_session(
         file_name=payload.file_name,
         content_type=payload.content_type,
         max_size_bytes=payload.max_size_bytes,
+        upload_mode=payload.upload_mode,
+        total_size_bytes=payload.total_size_bytes,
+        expected_sha256=payload.expected_sha256,
+        expected_size_bytes=payload.expected_size_bytes,
     )
-    await service.storage.init_upload(initialized.upload_id)
+    if initialized.status != "COMPLETED":
+        await service.start_upload(initialized)
     return UploadSessionInitResponse(
         upload_id=initialized.upload_id,
         offset=initialized.offset,
         max_size_bytes=initialized.max_size_bytes,
+        upload_mode=initialized.upload_mode,
+        part_size_bytes=initialized.part_size_bytes,
+        part_count=initialized.part_count,
+        status=initialized.status,
+        file_version_id=initialized.file_version_id,
     )
 
 
@@ -159,15 +311,50 @@ async def append_upload_session_chunk(
             if chunk:
                 yield chunk
 
-    result = await service.append_upload_stream(
-        upload_id=upload_id,
-        user_id=int(current_user["user_id"]),
-        expected_offset=x_upload_offset,
-        chunk_stream=_body_stream(),
-    )
+    user_id = int(current_user["user_id"])
+    async with transfer_admission.admit(
+        user_id=user_id, kind="upload", nbytes=_declared_body_size(request)
+    ):
+        result = await service.append_upload_stream(
+            upload_id=upload_id,
+            user_id=user_id,
+            expected_offset=x_upload_offset,
+            chunk_stream=_body_stream(),
+        )
     return UploadAppendResponse(upload_id=result.upload_id, offset=result.offset, status=result.status)
 
 
+@router.put("/uploads/{upload_id}/parts/{part_number}", response_model=UploadPartResponse, status_code=200)
+async def upload_session_part(
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    service: SoftwarePackageService = Depends(get_service),
+    current_user: dict = Depends(get_current_user),
+):
+    async def _body_stream() -> AsyncIterator[bytes]:
+        async for chunk in request.stream():
+            if chunk:
+                yield chunk
+
+    user_id = int(current_user["user_id"])
+    async with transfer_admission.admit(
+        user_id=user_id, kind="upload", nbytes=_declared_body_size(request)
+    ):
+        result = await service.upload_part(
+            upload_id=upload_id,
+            user_id=user_id,
+            part_number=part_number,
+            chunk_stream=_body_stream(),
+        )
+    return UploadPartResponse(
+        upload_id=result.upload_id,
+        part_number=result.part_number,
+        size_bytes=result.size_bytes,
+        bytes_received=result.bytes_received,
+    )
+
+
 @router.post("/uploads/{upload_id}/complete", response_model=UploadCompleteResponse, status_code=200)
 async def complete_upload_session(
     upload_id: str,
@@ -191,10 +378,14 @@ async def cancel_upload_session(
 @router.delete("/{package_id}", status_code=204)
 async def delete_software_package(
     package_id: int,
+    background_tasks: BackgroundTasks,
     service: SoftwarePackageService = Depends(get_service),
     current_user: dict = Depends(get_current_user),
 ):
-    await service.delete_package_for_owner(package_id=package_id, user_id=int(current_user["user_id"]))
+    storage_keys = await service.delete_package_for_owner(
+        package_id=package_id, user_id=int(current_user["user_id"])
+    )
+    background_tasks.add_task(delete_released_objects, storage_keys)
     return None
 
 
@@ -236,6 +427,24 @@ def software_package_admin_summary(
     return service.get_admin_summary()
 
 
+@router.get("/admin/storage-metrics", status_code=200)
+def software_package_storage_metrics(_admin: dict = Depends(admin_access)):
+    return {
+        **build_storage_backend().get_metrics(),
+        "upload_reaper": upload_reaper_metrics.snapshot(),
+        "storage_scrubber": storage_scrubber_metrics.snapshot(),
+        "transfer_admission": transfer_admission.get_metrics(),
+    }
+
+
+@router.post("/admin/blob-gc", status_code=200)
+async def software_package_blob_gc(
+    dry_run: bool = Query(True),
+    _admin: dict = Depends(admin_access),
+):
+    return asdict(await collect_blob_garbage(dry_run=dry_run))
+
+
 @router.get("/admin/packages", response_model=list[SoftwarePackageAdminItemRead], status_code=200)
 def software_package_admin_list(
     offset: int = Query(0, ge=0),
@@ -257,49 +466,61 @@ def software_package_admin_list(
 async def download_software_package(
     package_id: int,
     version_id: int,
+    request: Request,
     range_header: str | None = Header(default=None, alias="Range"),
+    if_range: str | None = Header(default=None, alias="If-Range"),
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+    if_modified_since: str | None = Header(default=None, alias="If-Modified-Since"),
     service: SoftwarePackageService = Depends(get_service),
     current_user: dict = Depends(get_current_user),
 ):
     started = time.perf_counter()
-    ticket = service.get_download_ticket(
+    ticket = await service.get_download_ticket(
         user_id=int(current_user["user_id"]),
         package_id=package_id,
         version_id=version_id,
+        with_internal_url=settings.PACKAGE_DOWNLOAD_ACCEL_REDIRECT,
     )
+    if _is_not_modified(ticket, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=_validator_headers(ticket))
+
     size = ticket.file_size_bytes
+    if not _if_range_matches(ticket, if_range):
+        range_header = None
     try:
-        byte_range = _parse_range(range_header, size)
+        byte_ranges = _parse_ranges(range_header, size)
     except ValueError as exc:
-        raise HTTPException(status_code=416, detail=str(exc)) from exc
-    if byte_range is None:
+        raise HTTPException(status_code=416, detail=str(exc), headers={"Content-Range": f"bytes */{size}"}) from exc
+    user_id = int(current_user["user_id"])
+    over_quota, retry_after = await download_shaper.check_daily_quota(user_id)
+    if over_quota:
+        raise HTTPException(
+            status_code=429,
+            detail="Daily download quota exceeded. Please try again later.",
+            headers={"Retry-After": str(retry_after)},
+        )
+    pacer = download_shaper.pacer(
+        user_id=user_id,
+        ip_address=request.client.host if request.client else None,
+    )
+    await service.record_download(version_id=ticket.version_id)
+    headers = {
+        "Accept-Ranges": "bytes",
+        **_validator_headers(ticket),
+    }
+    # Every range is served (and counted), not only the first one.
+    requested_bytes = sum(end - start + 1 for start, end in byte_ranges) if byte_ranges else size
+    if byte_ranges is None:
         start = 0
         end = size - 1
         status_code = 200
-        headers = {
-            "Accept-Ranges": "bytes",
-            "Content-Length": str(size),
-            "ETag": ticket.checksum_sha256,
-        }
     else:
-        start, end = byte_range
+        start, end = byte_ranges[0]
         status_code = 206
-        content_length = end - start + 1
-        headers = {
-            "Accept-Ranges": "bytes",
-            "Content-Range": f"bytes {start}-{end}/{size}",
-            "Content-Length": str(content_length),
-            "ETag": ticket.checksum_sha256,
-        }
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
 
-    async def _stream():
-        async for chunk in service.storage.stream_object(
-            ticket.storage_key,
-            start=start,
-            end=end,
-            chunk_size=settings.PACKAGE_UPLOAD_CHUNK_SIZE_BYTES,
-        ):
-            yield chunk
+    def _log_download() -> None:
         elapsed_ms = int((time.perf_counter() - started) * 1000)
         logging.info(
             "[software_package_download] user_id=%s package_id=%s version_id=%s elapsed_ms=%s range=%s",
@@ -311,6 +532,104 @@ async def download_software_package(
         )
 
     media_type = ticket.content_type or "application/octet-stream"
-    response = StreamingResponse(_stream(), status_code=status_code, media_type=media_type, headers=headers)
-    response.headers["Content-Disposition"] = f'attachment; filename="{ticket.file_name}"'
+    content_disposition = f'attachment; filename="{ticket.file_name}"'
+    if ticket.internal_url is not None:
+        # nginx serves the bytes (and the Range header) from the internal location; see infra/nginx.
+        _log_download()
+        accel_headers = {
+            "X-Accel-Redirect": ticket.internal_url,
+            "Content-Disposition": content_disposition,
+            "Accept-Ranges": "bytes",
+            **_validator_headers(ticket),
+        }
+        if (rate_limit := download_shaper.connection_rate_limit()) is not None:
+            accel_headers["X-Accel-Limit-Rate"] = str(rate_limit)
+        if pacer is not None:
+            await pacer.charge(requested_bytes)
+        return Response(status_code=200, media_type=media_type, headers=accel_headers)
+    # Held until the body is fully sent; nginx-served downloads above do not occupy the worker.
+    lease = await transfer_admission.acquire(user_id=user_id, kind="download", nbytes=requested_bytes)
+    try:
+        if byte_ranges is not None and len(byte_ranges) > 1:
+            boundary = secrets.token_hex(16)
+            prefixes, closing = _byteranges_delimiters(
+                byte_ranges, total_size=size, media_type=media_type, boundary=boundary
+            )
+            headers.pop("Content-Range")
+            headers["Content-Length"] = str(
+                sum(len(prefix) for prefix in prefixes) + requested_bytes + len(closing)
+            )
+            response = LeasedStreamingResponse(
+                shape_stream(
+                    _stream_byteranges(service.storage, ticket.storage_key, byte_ranges, prefixes, closing), pacer
+                ),
+                lease=lease,
+                status_code=206,
+                media_type=f"multipart/byteranges; boundary={boundary}",
+                headers=headers,
+                background=BackgroundTask(_log_download),
+            )
+        elif (local_path := await service.storage.get_local_path(ticket.storage_key)) is not None:
+            response = RangeFileResponse(
+                local_path,
+                start=start,
+                end=end,
+                status_code=status_code,
+                headers=headers,
+                media_type=media_type,
+                background=BackgroundTask(_log_download),
+                chunk_size=settings.PACKAGE_UPLOAD_CHUNK_SIZE_BYTES,
+                pacer=pacer,
+                lease=lease,
+            )
+        else:
+            response = LeasedStreamingResponse(
+                shape_stream(
+                    service.storage.stream_object(
+                        ticket.storage_key,
+                        start=start,
+                        end=end,
+                        chunk_size=settings.PACKAGE_UPLOAD_CHUNK_SIZE_BYTES,
+                    ),
+                    pacer,
+                ),
+                lease=lease,
+                status_code=status_code,
+                media_type=media_type,
+                headers=headers,
+                background=BackgroundTask(_log_download),
+            )
+        response.headers["Content-Disposition"] = content_disposition
+    except BaseException:
+        # The response owns the lease only once it exists; until then nothing else would release it.
+        lease.release()
+        raise
     return response
+
+
+@router.head("/{package_id}/versions/{version_id}/download", status_code=200)
+async def head_software_package_download(
+    package_id: int,
+    version_id: int,
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+    if_modified_since: str | None = Header(default=None, alias="If-Modified-Since"),
+    service: SoftwarePackageService = Depends(get_service),
+    current_user: dict = Depends(get_current_user),
+):
+    ticket = await service.get_download_ticket(
+        user_id=int(current_user["user_id"]),
+        package_id=package_id,
+        version_id=version_id,
+    )
+    if _is_not_modified(ticket, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=_validator_headers(ticket))
+    return Response(
+        status_code=200,
+        media_type=ticket.content_type or "application/octet-stream",
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(ticket.file_size_bytes),
+            "Content-Disposition": f'attachment; filename="{ticket.file_name}"',
+            **_validator_headers(ticket),
+        },
+    )
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import hmac
+import tempfile
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import AsyncIterator
+
+import anyio
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import Response
+
+from app.api.v1.software_packages import _declared_body_size, get_service
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.infrastructure.checksum import update_hasher
+from app.infrastructure.transfer_admission import transfer_admission
+from app.services.software_package_service import SoftwarePackageService
+
+TUS_VERSION = "1.0.0"
+TUS_EXTENSIONS = "creation,expiration,checksum,concatenation,termination"
+TUS_CHECKSUM_ALGORITHMS = {"sha1": hashlib.sha1, "sha256": hashlib.sha256, "md5": hashlib.md5}
+TUS_CONTENT_TYPE = "application/offset+octet-stream"
+# Not in RFC 7231; the tus checksum extension defines it for a body that does not match Upload-Checksum.
+HTTP_460_CHECKSUM_MISMATCH = 460
+# Checksummed PATCH bodies are spooled before they are appended; this much stays in memory.
+CHECKSUM_SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+
+
+def _require_tus_resumable(tus_resumable: str | None = Header(None, alias="Tus-Resumable")) -> None:
+    if tus_resumable != TUS_VERSION:
+        raise HTTPException(
+            status_code=412,
+            detail="Unsupported tus protocol version",
+            headers={"Tus-Version": TUS_VERSION},
+        )
+
+
+router = APIRouter(prefix="/api/v1/software-packages/tus", tags=["Software Packages"])
+# Every request except OPTIONS (protocol discovery) must name the protocol version it speaks.
+tus_resumable = [Depends(_require_tus_resumable)]
+
+
+def _tus_headers(**extra: str) -> dict[str, str]:
+    return {"Tus-Resumable": TUS_VERSION, **extra}
+
+
+def _upload_expires(updated_at: datetime) -> str:
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    expires_at = updated_at + timedelta(seconds=settings.UPLOAD_SESSION_IDLE_TTL_SECONDS)
+    return format_datetime(expires_at.astimezone(timezone.utc), usegmt=True)
+
+
+def _parse_upload_metadata(raw: str | None) -> dict[str, str]:
+    """Decode `Upload-Metadata`: comma-separated `key base64(value)` pairs, the value being optional."""
+    metadata: dict[str, str] = {}
+    for pair in (raw or "").split(","):
+        key, _, encoded = pair.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(encoded.strip(), validate=True).decode("utf-8")
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail=f"Invalid Upload-Metadata value for {key!r}") from None
+    return metadata
+
+
+def _parse_upload_length(raw: str | None) -> int:
+    if raw is None:
+        raise HTTPException(status_code=400, detail="Upload-Length is required (Upload-Defer-Length is not supported)")
+    if not raw.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid Upload-Length")
+    return int(raw)
+
+
+def _parse_upload_checksum(raw: str) -> tuple[str, bytes]:
+    algorithm, _, encoded = raw.strip().partition(" ")
+    algorithm = algorithm.lower()
+    if algorithm not in TUS_CHECKSUM_ALGORITHMS:
+        raise HTTPException(status_code=400, detail="Unsupported checksum algorithm")
+    try:
+        return algorithm, base64.b64decode(encoded.strip(), validate=True)
+    except binascii.Error:
+        raise HTTPException(status_code=400, detail="Invalid Upload-Checksum") from None
+
+
+def _is_true(value: str | None, default: bool) -> bool:
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+async def _body_stream(request: Request) -> AsyncIterator[bytes]:
+    async for chunk in request.stream():
+        if chunk:
+            yield chunk
+
+
+async def _spool_and_verify(request: Request, *, algorithm: str, digest: bytes, limit: int):
+    """
+    Buffer the request body, spilling to disk past CHECKSUM_SPOOL_MEMORY_BYTES, and check it against
+    Upload-Checksum. Nothing reaches the upload until the whole body is known to be intact, so a
+    corrupted PATCH leaves the offset where it was.
+    """
+    hasher = TUS_CHECKSUM_ALGORITHMS[algorithm]()
+    spool = tempfile.SpooledTemporaryFile(max_size=CHECKSUM_SPOOL_MEMORY_BYTES)
+    pending = bytearray()
+    size = 0
+    try:
+        async for chunk in _body_stream(request):
+            size += len(chunk)
+            if size > limit:
+                raise HTTPException(status_code=413, detail="Chunk exceeds the declared Upload-Length")
+            pending += chunk
+            if len(pending) >= settings.PACKAGE_UPLOAD_CHUNK_SIZE_BYTES:
+                # Hash whole spill blocks so they are large enough to leave the event loop.
+                block = bytes(pending)
+                pending.clear()
+                await update_hasher(hasher, block)
+                await anyio.to_thread.run_sync(spool.write, block)
+        if pending:
+            block = bytes(pending)
+            await update_hasher(hasher, block)
+            await anyio.to_thread.run_sync(spool.write, block)
+        if not hmac.compare_digest(hasher.digest(), digest):
+            raise HTTPException(
+                status_code=HTTP_460_CHECKSUM_MISMATCH,
+                detail="Checksum mismatch",
+                headers=_tus_headers(),
+            )
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+async def _spooled_chunks(spool) -> AsyncIterator[bytes]:
+    try:
+        while True:
+            chunk = await anyio.to_thread.run_sync(spool.read, settings.PACKAGE_UPLOAD_CHUNK_SIZE_BYTES)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+
+def _concat_upload_ids(raw: str) -> list[str]:
+    """`final;<url> <url> ...` -> upload ids, taken from the last path segment of each URL."""
+    urls = raw[len("final;"):].split()
+    upload_ids = [url.rstrip("/").rsplit("/", 1)[-1] for url in urls]
+    if not upload_ids or not all(upload_ids):
+        raise HTTPException(status_code=400, detail="Upload-Concat lists no partial uploads")
+    return upload_ids
+
+
+@router.options("", status_code=204)
+async def tus_options():
+    return Response(
+        status_code=204,
+        headers=_tus_headers(
+            **{
+                "Tus-Version": TUS_VERSION,
+                "Tus-Extension": TUS_EXTENSIONS,
+                "Tus-Max-Size": str(settings.PACKAGE_UPLOAD_MAX_SIZE_BYTES),
+                "Tus-Checksum-Algorithm": ",".join(TUS_CHECKSUM_ALGORITHMS),
+            }
+        ),
+    )
+
+
+@router.post("", status_code=201, dependencies=tus_resumable)
+async def tus_create_upload(
+    request: Request,
+    upload_length: str | None = Header(None, alias="Upload-Length"),
+    upload_metadata: str | None = Header(None, alias="Upload-Metadata"),
+    upload_concat: str | None = Header(None, alias="Upload-Concat"),
+    service: SoftwarePackageService = Depends(get_service),
+    current_user: dict = Depends(get_current_user),
+):
+    user_id = int(current_user["user_id"])
+    if _declared_body_size(request):
+        raise HTTPException(status_code=400, detail="Creation with upload is not supported")
+
+    concat = (upload_concat or "").strip()
+    if concat == "partial":
+        partial = await service.init_partial_upload(user_id=user_id, length=_parse_upload_length(upload_length))
+        await service.start_upload(partial)
+        return Response(
+            status_code=201,
+            headers=_tus_headers(
+                Location=str(request.url_for("tus_upload_resource", upload_id=partial.upload_id)),
+                **{"Upload-Expires": _upload_expires(datetime.now(timezone.utc))},
+            ),
+        )
+
+    metadata = _parse_upload_metadata(upload_metadata)
+    file_name = metadata.get("filename") or metadata.get("name") or "package.bin"
+    package_fields = dict(
+        user_id=user_id,
+        package_name=metadata.get("package_name") or metadata.get("name") or "",
+        package_description=metadata.get("description", ""),
+        package_category=metadata.get("category", ""),
+        package_language=metadata.get("language", ""),
+        package_version=(metadata.get("version") or "").strip() or "v1.0.0",
+        is_public=_is_true(metadata.get("is_public"), default=True),
+        file_name=file_name,
+        content_type=metadata.get("filetype") or metadata.get("content_type"),
+    )
+
+    if concat.startswith("final;"):
+        initialized, version_id = await service.concat_partial_uploads(
+            partial_upload_ids=_concat_upload_ids(concat), **package_fields
+        )
+        return Response(
+            status_code=201,
+            headers=_tus_headers(
+                Location=str(request.url_for("tus_upload_resource", upload_id=initialized.upload_id)),
+                **{"X-File-Version-Id": str(version_id)},
+            ),
+        )
+    if concat:
+        raise HTTPException(status_code=400, detail="Invalid Upload-Concat")
+
+    length = _parse_upload_length(upload_length)
+    expected_sha256 = metadata.get("sha256")
+    initialized = await service.init_upload_session(
+        **package_fields,
+        upload_mode="stream",
+        total_size_bytes=length,
+        expected_sha256=expected_sha256,
+        expected_size_bytes=length if expected_sha256 else None,
+    )
+    headers = _tus_headers(Location=str(request.url_for("tus_upload_resource", upload_id=initialized.upload_id)))
+    if initialized.status == "COMPLETED":
+        # Deduplicated against a blob the user can already read: the upload is done before it starts.
+        headers["X-File-Version-Id"] = str(initialized.file_version_id)
+        return Response(status_code=201, headers=headers)
+    await service.start_upload(initialized)
+    headers["Upload-Expires"] = _upload_expires(datetime.now(timezone.utc))
+    return Response(status_code=201, headers=headers)
+
+
+@router.head("/{upload_id}", name="tus_upload_resource", dependencies=tus_resumable)
+async def tus_upload_offset(
+    upload_id: str,
+    service: SoftwarePackageService = Depends(get_service),
+    current_user: dict = Depends(get_current_user),
+):
+    progress = await service.get_upload_progress(upload_id=upload_id, user_id=int(current_user["user_id"]))
+    if progress.status in {"FAILED", "EXPIRED"}:
+        return Response(status_code=410, headers=_tus_headers())
+    headers = _tus_headers(**{"Upload-Offset": str(progress.offset), "Cache-Control": "no-store"})
+    if progress.length is not None:
+        headers["Upload-Length"] = str(progress.length)
+    if progress.upload_mode == "partial":
+        headers["Upload-Concat"] = "partial"
+    if progress.status != "COMPLETED":
+        headers["Upload-Expires"] = _upload_expires(progress.updated_at)
+    return Response(status_code=200, headers=headers)
+
+
+@router.patch("/{upload_id}", status_code=204, dependencies=tus_resumable)
+async def tus_append(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    content_type: str | None = Header(None, alias="Content-Type"),
+    upload_checksum: str | None = Header(None, alias="Upload-Checksum"),
+    service: SoftwarePackageService = Depends(get_service),
+    current_user: dict = Depends(get_current_user),
+):
+    if (content_type or "").split(";")[0].strip().lower() != TUS_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Content-Type must be {TUS_CONTENT_TYPE}")
+    user_id = int(current_user["user_id"])
+    progress = await service.get_upload_progress(upload_id=upload_id, user_id=user_id)
+    if progress.status in {"FAILED", "EXPIRED"}:
+        return Response(status_code=410, headers=_tus_headers())
+
+    async with transfer_admission.admit(user_id=user_id, kind="upload", nbytes=_declared_body_size(request)):
+        if upload_checksum:
+            algorithm, digest = _parse_upload_checksum(upload_checksum)
+            remaining = (progress.length or settings.PACKAGE_UPLOAD_MAX_SIZE_BYTES) - upload_offset
+            spool = await _spool_and_verify(request, algorithm=algorithm, digest=digest, limit=max(0, remaining))
+            chunk_stream = _spooled_chunks(spool)
+        else:
+            chunk_stream = _body_stream(request)
+        result = await service.append_upload_stream(
+            upload_id=upload_id,
+            user_id=user_id,
+            expected_offset=upload_offset,
+            chunk_stream=chunk_stream,
+        )
+
+    headers = _tus_headers(
+        **{"Upload-Offset": str(result.offset), "Upload-Expires": _upload_expires(datetime.now(timezone.utc))}
+    )
+    if result.offset == progress.length and progress.upload_mode != "partial":
+        version_id = await service.complete_upload(upload_id=upload_id, user_id=user_id)
+        headers["X-File-Version-Id"] = str(version_id)
+        del headers["Upload-Expires"]
+    return Response(status_code=204, headers=headers)
+
+
+@router.delete("/{upload_id}", status_code=204, dependencies=tus_resumable)
+async def tus_terminate(
+    upload_id: str,
+    service: SoftwarePackageService = Depends(get_service),
+    current_user: dict = Depends(get_current_user),
+):
+    await service.cancel_upload(upload_id=upload_id, user_id=int(current_user["user_id"]))
+    return Response(status_code=204, headers=_tus_headers())
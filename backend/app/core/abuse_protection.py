@@ -49,7 +49,10 @@ class AbuseProtection:
         digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
         return f"abuse:{scope}:{digest}"
 
-    def hit_rate_limit(self, *, scope: str, key: str, limit: int, window_seconds: int) -> tuple[bool, int]:
+    def hit_rate_limit(
+        self, *, scope: str, key: str, limit: int, window_seconds: int, cost: int = 1
+    ) -> tuple[bool, int]:
+        """Add `cost` to the fixed-window counter; a cost of 0 only checks whether the limit is already exceeded."""
         if limit <= 0 or window_seconds <= 0:
             return False, 0
         bucket = self._bucket(scope, key)
@@ -57,7 +60,7 @@ class AbuseProtection:
         if redis_client is not None:
             try:
                 with redis_client.pipeline() as pipe:
-                    pipe.incr(bucket)
+                    pipe.incrby(bucket, cost)
                     pipe.ttl(bucket)
                     count, ttl = pipe.execute()
                 count = int(count or 0)
@@ -75,7 +78,7 @@ class AbuseProtection:
             if now >= reset_at:
                 count = 0
                 reset_at = now + window_seconds
-            count += 1
+            count += cost
             self._rate_window[bucket] = (count, reset_at)
             retry_after = max(1, reset_at - now)
         return count > limit, retry_after
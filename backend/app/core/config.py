@@ -18,6 +18,18 @@ def _normalize_smtp_host(value: str) -> str:
     return host
 
 
+def _async_database_url(url: str) -> str:
+    scheme, sep, rest = (url or "").partition("://")
+    if not sep:
+        return url
+    dialect = scheme.split("+", 1)[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if dialect in {"postgresql", "postgres"}:
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+
 def _resolve_path(value: str, fallback: str) -> str:
     raw = (value or "").strip() or fallback
     path = Path(raw)
@@ -35,6 +47,7 @@ class AppSettings(BaseSettings):
 
     # Core
     DATABASE_URL: str = "sqlite:///tech_pulse.db"
+    ASYNC_DATABASE_URL: str = ""
     SECRET_KEY: str = "dev_secret_key_change_me_1234567890abcdef"
     DB_POOL_SIZE: int = 10
     DB_MAX_OVERFLOW: int = 20
@@ -77,7 +90,83 @@ class AppSettings(BaseSettings):
     PACKAGE_STORAGE_BACKEND: str = "local"
     PACKAGE_UPLOAD_MAX_SIZE_BYTES: int = 5 * 1024 * 1024 * 1024
     PACKAGE_UPLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024
+    PACKAGE_UPLOAD_WRITE_BUFFER_BYTES: int = 8 * 1024 * 1024
+    # Chunks at least this large are hashed off the event loop (0 hashes everything inline)
+    PACKAGE_HASH_OFFLOAD_MIN_BYTES: int = 256 * 1024
+    PACKAGE_HASH_WORKER_THREADS: int = 4
+    # Stream upload progress lives in Redis and reaches upload_sessions at these milestones
+    PACKAGE_UPLOAD_PROGRESS_FLUSH_BYTES: int = 64 * 1024 * 1024
+    PACKAGE_UPLOAD_PROGRESS_FLUSH_SECONDS: int = 60
+    PACKAGE_UPLOAD_WRITER_LEASE_SECONDS: int = 30
+    # Worker processes per host (uvicorn and gunicorn read the same variable); above 1, state that
+    # must be shared between workers refuses to fall back to per-process memory
+    WEB_CONCURRENCY: int = 1
+    PACKAGE_MULTIPART_PART_SIZE_BYTES: int = 16 * 1024 * 1024
+    PACKAGE_MULTIPART_MAX_PARTS: int = 10000
     PACKAGE_USER_QUOTA_BYTES: int = 25 * 1024 * 1024 * 1024
+    PACKAGE_DOWNLOAD_MAX_RANGES: int = 16
+    DOWNLOAD_COUNTER_FLUSH_INTERVAL_SECONDS: int = 10
+    PACKAGE_DOWNLOAD_ACCEL_REDIRECT: bool = False
+    PACKAGE_DOWNLOAD_ACCEL_PREFIX: str = "/_protected/packages"
+    PACKAGE_DOWNLOAD_URL_SECRET: str = ""
+    PACKAGE_DOWNLOAD_URL_TTL_SECONDS: int = 60
+    # Download bandwidth shaping (bytes per second, 0 disables a limit). Rates are per host: each of
+    # the WEB_CONCURRENCY workers enforces its share, since the token buckets live in the process
+    PACKAGE_DOWNLOAD_USER_BYTES_PER_SECOND: int = 0
+    PACKAGE_DOWNLOAD_IP_BYTES_PER_SECOND: int = 0
+    PACKAGE_DOWNLOAD_GLOBAL_BYTES_PER_SECOND: int = 0
+    PACKAGE_DOWNLOAD_BURST_SECONDS: float = 10.0
+    PACKAGE_DOWNLOAD_DAILY_QUOTA_BYTES: int = 0
+    # Transfer admission per worker (0 disables a limit); keep the concurrency below anyio's thread limit
+    PACKAGE_TRANSFER_MAX_CONCURRENT: int = 32
+    PACKAGE_TRANSFER_MAX_PER_USER: int = 4
+    PACKAGE_TRANSFER_MAX_BYTES_IN_FLIGHT: int = 16 * 1024 * 1024 * 1024
+    PACKAGE_TRANSFER_MAX_QUEUE: int = 64
+    PACKAGE_TRANSFER_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    DOWNLOAD_METADATA_CACHE_MAX_ENTRIES: int = 4096
+    DOWNLOAD_METADATA_CACHE_TTL_SECONDS: int = 60
+    DOWNLOAD_METADATA_CACHE_REDIS_INVALIDATION: bool = True
+    PACKAGE_S3_BUCKET: str = ""
+    PACKAGE_S3_REGION: str = "us-east-1"
+    PACKAGE_S3_ENDPOINT_URL: str = ""
+    PACKAGE_S3_ACCESS_KEY_ID: str = ""
+    PACKAGE_S3_SECRET_ACCESS_KEY: str = ""
+    PACKAGE_S3_PREFIX: str = ""
+    PACKAGE_S3_PART_SIZE_BYTES: int = 8 * 1024 * 1024
+    PACKAGE_S3_MAX_CONNECTIONS: int = 64
+    PACKAGE_S3_TIMEOUT_SECONDS: float = 60.0
+    PACKAGE_STORAGE_COMPRESSION: bool = False
+    PACKAGE_COMPRESSION_FRAME_BYTES: int = 1024 * 1024
+    PACKAGE_COMPRESSION_LEVEL: int = 6
+    PACKAGE_COMPRESSION_MAX_RATIO: float = 0.9
+    PACKAGE_COMPRESSION_SAMPLE_BYTES: int = 4 * 1024 * 1024
+    PACKAGE_CACHE_ENABLED: bool = False
+    PACKAGE_CACHE_DIR: str = ""
+    PACKAGE_CACHE_MAX_BYTES: int = 20 * 1024 * 1024 * 1024
+    PACKAGE_CACHE_MAX_OBJECT_BYTES: int = 2 * 1024 * 1024 * 1024
+
+    # Upload reaper loop
+    UPLOAD_REAPER_ENABLED: bool = True
+    UPLOAD_REAPER_INTERVAL_SECONDS: int = 600
+    UPLOAD_REAPER_STARTUP_DELAY_SECONDS: int = 60
+    UPLOAD_SESSION_IDLE_TTL_SECONDS: int = 24 * 60 * 60
+    UPLOAD_REAPER_ORPHAN_GRACE_SECONDS: int = 6 * 60 * 60
+    UPLOAD_REAPER_BATCH_SIZE: int = 100
+    UPLOAD_REAPER_MAX_DELETES_PER_RUN: int = 500
+
+    # Blob garbage collection
+    BLOB_GC_GRACE_SECONDS: int = 24 * 60 * 60
+    BLOB_GC_REPORT_SAMPLE_SIZE: int = 100
+
+    # Storage integrity scrubber (0 disables a throttle)
+    STORAGE_SCRUB_ENABLED: bool = False
+    STORAGE_SCRUB_INTERVAL_SECONDS: int = 60 * 60
+    STORAGE_SCRUB_STARTUP_DELAY_SECONDS: int = 300
+    STORAGE_SCRUB_MAX_MB_PER_SECOND: float = 20.0
+    STORAGE_SCRUB_MAX_IOPS: float = 50.0
+    STORAGE_SCRUB_CHUNK_BYTES: int = 1024 * 1024
+    STORAGE_SCRUB_BATCH_SIZE: int = 50
+    STORAGE_SCRUB_REVERIFY_AFTER_SECONDS: int = 7 * 24 * 60 * 60
 
     # Authentication
     ALGORITHM: str = "HS256"
@@ -148,8 +237,10 @@ class AppSettings(BaseSettings):
         self.LOG_DIR = _resolve_path(self.LOG_DIR, "logs")
         self.LOG_FILE_PATH = _resolve_path(self.LOG_FILE_PATH, str(Path(self.LOG_DIR) / "app.log"))
         self.SMTP_HOST = _normalize_smtp_host(self.SMTP_HOST)
+        self.ASYNC_DATABASE_URL = (self.ASYNC_DATABASE_URL or "").strip() or _async_database_url(self.DATABASE_URL)
         self.BACKEND_URL = (self.BACKEND_URL or self.BASE_URL or "http://127.0.0.1:8000").strip()
         self.UPLOAD_ROOT = _resolve_path(self.UPLOAD_ROOT, "storage")
+        self.PACKAGE_CACHE_DIR = _resolve_path(self.PACKAGE_CACHE_DIR, str(Path(self.UPLOAD_ROOT) / "package_cache"))
         self.PACKAGE_STORAGE_BACKEND = (self.PACKAGE_STORAGE_BACKEND or "local").lower()
         self.COOKIE_SAMESITE = (self.COOKIE_SAMESITE or "lax").lower()
         self.COOKIE_DOMAIN = (self.COOKIE_DOMAIN or "").strip() or None
@@ -158,9 +249,23 @@ class AppSettings(BaseSettings):
             or self.EMAIL_VERIFY_SECRET
             or self.SECRET_KEY
         )
-
+        # No fallback to SECRET_KEY: nginx must hold this secret, and it must never get the JWT signing key.
+        self.PACKAGE_DOWNLOAD_URL_SECRET = (self.PACKAGE_DOWNLOAD_URL_SECRET or "").strip()
+
+        if self.PACKAGE_DOWNLOAD_ACCEL_REDIRECT and not self.PACKAGE_DOWNLOAD_URL_SECRET:
+            raise RuntimeError(
+                "PACKAGE_DOWNLOAD_URL_SECRET is required when PACKAGE_DOWNLOAD_ACCEL_REDIRECT is enabled; "
+                "give nginx the same value."
+            )
         if self.PACKAGE_STORAGE_BACKEND not in {"local", "object"}:
             raise RuntimeError("PACKAGE_STORAGE_BACKEND must be 'local' or 'object'.")
+        if self.PACKAGE_STORAGE_BACKEND == "object":
+            if not self.PACKAGE_S3_BUCKET:
+                raise RuntimeError("PACKAGE_S3_BUCKET is required when PACKAGE_STORAGE_BACKEND is 'object'.")
+            if self.PACKAGE_MULTIPART_PART_SIZE_BYTES < 5 * 1024 * 1024:
+                raise RuntimeError("PACKAGE_MULTIPART_PART_SIZE_BYTES must be at least 5 MiB for object storage.")
+        if not 0 <= self.PACKAGE_COMPRESSION_LEVEL <= 9:
+            raise RuntimeError("PACKAGE_COMPRESSION_LEVEL must be between 0 and 9.")
         if self.COOKIE_SAMESITE not in {"lax", "strict", "none"}:
             raise RuntimeError("COOKIE_SAMESITE must be one of: lax, strict, none.")
         return self
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """
+    Token bucket that refills at `rate` tokens per second up to `capacity`.
+    `reserve` always succeeds and may leave the bucket in debt; the returned delay is how long
+    the caller must wait before the reserved tokens would have been available. That keeps
+    requests larger than the capacity (e.g. one big read) working at the configured rate.
+    """
+
+    def __init__(self, *, rate: float, capacity: float | None = None, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        """Take `amount` tokens and return the seconds to wait before using them."""
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        """Take `amount` tokens only if they are available right now."""
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens < amount:
+                return False
+            self._tokens -= amount
+            return True
+
+    async def acquire(self, amount: float = 1) -> None:
+        delay = self.reserve(amount)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class IoThrottle:
+    """Bytes-per-second and operations-per-second budgets for background IO; a zero rate disables that limit."""
+
+    def __init__(self, *, bytes_per_second: float, ops_per_second: float):
+        self._bytes = TokenBucket(rate=bytes_per_second) if bytes_per_second > 0 else None
+        self._ops = TokenBucket(rate=ops_per_second) if ops_per_second > 0 else None
+
+    async def consume(self, *, nbytes: int = 0, ops: int = 1) -> None:
+        delay = 0.0
+        if self._bytes is not None and nbytes:
+            delay = max(delay, self._bytes.reserve(nbytes))
+        if self._ops is not None and ops:
+            delay = max(delay, self._ops.reserve(ops))
+        if delay > 0:
+            await asyncio.sleep(delay)
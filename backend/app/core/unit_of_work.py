@@ -1,6 +1,7 @@
-from contextlib import contextmanager
-from typing import Iterator
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.repositories.user import UserRepo
 from app.repositories.session import SessionRepo
@@ -8,6 +9,7 @@ from app.repositories.chat_message import ChatMessageRepo
 from app.repositories.project import ProjectRepo
 from app.repositories.resource import ResourceRepo
 from app.repositories.software_package import SoftwarePackageRepo
+from app.repositories.software_package_async import AsyncSoftwarePackageRepo
 
 class UnitOfWork:
     """Unit of Work pattern implementation for managing database transactions.
@@ -107,3 +109,55 @@ class UnitOfWork:
         except Exception:
             self.rollback()
             raise
+
+
+class AsyncUnitOfWork:
+    """Async Unit of Work over an AsyncSession for routes that must not block the event loop.
+
+    Mirrors UnitOfWork: repositories are created lazily and the async context manager
+    commits on success and rolls back on error.
+    """
+    def __init__(self, session: AsyncSession):
+        """Initialize the AsyncUnitOfWork with an async database session.
+        Args:
+            session: SQLAlchemy AsyncSession object for database operations.
+        """
+        self.session = session
+        self._software_package_repo = None
+
+    @property
+    def software_package_repo(self) -> AsyncSoftwarePackageRepo:
+        if self._software_package_repo is None:
+            self._software_package_repo = AsyncSoftwarePackageRepo(self.session)
+        return self._software_package_repo
+
+    async def commit(self) -> None:
+        """Commit the current transaction to the database."""
+        await self.session.commit()
+
+    async def rollback(self) -> None:
+        """Rollback the current transaction, undoing all pending changes."""
+        await self.session.rollback()
+
+    async def __aenter__(self):
+        """Enter async context manager - returns self for use in async with statement."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Exit async context manager - commits on success, rolls back on error."""
+        if exc_type:
+            await self.rollback()
+        else:
+            await self.commit()
+
+    @asynccontextmanager
+    async def read_only(self) -> AsyncIterator["AsyncUnitOfWork"]:
+        """Async context manager for read-only operations.
+
+        Avoids unnecessary commits while still rolling back on read-time errors.
+        """
+        try:
+            yield self
+        except Exception:
+            await self.rollback()
+            raise
@@ -1,3 +1,4 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
@@ -8,23 +9,29 @@ if not settings.DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set.")
 
 engine_kwargs = {"pool_pre_ping": True}
+async_engine_kwargs = {"pool_pre_ping": True}
 if settings.DATABASE_URL and settings.DATABASE_URL.startswith("sqlite"):
     engine_kwargs["connect_args"] = {"check_same_thread": False}
 else:
-    engine_kwargs.update(
-        {
-            "pool_size": settings.DB_POOL_SIZE,
-            "max_overflow": settings.DB_MAX_OVERFLOW,
-            "pool_timeout": settings.DB_POOL_TIMEOUT,
-            "pool_recycle": settings.DB_POOL_RECYCLE,
-        }
-    )
+    pool_kwargs = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    engine_kwargs.update(pool_kwargs)
+    async_engine_kwargs.update(pool_kwargs)
 
 
 engine = create_engine(settings.DATABASE_URL, **engine_kwargs)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async stack for async routes, so database round trips never block the event loop.
+# Objects stay usable after commit because async sessions cannot lazy-refresh expired attributes.
+async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, **async_engine_kwargs)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 
 # Get db
 def get_db():
@@ -33,3 +40,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Get async db
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -10,6 +10,9 @@ from app.models import (
     file_blob,
     file_version,
     upload_session,
+    upload_part,
+    user_storage_usage,
+    job_cursor,
 )
 from app.database.db_setup import Base, engine
 from asyncio.log import logger
@@ -33,3 +33,9 @@ class ExternalServiceError(DomainError):
     """Exception raised when an external dependency fails."""
     pass
 
+
+class OverloadedError(DomainError):
+    """Exception raised when the service sheds work because it is at capacity."""
+    def __init__(self, message: str | None = None, *, retry_after: int = 1):
+        super().__init__(message or "Service overloaded")
+        self.retry_after = retry_after
@@ -7,6 +7,7 @@ from app.exceptions.exceptions import (
     DomainError,
     ExternalServiceError,
     NotFoundError,
+    OverloadedError,
     PermissionError,
     ValidationError,
 )
@@ -33,6 +34,14 @@ def register_exception_handlers(app: FastAPI) -> None:
     async def _external_service_handler(_request: Request, exc: ExternalServiceError) -> JSONResponse:
         return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"detail": str(exc)})
 
+    @app.exception_handler(OverloadedError)
+    async def _overloaded_handler(_request: Request, exc: OverloadedError) -> JSONResponse:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": str(exc)},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
     @app.exception_handler(DomainError)
     async def _domain_handler(_request: Request, exc: DomainError) -> JSONResponse:
         return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
@@ -1,16 +1,142 @@
 from __future__ import annotations
 
+import ctypes
 import hashlib
+import logging
+import sys
 from typing import AsyncIterable
 
+import anyio
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_hash_limiter: anyio.CapacityLimiter | None = None
+
+# OpenSSL's SHA256_CTX is a plain struct (h[8], Nl, Nh, data[16], num, md_len of 32-bit words), so
+# its bytes are a midstate. hashlib cannot export its state, hence the direct binding. The words are
+# native-endian and the layout is OpenSSL's to change, so exported states are tagged with both and
+# only restored by a matching build; anything else falls back to a full rehash.
+_SHA256_CTX_BYTES = 112
+_CTX_BUFFER_BYTES = 256
+_STATE_TAG_PREFIX = b"ossl-sha256-v1:"
+_state_tag = b""
+_libcrypto: ctypes.CDLL | None | bool = False
+
+
+def _get_hash_limiter() -> anyio.CapacityLimiter:
+    # Separate from anyio's default limiter so hashing cannot starve file and DB offloads (or vice versa).
+    global _hash_limiter
+    if _hash_limiter is None:
+        _hash_limiter = anyio.CapacityLimiter(max(1, settings.PACKAGE_HASH_WORKER_THREADS))
+    return _hash_limiter
+
+
+async def update_hasher(hasher, chunk: bytes) -> None:
+    """
+    `hasher.update(chunk)` for any hashlib-style hasher; chunks of at least
+    PACKAGE_HASH_OFFLOAD_MIN_BYTES run in the bounded hash thread pool (the digest drops the GIL for
+    large buffers) so the event loop keeps serving other requests.
+    """
+    threshold = settings.PACKAGE_HASH_OFFLOAD_MIN_BYTES
+    if threshold <= 0 or len(chunk) < threshold:
+        hasher.update(chunk)
+        return
+    await anyio.to_thread.run_sync(hasher.update, chunk, limiter=_get_hash_limiter())
+
+
+def _load_libcrypto() -> ctypes.CDLL | None:
+    """libcrypto as linked into CPython's _hashlib, if it exposes SHA256_* and passes a self-test."""
+    global _libcrypto, _state_tag
+    if _libcrypto is not False:
+        return _libcrypto
+    _libcrypto = None
+    try:
+        import _hashlib
+
+        lib = ctypes.CDLL(_hashlib.__file__)
+        for name in ("SHA256_Init", "SHA256_Update", "SHA256_Final"):
+            getattr(lib, name).restype = ctypes.c_int
+        lib.SHA256_Init.argtypes = [ctypes.c_void_p]
+        lib.SHA256_Update.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t]
+        lib.SHA256_Final.argtypes = [ctypes.c_char_p, ctypes.c_void_p]
+        lib.OpenSSL_version.restype = ctypes.c_char_p
+        lib.OpenSSL_version.argtypes = [ctypes.c_int]
+        _state_tag = b"%s%s:%s:" % (_STATE_TAG_PREFIX, lib.OpenSSL_version(0), sys.byteorder.encode())
+        _libcrypto = lib
+        # Resume from an exported midstate that is not block aligned, as a real checkpoint would be.
+        probe = _ResumableSHA256()
+        probe.update(b"x" * 100)
+        resumed = _ResumableSHA256.from_state(probe.state())
+        resumed.update(b"y" * 100)
+        if resumed.hexdigest() != hashlib.sha256(b"x" * 100 + b"y" * 100).hexdigest():
+            raise RuntimeError("SHA256_CTX layout self-test failed")
+    except Exception as exc:
+        logger.info("Resumable SHA-256 unavailable, upload hash checkpoints stay in memory: %s", exc)
+        _libcrypto = None
+    return _libcrypto
+
+
+class _ResumableSHA256:
+    """hashlib-style SHA-256 on OpenSSL's context, whose midstate can be exported and restored."""
+
+    def __init__(self) -> None:
+        self._ctx = ctypes.create_string_buffer(_CTX_BUFFER_BYTES)
+        _libcrypto.SHA256_Init(self._ctx)
+
+    @classmethod
+    def from_state(cls, state: bytes) -> "_ResumableSHA256":
+        hasher = cls.__new__(cls)
+        hasher._ctx = ctypes.create_string_buffer(_CTX_BUFFER_BYTES)
+        ctypes.memmove(hasher._ctx, state, _SHA256_CTX_BYTES)
+        return hasher
+
+    def update(self, data: bytes | bytearray | memoryview) -> None:
+        # Hashed in place: bytes pass their own buffer and writable buffers are wrapped, so only a
+        # read-only view that is not bytes gets copied. ctypes drops the GIL for the call, so
+        # offloaded updates still run in parallel.
+        if not isinstance(data, bytes):
+            view = memoryview(data).cast("B")
+            data = view.tobytes() if view.readonly else (ctypes.c_char * view.nbytes).from_buffer(view)
+        _libcrypto.SHA256_Update(self._ctx, data, len(data))
+
+    def state(self) -> bytes:
+        return self._ctx.raw[:_SHA256_CTX_BYTES]
+
+    def hexdigest(self) -> str:
+        ctx = ctypes.create_string_buffer(self._ctx.raw, _CTX_BUFFER_BYTES)
+        digest = ctypes.create_string_buffer(32)
+        _libcrypto.SHA256_Final(digest, ctx)
+        return digest.raw.hex()
+
 
 class StreamingSHA256:
     """Incremental SHA-256 helper used during chunked uploads."""
 
     def __init__(self):
-        self._hasher = hashlib.sha256()
+        self._hasher = _ResumableSHA256() if _load_libcrypto() is not None else hashlib.sha256()
         self._size_bytes = 0
 
+    def export_state(self) -> bytes | None:
+        """Serialized midstate covering `size_bytes`, or None when this platform cannot export one."""
+        if not isinstance(self._hasher, _ResumableSHA256):
+            return None
+        return _state_tag + self._hasher.state()
+
+    @classmethod
+    def restore(cls, state: bytes | None, size_bytes: int) -> "StreamingSHA256 | None":
+        """Hasher resumed from `export_state`, or None if the state is missing or unusable here."""
+        if not state or _load_libcrypto() is None or not state.startswith(_state_tag):
+            return None
+        raw = state[len(_state_tag):]
+        if len(raw) != _SHA256_CTX_BYTES:
+            return None
+        hasher = cls.__new__(cls)
+        hasher._hasher = _ResumableSHA256.from_state(raw)
+        hasher._size_bytes = size_bytes
+        return hasher
+
     @property
     def size_bytes(self) -> int:
         return self._size_bytes
@@ -21,6 +147,11 @@ class StreamingSHA256:
         self._hasher.update(chunk)
         self._size_bytes += len(chunk)
 
+    async def update_async(self, chunk: bytes) -> None:
+        """Like `update`, offloaded per `update_hasher`. Callers must await each chunk before passing the next."""
+        await update_hasher(self._hasher, chunk)
+        self._size_bytes += len(chunk)
+
     def hexdigest(self) -> str:
         return self._hasher.hexdigest()
 
@@ -28,5 +159,5 @@ class StreamingSHA256:
 async def hash_stream(stream: AsyncIterable[bytes]) -> tuple[str, int]:
     hasher = StreamingSHA256()
     async for chunk in stream:
-        hasher.update(chunk)
+        await hasher.update_async(chunk)
     return hasher.hexdigest(), hasher.size_bytes
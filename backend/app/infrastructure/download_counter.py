@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from app.core.config import settings
+
+try:
+    from redis.asyncio import Redis
+    from redis.exceptions import RedisError
+except Exception:  # pragma: no cover - fallback path if redis package is unavailable
+    Redis = None
+
+    class RedisError(Exception):
+        pass
+
+
+logger = logging.getLogger(__name__)
+
+ApplyCounts = Callable[[dict[int, int]], Awaitable[None]]
+REDIS_RETRY_MIN_SECONDS = 1.0
+REDIS_RETRY_MAX_SECONDS = 60.0
+
+
+class DownloadCounter:
+    """
+    Write-behind download counters.
+    Increments are buffered per version id (in Redis when available, so they survive a worker
+    crash and are shared by all workers) and periodically drained into one set-based UPDATE.
+    Redis drains rename the pending hash first, so increments recorded during a flush land in a
+    fresh hash; a drained hash is deleted only after the database accepted it (at-least-once).
+    While Redis is unreachable increments stay in memory, and the connection is retried with
+    exponential backoff.
+    """
+
+    PENDING_KEY = "downloads:pending"
+    DRAINING_PREFIX = "downloads:draining:"
+    LOCK_KEY = "downloads:drain-lock"
+
+    def __init__(self) -> None:
+        self._redis = None
+        self._retry_at = 0.0
+        self._retry_delay = 0.0
+        self._connect_lock: asyncio.Lock | None = None
+        self._lock = threading.Lock()
+        self._pending: dict[int, int] = {}
+
+    async def _get_redis(self):
+        """The Redis client, or None while it is unreachable and increments stay in memory."""
+        if self._redis is not None or Redis is None or time.monotonic() < self._retry_at:
+            return self._redis
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._redis is None and time.monotonic() >= self._retry_at:
+                await self._connect()
+        return self._redis
+
+    async def _connect(self) -> None:
+        client = Redis.from_url(settings.REDIS_URL, decode_responses=True, socket_connect_timeout=2)
+        try:
+            await client.ping()
+        except Exception as exc:
+            await client.aclose()
+            self._retry_delay = min(REDIS_RETRY_MAX_SECONDS, max(REDIS_RETRY_MIN_SECONDS, self._retry_delay * 2))
+            self._retry_at = time.monotonic() + self._retry_delay
+            logger.warning(
+                "Redis unavailable for download counters, using memory fallback (retrying in %.0fs): %s",
+                self._retry_delay,
+                exc,
+            )
+            return
+        if self._retry_delay:
+            logger.info("Redis reachable again for download counters")
+        self._redis = client
+        self._retry_at = self._retry_delay = 0.0
+
+    async def record(self, version_id: int, count: int = 1) -> None:
+        redis_client = await self._get_redis()
+        if redis_client is not None:
+            try:
+                await redis_client.hincrby(self.PENDING_KEY, str(version_id), count)
+                return
+            except RedisError:
+                pass
+        self._merge({version_id: count})
+
+    def _merge(self, counts: dict[int, int]) -> None:
+        with self._lock:
+            for version_id, count in counts.items():
+                self._pending[version_id] = self._pending.get(version_id, 0) + count
+
+    async def flush(self, apply: ApplyCounts) -> int:
+        """Hand all buffered increments to `apply`; returns how many downloads were flushed."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        flushed = 0
+        if pending:
+            try:
+                await apply(pending)
+            except Exception:
+                self._merge(pending)
+                raise
+            flushed += sum(pending.values())
+
+        redis_client = await self._get_redis()
+        if redis_client is not None:
+            flushed += await self._flush_redis(redis_client, apply)
+        return flushed
+
+    async def _flush_redis(self, redis_client, apply: ApplyCounts) -> int:
+        token = uuid.uuid4().hex
+        lock_ttl = max(30, settings.DOWNLOAD_COUNTER_FLUSH_INTERVAL_SECONDS * 3)
+        try:
+            if not await redis_client.set(self.LOCK_KEY, token, nx=True, ex=lock_ttl):
+                return 0  # another worker is draining
+            # Hashes left behind by a drain that died before deleting them go first.
+            draining = [key async for key in redis_client.scan_iter(match=f"{self.DRAINING_PREFIX}*")]
+            fresh_key = f"{self.DRAINING_PREFIX}{token}"
+            if await redis_client.exists(self.PENDING_KEY):
+                await redis_client.rename(self.PENDING_KEY, fresh_key)
+                draining.append(fresh_key)
+        except RedisError as exc:
+            logger.warning("Download counter drain skipped, Redis error: %s", exc)
+            return 0
+
+        flushed = 0
+        try:
+            for key in draining:
+                fields = await redis_client.hgetall(key)
+                counts = {int(version_id): int(count) for version_id, count in fields.items()}
+                if counts:
+                    await apply(counts)
+                    flushed += sum(counts.values())
+                await redis_client.delete(key)
+        finally:
+            try:
+                if await redis_client.get(self.LOCK_KEY) == token:
+                    await redis_client.delete(self.LOCK_KEY)
+            except RedisError:
+                pass
+        return flushed
+
+download_counter = DownloadCounter()
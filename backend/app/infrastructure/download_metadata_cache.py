@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import anyio
+
+from app.core.config import settings
+
+try:
+    from redis import Redis
+    from redis.exceptions import RedisError
+except Exception:  # pragma: no cover - fallback path if redis package is unavailable
+    Redis = None
+
+    class RedisError(Exception):
+        pass
+
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadMetadataCache:
+    """
+    Bounded LRU + TTL cache of download metadata keyed by (package_id, version_id).
+    Invalidation is per package and bumps a generation counter, so a lookup that started before an
+    invalidation cannot put its stale answer back. With Redis available, invalidations are also
+    published so other workers drop their copies; the TTL bounds staleness if a message is missed.
+    The Redis client is blocking, so it is only used from worker threads and the listener thread.
+    """
+
+    CHANNEL = "cache:download-metadata:invalidate"
+
+    def __init__(self, *, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple[int, int], tuple[float, Any]] = OrderedDict()
+        self._generations: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_checked = False
+        self._redis_lock = threading.Lock()
+        self._listener = None
+        self.hits = 0
+        self.misses = 0
+
+    def _get_redis(self):
+        with self._redis_lock:
+            if self._redis_checked:
+                return self._redis
+            self._redis_checked = True
+            if Redis is None or not settings.DOWNLOAD_METADATA_CACHE_REDIS_INVALIDATION:
+                return None
+            try:
+                self._redis = Redis.from_url(settings.REDIS_URL, decode_responses=True, socket_connect_timeout=2)
+                self._redis.ping()
+            except Exception as exc:
+                logger.warning("Redis unavailable for download metadata invalidation, using local only: %s", exc)
+                self._redis = None
+            return self._redis
+
+    def generation(self, package_id: int) -> int:
+        with self._lock:
+            return self._generations.get(package_id, 0)
+
+    def get(self, package_id: int, version_id: int) -> Any | None:
+        key = (package_id, version_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, package_id: int, version_id: int, value: Any, *, generation: int) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            if self._generations.get(package_id, 0) != generation:
+                return
+            self._entries[(package_id, version_id)] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end((package_id, version_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def invalidate_package(self, package_id: int) -> None:
+        """Drop the package here, then tell the other workers without blocking the event loop."""
+        self._drop_package(package_id)
+        if self._redis_checked and self._redis is None:
+            return
+        await anyio.to_thread.run_sync(self._publish, package_id)
+
+    def _drop_package(self, package_id: int) -> None:
+        with self._lock:
+            self._generations[package_id] = self._generations.get(package_id, 0) + 1
+            for key in [key for key in self._entries if key[0] == package_id]:
+                del self._entries[key]
+
+    def _publish(self, package_id: int) -> None:
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                redis_client.publish(self.CHANNEL, str(package_id))
+            except RedisError as exc:
+                logger.warning("Download metadata invalidation for package %s not broadcast: %s", package_id, exc)
+
+    def _on_message(self, message: dict) -> None:
+        try:
+            self._drop_package(int(message["data"]))
+        except (KeyError, TypeError, ValueError):
+            return
+
+    def start_listener(self) -> None:
+        """Subscribe to invalidations from other workers in a daemon thread."""
+        redis_client = self._get_redis()
+        if redis_client is None or self._listener is not None:
+            return
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.CHANNEL: self._on_message})
+            self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except RedisError as exc:
+            logger.warning("Download metadata invalidation listener not started: %s", exc)
+
+    def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+download_metadata_cache = DownloadMetadataCache(
+    max_entries=settings.DOWNLOAD_METADATA_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.DOWNLOAD_METADATA_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import AsyncIterable, AsyncIterator
+
+import anyio
+
+from app.core.abuse_protection import abuse_protection
+from app.core.config import settings
+from app.core.throttle import TokenBucket
+
+DAILY_QUOTA_SCOPE = "download-bytes"
+DAILY_QUOTA_WINDOW_SECONDS = 24 * 60 * 60
+# Bytes sent are added to the shared daily counter in batches of this size (and when a stream ends).
+QUOTA_FLUSH_BYTES = 8 * 1024 * 1024
+
+
+class DownloadPacer:
+    """
+    Paces one download stream. Bytes are taken from the user's and the client IP's buckets
+    first and only then from the global bucket, so a stream held back by its own limit does not
+    reserve global bandwidth it cannot use yet.
+    """
+
+    def __init__(self, *, own_buckets: list[TokenBucket], global_bucket: TokenBucket | None, quota_key: str | None):
+        self._own_buckets = own_buckets
+        self._global_bucket = global_bucket
+        self._quota_key = quota_key
+        self._unreported = 0
+
+    async def __call__(self, nbytes: int) -> None:
+        delay = max((bucket.reserve(nbytes) for bucket in self._own_buckets), default=0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._global_bucket is not None:
+            await self._global_bucket.acquire(nbytes)
+        if self._quota_key is not None:
+            self._unreported += nbytes
+            if self._unreported >= QUOTA_FLUSH_BYTES:
+                await self.flush()
+
+    async def charge(self, nbytes: int) -> None:
+        """Count bytes served elsewhere (e.g. by nginx) against the daily quota without pacing them."""
+        self._unreported += nbytes
+        await self.flush()
+
+    async def flush(self) -> None:
+        if self._quota_key is None or not self._unreported:
+            return
+        cost, self._unreported = self._unreported, 0
+        await anyio.to_thread.run_sync(
+            lambda: abuse_protection.hit_rate_limit(
+                scope=DAILY_QUOTA_SCOPE,
+                key=self._quota_key,
+                limit=settings.PACKAGE_DOWNLOAD_DAILY_QUOTA_BYTES,
+                window_seconds=DAILY_QUOTA_WINDOW_SECONDS,
+                cost=cost,
+            )
+        )
+
+
+class DownloadShaper:
+    """
+    Token-bucket bandwidth shaping for package downloads.
+    Per-user and per-IP buckets hold `burst_seconds` worth of bytes, so interactive downloads
+    finish at full speed while long-running mirrors settle at their configured rate; the global
+    bucket caps what the host sends in total. Buckets of idle clients are dropped LRU-first,
+    which is harmless because an idle bucket would have refilled anyway.
+
+    Buckets live in the process, so each of the `workers` processes on a host enforces
+    `rate / workers`: the configured rates then hold however a client's requests are spread,
+    at the cost of a single stream never exceeding its worker's share.
+    """
+
+    def __init__(
+        self,
+        *,
+        user_rate: int,
+        ip_rate: int,
+        global_rate: int,
+        burst_seconds: float,
+        max_tracked: int = 10000,
+        workers: int = 1,
+    ) -> None:
+        self.user_rate = user_rate
+        self.ip_rate = ip_rate
+        self.workers = max(1, workers)
+        self.burst_seconds = max(1.0, burst_seconds)
+        self.max_tracked = max_tracked
+        self.global_bucket = TokenBucket(rate=self._share(global_rate)) if global_rate > 0 else None
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _share(self, rate: int) -> int:
+        """This worker's part of a host-wide rate."""
+        return max(1, rate // self.workers)
+
+    def _bucket(self, key: str, rate: int) -> TokenBucket:
+        rate = self._share(rate)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate=rate, capacity=rate * self.burst_seconds)
+                while len(self._buckets) > self.max_tracked:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket
+
+    async def check_daily_quota(self, user_id: int) -> tuple[bool, int]:
+        """Whether the user already used up today's byte quota, and when the window resets."""
+        if settings.PACKAGE_DOWNLOAD_DAILY_QUOTA_BYTES <= 0:
+            return False, 0
+        return await anyio.to_thread.run_sync(
+            lambda: abuse_protection.hit_rate_limit(
+                scope=DAILY_QUOTA_SCOPE,
+                key=str(user_id),
+                limit=settings.PACKAGE_DOWNLOAD_DAILY_QUOTA_BYTES,
+                window_seconds=DAILY_QUOTA_WINDOW_SECONDS,
+                cost=0,
+            )
+        )
+
+    def connection_rate_limit(self) -> int | None:
+        """
+        Per-connection byte rate for nginx (X-Accel-Limit-Rate) when it serves the body. nginx enforces
+        it per connection, whichever worker handed the download over, so it is not split.
+        """
+        rates = [rate for rate in (self.user_rate, self.ip_rate) if rate > 0]
+        return min(rates) if rates else None
+
+    def pacer(self, *, user_id: int, ip_address: str | None) -> DownloadPacer | None:
+        """Pacer for one stream, or None when no limit or quota applies."""
+        own_buckets = []
+        if self.user_rate > 0:
+            own_buckets.append(self._bucket(f"user:{user_id}", self.user_rate))
+        if self.ip_rate > 0 and ip_address:
+            own_buckets.append(self._bucket(f"ip:{ip_address}", self.ip_rate))
+        quota_key = str(user_id) if settings.PACKAGE_DOWNLOAD_DAILY_QUOTA_BYTES > 0 else None
+        if not own_buckets and self.global_bucket is None and quota_key is None:
+            return None
+        return DownloadPacer(own_buckets=own_buckets, global_bucket=self.global_bucket, quota_key=quota_key)
+
+
+async def shape_stream(stream: AsyncIterable[bytes], pacer: DownloadPacer | None) -> AsyncIterator[bytes]:
+    if pacer is None:
+        async for chunk in stream:
+            yield chunk
+        return
+    try:
+        async for chunk in stream:
+            await pacer(len(chunk))
+            yield chunk
+    finally:
+        await pacer.flush()
+
+
+download_shaper = DownloadShaper(
+    user_rate=settings.PACKAGE_DOWNLOAD_USER_BYTES_PER_SECOND,
+    ip_rate=settings.PACKAGE_DOWNLOAD_IP_BYTES_PER_SECOND,
+    global_rate=settings.PACKAGE_DOWNLOAD_GLOBAL_BYTES_PER_SECOND,
+    burst_seconds=settings.PACKAGE_DOWNLOAD_BURST_SECONDS,
+    workers=settings.WEB_CONCURRENCY,
+)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Mapping
+
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+if TYPE_CHECKING:
+    from app.infrastructure.download_shaper import DownloadPacer
+    from app.infrastructure.transfer_admission import TransferLease
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+DEFAULT_READ_CHUNK_BYTES = 1024 * 1024
+
+
+class RangeFileResponse(Response):
+    """
+    Sends one byte range of a local file.
+    Servers advertising the ASGI zero-copy extension get the descriptor and let the kernel
+    sendfile it; otherwise the range is read with pread in worker threads, without seeking
+    or buffering more than one chunk. With a `pacer`, every chunk waits for bandwidth first,
+    so zero-copy is skipped. An admission `lease` is held until the body is sent.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        *,
+        start: int,
+        end: int,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+        media_type: str | None = None,
+        background: BackgroundTask | None = None,
+        chunk_size: int = DEFAULT_READ_CHUNK_BYTES,
+        pacer: DownloadPacer | None = None,
+        lease: TransferLease | None = None,
+    ):
+        self.path = Path(path)
+        self.start = start
+        self.count = max(0, end - start + 1)
+        self.chunk_size = chunk_size
+        self.pacer = pacer
+        self.lease = lease
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = background
+        self.init_headers(headers)
+        self.headers.setdefault("content-length", str(self.count))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self._send_file(scope, send)
+        finally:
+            if self.lease is not None:
+                self.lease.release()
+        if self.background is not None:
+            await self.background()
+
+    async def _send_file(self, scope: Scope, send: Send) -> None:
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if scope["method"].upper() == "HEAD" or self.count == 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            elif self.pacer is None and ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send(
+                    {
+                        "type": ZEROCOPY_EXTENSION,
+                        "file": fd,
+                        "offset": self.start,
+                        "count": self.count,
+                        "more_body": False,
+                    }
+                )
+            else:
+                await self._send_with_pread(fd, send)
+        finally:
+            await anyio.to_thread.run_sync(os.close, fd)
+            if self.pacer is not None:
+                await self.pacer.flush()
+
+    async def _send_with_pread(self, fd: int, send: Send) -> None:
+        position = self.start
+        remaining = self.count
+        while remaining > 0:
+            chunk = await anyio.to_thread.run_sync(os.pread, fd, min(self.chunk_size, remaining), position)
+            if not chunk:
+                raise RuntimeError(f"File {self.path} ended before the requested range was sent")
+            position += len(chunk)
+            remaining -= len(chunk)
+            if self.pacer is not None:
+                await self.pacer(len(chunk))
+            await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
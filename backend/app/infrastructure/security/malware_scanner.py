@@ -4,6 +4,18 @@ from abc import ABC, abstractmethod
 from typing import AsyncIterable
 
 
+class ScanSession(ABC):
+    """Incremental scan fed chunk by chunk while an upload is still being received."""
+
+    @abstractmethod
+    async def feed(self, chunk: bytes) -> None:
+        """Scan the next contiguous chunk of the upload."""
+
+    @abstractmethod
+    async def finish(self) -> None:
+        """Raise on malware detection once every chunk has been fed."""
+
+
 class MalwareScanner(ABC):
     @abstractmethod
     async def scan_stream(
@@ -15,6 +27,18 @@ class MalwareScanner(ABC):
     ) -> None:
         """Raise on malware detection."""
 
+    def open_session(self, *, filename: str, content_type: str | None) -> ScanSession | None:
+        """Return an incremental scan session, or None if only whole-stream scans are supported."""
+        return None
+
+
+class NoOpScanSession(ScanSession):
+    async def feed(self, chunk: bytes) -> None:
+        return
+
+    async def finish(self) -> None:
+        return
+
 
 class NoOpMalwareScanner(MalwareScanner):
     async def scan_stream(
@@ -25,3 +49,6 @@ class NoOpMalwareScanner(MalwareScanner):
         content_type: str | None,
     ) -> None:
         return
+
+    def open_session(self, *, filename: str, content_type: str | None) -> ScanSession | None:
+        return NoOpScanSession()
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from app.core.config import settings
+
+
+def _signature(path: str, expires: int) -> str:
+    message = f"{expires}:{path}".encode("utf-8")
+    return hmac.new(settings.PACKAGE_DOWNLOAD_URL_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def build_internal_download_url(storage_key: str, *, now: float | None = None) -> str:
+    """
+    Short-lived internal URL for nginx X-Accel-Redirect.
+    infra/nginx/njs/download_signature.js recomputes the same HMAC before serving the file.
+    """
+    path = f"{settings.PACKAGE_DOWNLOAD_ACCEL_PREFIX.rstrip('/')}/{storage_key.lstrip('/')}"
+    expires = int(now if now is not None else time.time()) + settings.PACKAGE_DOWNLOAD_URL_TTL_SECONDS
+    return f"{path}?expires={expires}&signature={_signature(path, expires)}"
+
+
+def verify_internal_download_url(url: str, *, now: float | None = None) -> bool:
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    try:
+        expires = int(query["expires"][0])
+        signature = query["signature"][0]
+    except (KeyError, IndexError, ValueError):
+        return False
+    if expires < int(now if now is not None else time.time()):
+        return False
+    return hmac.compare_digest(signature, _signature(parts.path, expires))
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import AsyncIterator
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator
+
+from app.infrastructure.storage.upload_writer import BufferedUploadWriter, UploadWriter
 
 
 class StorageBackend(ABC):
@@ -15,6 +19,13 @@ class StorageBackend(ABC):
     async def append_upload_chunk(self, upload_id: str, chunk: bytes) -> None:
         """Append bytes to an in-progress upload."""
 
+    async def open_upload_writer(self, upload_id: str, *, buffer_size: int) -> UploadWriter:
+        """
+        Open a writer that stays attached to an in-progress upload for a whole request.
+        The default implementation coalesces chunks and flushes them through append_upload_chunk.
+        """
+        return BufferedUploadWriter(self, upload_id, buffer_size=buffer_size)
+
     @abstractmethod
     async def get_upload_size(self, upload_id: str) -> int:
         """Return bytes currently written for an in-progress upload."""
@@ -28,12 +39,44 @@ class StorageBackend(ABC):
         end: int | None = None,
         chunk_size: int = 1024 * 1024,
     ) -> AsyncIterator[bytes]:
-        """Stream an in-progress upload."""
+        """Stream an in-progress upload; backends may require `seal_upload` first."""
+
+    async def seal_upload(self, upload_id: str) -> None:
+        """
+        Stop accepting appended bytes and make the whole upload readable with stream_upload.
+        Backends whose uploads are readable while they grow need not override this.
+        """
+
+    @abstractmethod
+    async def init_multipart_upload(self, upload_id: str, total_size: int) -> None:
+        """Initialize a temporary upload whose numbered parts may arrive concurrently and out of order."""
+
+    @abstractmethod
+    async def write_upload_part(
+        self,
+        upload_id: str,
+        *,
+        part_number: int,
+        offset: int,
+        chunk_stream: AsyncIterable[bytes],
+    ) -> tuple[int, str | None]:
+        """
+        Write one part of a multipart upload at its final offset.
+        Returns (bytes_written, part_token); the token is whatever the backend needs to assemble parts.
+        """
+
+    @abstractmethod
+    async def complete_multipart_upload(self, upload_id: str, parts: list[tuple[int, str | None]]) -> None:
+        """Assemble the (part_number, part_token) manifest into a regular in-progress upload."""
 
     @abstractmethod
     async def abort_upload(self, upload_id: str) -> None:
         """Abort and clean up temporary upload data."""
 
+    @abstractmethod
+    async def list_temp_uploads(self) -> AsyncIterator[tuple[str, datetime]]:
+        """Yield (upload_id, last_modified) for every temporary upload, so abandoned ones can be swept."""
+
     @abstractmethod
     async def promote_upload(self, upload_id: str, storage_key: str) -> bool:
         """
@@ -52,6 +95,21 @@ class StorageBackend(ABC):
     ) -> AsyncIterator[bytes]:
         """Stream an object for download."""
 
+    @abstractmethod
+    async def list_objects(self, prefix: str = "") -> AsyncIterator[tuple[str, datetime, int]]:
+        """Yield (storage_key, last_modified, size) for every stored object under `prefix`, in key order."""
+
+    async def get_local_path(self, storage_key: str) -> Path | None:
+        """
+        Optional capability: return the local file holding an object so it can be sent with sendfile.
+        Backends without local files return None and callers fall back to stream_object.
+        """
+        return None
+
+    def get_metrics(self) -> dict:
+        """Counters describing this backend (and any wrapped backend) for the admin metrics endpoint."""
+        return {}
+
     @abstractmethod
     async def get_object_size(self, storage_key: str) -> int:
         """Return stored object size."""
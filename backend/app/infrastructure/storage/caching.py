@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator
+
+import anyio
+
+from app.infrastructure.storage.base import StorageBackend
+from app.infrastructure.storage.upload_writer import UploadWriter
+
+logger = logging.getLogger(__name__)
+
+FILL_CHUNK_BYTES = 1024 * 1024
+# A reader starting this far past what a fill has written reads the backend directly instead of waiting.
+DIRECT_READ_GAP_BYTES = 8 * 1024 * 1024
+# Temp files of other workers untouched this long belong to a dead process and are removed.
+STALE_FILL_SECONDS = 3600
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+@dataclass
+class _Fill:
+    temp_path: Path
+    written: int = 0
+    done: bool = False
+    failed: bool = False
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def notify(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class CachingStorageBackend(StorageBackend):
+    """
+    Size-bounded local disk cache in front of a slower backend.
+    The first read of a blob starts one background fill that copies the whole blob into
+    `<root>/tmp/<pid>`; that reader and every concurrent reader of the same key tail the growing
+    file, so a miss costs one backend fetch however many clients asked. Finished blobs are
+    renamed to `<root>/objects/<key>` (the local backend's layout) and evicted least recently
+    used. Workers share the directory but not their accounting, so each one keeps the files it
+    knows about within `max_bytes / workers`. Writes and deletes go straight to the backend.
+    """
+
+    def __init__(
+        self,
+        inner: StorageBackend,
+        root: Path,
+        *,
+        max_bytes: int,
+        max_object_bytes: int,
+        workers: int = 1,
+    ):
+        self.inner = inner
+        self.root = root
+        self.temp_root = root / "tmp" / str(os.getpid())
+        self.object_root = root / "objects"
+        self.max_bytes = max_bytes // max(1, workers)
+        self.max_object_bytes = min(max_object_bytes, self.max_bytes)
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self._fills: dict[str, _Fill] = {}
+        self._fill_tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.fill_failures = 0
+        # A previous process with this pid is gone, so its leftovers are safe to drop.
+        shutil.rmtree(self.temp_root, ignore_errors=True)
+        self._remove_stale_fills()
+        self.temp_root.mkdir(parents=True, exist_ok=True)
+        self.object_root.mkdir(parents=True, exist_ok=True)
+        self._load_existing()
+
+    def _remove_stale_fills(self) -> None:
+        """Drop other workers' temp dirs (and loose files) in which nothing changed for a while."""
+        cutoff = time.time() - STALE_FILL_SECONDS
+        tmp = self.temp_root.parent
+        if not tmp.is_dir():
+            return
+        for path in tmp.iterdir():
+            try:
+                if path.is_dir():
+                    newest = max([path.stat().st_mtime] + [child.stat().st_mtime for child in path.iterdir()])
+                    if newest < cutoff:
+                        shutil.rmtree(path, ignore_errors=True)
+                elif path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+            except OSError:
+                pass  # removed concurrently by another worker
+
+    def _load_existing(self) -> None:
+        found = []
+        for path in self.object_root.rglob("*"):
+            if path.is_file():
+                stat = path.stat()
+                found.append((stat.st_atime, path.relative_to(self.object_root).as_posix(), stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+        self._evict()
+
+    def _cache_path(self, storage_key: str) -> Path:
+        normalized = Path(storage_key)
+        if normalized.is_absolute() or ".." in normalized.parts:
+            raise ValueError("Invalid storage key")
+        return self.object_root / normalized
+
+    def _lookup(self, storage_key: str) -> Path | None:
+        """Return the cached file and mark it recently used; files cached by other workers are adopted."""
+        path = self._cache_path(storage_key)
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(storage_key, None)
+            return None
+        with self._lock:
+            self._entries[storage_key] = size
+            self._entries.move_to_end(storage_key)
+        return path
+
+    def _evict(self) -> None:
+        with self._lock:
+            total = sum(self._entries.values())
+            victims = []
+            while total > self.max_bytes and self._entries:
+                key, size = self._entries.popitem(last=False)
+                victims.append(key)
+                total -= size
+        for key in victims:
+            self._cache_path(key).unlink(missing_ok=True)
+            self.evictions += 1
+
+    def _drop(self, storage_key: str) -> None:
+        with self._lock:
+            self._entries.pop(storage_key, None)
+        self._cache_path(storage_key).unlink(missing_ok=True)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+            cached_bytes = sum(self._entries.values())
+        lookups = self.hits + self.misses
+        return {
+            "cache": {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "coalesced_misses": self.coalesced,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "fill_failures": self.fill_failures,
+                "fills_in_progress": len(self._fills),
+                "entries": entries,
+                "cached_bytes": cached_bytes,
+                "max_bytes": self.max_bytes,
+            },
+            **self.inner.get_metrics(),
+        }
+
+    # Uploads pass through.
+
+    async def init_upload(self, upload_id: str) -> None:
+        await self.inner.init_upload(upload_id)
+
+    async def append_upload_chunk(self, upload_id: str, chunk: bytes) -> None:
+        await self.inner.append_upload_chunk(upload_id, chunk)
+
+    async def open_upload_writer(self, upload_id: str, *, buffer_size: int) -> UploadWriter:
+        return await self.inner.open_upload_writer(upload_id, buffer_size=buffer_size)
+
+    async def get_upload_size(self, upload_id: str) -> int:
+        return await self.inner.get_upload_size(upload_id)
+
+    async def stream_upload(
+        self,
+        upload_id: str,
+        *,
+        start: int = 0,
+        end: int | None = None,
+        chunk_size: int = 1024 * 1024,
+    ) -> AsyncIterator[bytes]:
+        async for chunk in self.inner.stream_upload(upload_id, start=start, end=end, chunk_size=chunk_size):
+            yield chunk
+
+    async def seal_upload(self, upload_id: str) -> None:
+        await self.inner.seal_upload(upload_id)
+
+    async def init_multipart_upload(self, upload_id: str, total_size: int) -> None:
+        await self.inner.init_multipart_upload(upload_id, total_size)
+
+    async def write_upload_part(
+        self,
+        upload_id: str,
+        *,
+        part_number: int,
+        offset: int,
+        chunk_stream: AsyncIterable[bytes],
+    ) -> tuple[int, str | None]:
+        return await self.inner.write_upload_part(
+            upload_id, part_number=part_number, offset=offset, chunk_stream=chunk_stream
+        )
+
+    async def complete_multipart_upload(self, upload_id: str, parts: list[tuple[int, str | None]]) -> None:
+        await self.inner.complete_multipart_upload(upload_id, parts)
+
+    async def abort_upload(self, upload_id: str) -> None:
+        await self.inner.abort_upload(upload_id)
+
+    async def list_temp_uploads(self) -> AsyncIterator[tuple[str, datetime]]:
+        async for item in self.inner.list_temp_uploads():
+            yield item
+
+    async def promote_upload(self, upload_id: str, storage_key: str) -> bool:
+        return await self.inner.promote_upload(upload_id, storage_key)
+
+    # Reads
+
+    async def _lookup_async(self, storage_key: str) -> Path | None:
+        return await anyio.to_thread.run_sync(self._lookup, storage_key)
+
+    async def _run_fill(self, storage_key: str, fill: _Fill) -> None:
+        fd = await anyio.to_thread.run_sync(
+            os.open, fill.temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+        )
+        try:
+            async for chunk in self.inner.stream_object(storage_key, chunk_size=FILL_CHUNK_BYTES):
+                await anyio.to_thread.run_sync(_write_all, fd, chunk)
+                fill.written += len(chunk)
+                fill.notify()
+            await anyio.to_thread.run_sync(os.close, fd)
+            fd = -1
+            target = self._cache_path(storage_key)
+            await anyio.to_thread.run_sync(lambda: target.parent.mkdir(parents=True, exist_ok=True))
+            await anyio.to_thread.run_sync(os.replace, fill.temp_path, target)
+            with self._lock:
+                self._entries[storage_key] = fill.written
+            await anyio.to_thread.run_sync(self._evict)
+            fill.done = True
+        except BaseException as exc:
+            fill.failed = True
+            self.fill_failures += 1
+            if not isinstance(exc, asyncio.CancelledError):
+                logger.warning("[storage-cache] fill failed key=%s: %s", storage_key, exc)
+            fill.temp_path.unlink(missing_ok=True)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+        finally:
+            if fd >= 0:
+                await anyio.to_thread.run_sync(os.close, fd)
+            self._fills.pop(storage_key, None)
+            fill.notify()
+
+    async def _start_fill(self, storage_key: str) -> _Fill:
+        temp_path = self.temp_root / uuid.uuid4().hex
+        def _create() -> None:
+            # An idle worker's dir may have been swept as stale by a restarting sibling.
+            temp_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path.touch()
+
+        # Tailing readers open the temp file right away, so it must exist before the fill is visible.
+        await anyio.to_thread.run_sync(_create)
+        if (existing := self._fills.get(storage_key)) is not None:
+            await anyio.to_thread.run_sync(lambda: temp_path.unlink(missing_ok=True))
+            self.coalesced += 1
+            return existing
+        fill = _Fill(temp_path=temp_path)
+        self._fills[storage_key] = fill
+        task = asyncio.create_task(self._run_fill(storage_key, fill))
+        self._fill_tasks.add(task)
+        task.add_done_callback(self._fill_tasks.discard)
+        return fill
+
+    async def _read_file(self, path: Path, start: int, end: int | None, chunk_size: int) -> AsyncIterator[bytes]:
+        fd = await anyio.to_thread.run_sync(os.open, path, os.O_RDONLY)
+        try:
+            size = (await anyio.to_thread.run_sync(os.fstat, fd)).st_size
+            last = size - 1 if end is None else min(end, size - 1)
+            position = start
+            while position <= last:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(chunk_size, last - position + 1), position)
+                if not chunk:
+                    break
+                position += len(chunk)
+                yield chunk
+        finally:
+            await anyio.to_thread.run_sync(os.close, fd)
+
+    async def _tail_fill(
+        self, storage_key: str, fill: _Fill, start: int, end: int | None, chunk_size: int
+    ) -> AsyncIterator[bytes]:
+        position = start
+        fd = await anyio.to_thread.run_sync(os.open, fill.temp_path, os.O_RDONLY)
+        try:
+            while end is None or position <= end:
+                changed = fill.changed
+                if position < fill.written:
+                    limit = fill.written if end is None else min(fill.written, end + 1)
+                    chunk = await anyio.to_thread.run_sync(
+                        os.pread, fd, min(chunk_size, limit - position), position
+                    )
+                    position += len(chunk)
+                    yield chunk
+                    continue
+                if fill.done:
+                    return
+                if fill.failed:
+                    # Finish this reader straight from the backend.
+                    async for chunk in self.inner.stream_object(
+                        storage_key, start=position, end=end, chunk_size=chunk_size
+                    ):
+                        yield chunk
+                    return
+                await changed.wait()
+        finally:
+            await anyio.to_thread.run_sync(os.close, fd)
+
+    async def stream_object(
+        self,
+        storage_key: str,
+        *,
+        start: int = 0,
+        end: int | None = None,
+        chunk_size: int = 1024 * 1024,
+    ) -> AsyncIterator[bytes]:
+        path = await self._lookup_async(storage_key)
+        if path is not None:
+            self.hits += 1
+            try:
+                async for chunk in self._read_file(path, start, end, chunk_size):
+                    yield chunk
+                return
+            except FileNotFoundError:
+                # Evicted by another worker between lookup and open.
+                await anyio.to_thread.run_sync(self._drop, storage_key)
+
+        self.misses += 1
+        fill = self._fills.get(storage_key)
+        if fill is None and await self.inner.get_object_size(storage_key) > self.max_object_bytes:
+            self.bypassed += 1
+        elif (fill := self._fills.get(storage_key)) is not None:
+            self.coalesced += 1
+        else:
+            fill = await self._start_fill(storage_key)
+
+        if fill is None or start - fill.written > DIRECT_READ_GAP_BYTES:
+            async for chunk in self.inner.stream_object(storage_key, start=start, end=end, chunk_size=chunk_size):
+                yield chunk
+            return
+        async for chunk in self._tail_fill(storage_key, fill, start, end, chunk_size):
+            yield chunk
+
+    async def list_objects(self, prefix: str = "") -> AsyncIterator[tuple[str, datetime, int]]:
+        async for item in self.inner.list_objects(prefix):
+            yield item
+
+    async def get_local_path(self, storage_key: str) -> Path | None:
+        # Only cached copies are offered, so every local path (and nginx offload) points into the cache.
+        path = await self._lookup_async(storage_key)
+        if path is not None:
+            self.hits += 1
+        return path
+
+    async def get_object_size(self, storage_key: str) -> int:
+        if await self._lookup_async(storage_key) is not None:
+            with self._lock:
+                size = self._entries.get(storage_key)
+            if size is not None:
+                return size
+        return await self.inner.get_object_size(storage_key)
+
+    async def delete_object(self, storage_key: str) -> None:
+        await anyio.to_thread.run_sync(self._drop, storage_key)
+        await self.inner.delete_object(storage_key)
@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator
+
+import anyio
+
+from app.infrastructure.storage.base import StorageBackend
+from app.infrastructure.storage.upload_writer import UploadWriter
+
+logger = logging.getLogger(__name__)
+
+FRAMES_SUFFIX = ".zf"
+INDEX_SUFFIX = ".zidx"
+INDEX_CACHE_ENTRIES = 8192
+
+
+@dataclass
+class CompressionStats:
+    """Process-wide totals of the compression decisions taken on promotion."""
+
+    blobs_compressed: int = 0
+    blobs_stored_raw: int = 0
+    raw_bytes: int = 0
+    stored_bytes: int = 0
+    cpu_seconds: float = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "blobs_compressed": self.blobs_compressed,
+            "blobs_stored_raw": self.blobs_stored_raw,
+            "raw_bytes": self.raw_bytes,
+            "stored_bytes": self.stored_bytes,
+            "ratio": round(self.stored_bytes / self.raw_bytes, 4) if self.raw_bytes else None,
+            "cpu_seconds": round(self.cpu_seconds, 3),
+        }
+
+
+compression_stats = CompressionStats()
+
+
+@dataclass(frozen=True)
+class FrameIndex:
+    frame_size: int
+    raw_size: int
+    offsets: tuple[int, ...]  # compressed offset of every frame, plus the total compressed size
+    stats: dict
+
+    @classmethod
+    def from_json(cls, payload: bytes) -> "FrameIndex":
+        data = json.loads(payload)
+        return cls(
+            frame_size=data["frame_size"],
+            raw_size=data["raw_size"],
+            offsets=tuple(data["offsets"]),
+            stats=data.get("stats", {}),
+        )
+
+    def to_json(self) -> bytes:
+        return json.dumps(
+            {
+                "codec": "zlib",
+                "frame_size": self.frame_size,
+                "raw_size": self.raw_size,
+                "offsets": list(self.offsets),
+                "stats": self.stats,
+            }
+        ).encode("utf-8")
+
+
+def _compress_frame(frame: bytes, level: int) -> tuple[bytes, float]:
+    started = time.thread_time()
+    compressed = zlib.compress(frame, level)
+    return compressed, time.thread_time() - started
+
+
+class CompressedStorageBackend(StorageBackend):
+    """
+    Wraps another backend and stores eligible blobs as independently zlib-compressed frames.
+    Promotion compresses a sample first and keeps the blob raw if it does not shrink enough, so
+    already-compressed archives cost only the sample. Compressed blobs live at `<key>.zf` with a
+    JSON frame index at `<key>.zidx` (written last, it marks the blob complete); raw blobs stay at
+    `<key>`. Range reads decompress only the frames overlapping the range.
+    """
+
+    def __init__(
+        self,
+        inner: StorageBackend,
+        *,
+        frame_size: int = 1024 * 1024,
+        level: int = 6,
+        max_ratio: float = 0.9,
+        sample_bytes: int = 4 * 1024 * 1024,
+    ):
+        self.inner = inner
+        self.frame_size = max(64 * 1024, frame_size)
+        self.level = level
+        self.max_ratio = max_ratio
+        self.sample_bytes = max(self.frame_size, sample_bytes)
+        # None marks a blob stored raw, so reads of raw blobs do not probe for an index every time.
+        self._index_cache: OrderedDict[str, FrameIndex | None] = OrderedDict()
+        self._index_lock = threading.Lock()
+
+    # Uploads are untouched until promotion.
+
+    async def init_upload(self, upload_id: str) -> None:
+        await self.inner.init_upload(upload_id)
+
+    async def append_upload_chunk(self, upload_id: str, chunk: bytes) -> None:
+        await self.inner.append_upload_chunk(upload_id, chunk)
+
+    async def open_upload_writer(self, upload_id: str, *, buffer_size: int) -> UploadWriter:
+        return await self.inner.open_upload_writer(upload_id, buffer_size=buffer_size)
+
+    async def get_upload_size(self, upload_id: str) -> int:
+        return await self.inner.get_upload_size(upload_id)
+
+    async def stream_upload(
+        self,
+        upload_id: str,
+        *,
+        start: int = 0,
+        end: int | None = None,
+        chunk_size: int = 1024 * 1024,
+    ) -> AsyncIterator[bytes]:
+        async for chunk in self.inner.stream_upload(upload_id, start=start, end=end, chunk_size=chunk_size):
+            yield chunk
+
+    async def seal_upload(self, upload_id: str) -> None:
+        await self.inner.seal_upload(upload_id)
+
+    async def init_multipart_upload(self, upload_id: str, total_size: int) -> None:
+        await self.inner.init_multipart_upload(upload_id, total_size)
+
+    async def write_upload_part(
+        self,
+        upload_id: str,
+        *,
+        part_number: int,
+        offset: int,
+        chunk_stream: AsyncIterable[bytes],
+    ) -> tuple[int, str | None]:
+        return await self.inner.write_upload_part(
+            upload_id, part_number=part_number, offset=offset, chunk_stream=chunk_stream
+        )
+
+    async def complete_multipart_upload(self, upload_id: str, parts: list[tuple[int, str | None]]) -> None:
+        await self.inner.complete_multipart_upload(upload_id, parts)
+
+    async def abort_upload(self, upload_id: str) -> None:
+        await self.inner.abort_upload(upload_id)
+
+    async def list_temp_uploads(self) -> AsyncIterator[tuple[str, datetime]]:
+        async for item in self.inner.list_temp_uploads():
+            yield item
+
+    # Index handling
+
+    async def _load_index(self, storage_key: str) -> FrameIndex | None:
+        with self._index_lock:
+            if storage_key in self._index_cache:
+                self._index_cache.move_to_end(storage_key)
+                return self._index_cache[storage_key]
+        try:
+            payload = b"".join([chunk async for chunk in self.inner.stream_object(storage_key + INDEX_SUFFIX)])
+            index = FrameIndex.from_json(payload)
+        except FileNotFoundError:
+            index = None
+        self._remember_index(storage_key, index)
+        return index
+
+    def _remember_index(self, storage_key: str, index: FrameIndex | None) -> None:
+        with self._index_lock:
+            self._index_cache[storage_key] = index
+            self._index_cache.move_to_end(storage_key)
+            while len(self._index_cache) > INDEX_CACHE_ENTRIES:
+                self._index_cache.popitem(last=False)
+
+    def _forget_index(self, storage_key: str) -> None:
+        with self._index_lock:
+            self._index_cache.pop(storage_key, None)
+
+    async def _exists(self, storage_key: str) -> bool:
+        try:
+            await self.inner.get_object_size(storage_key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def _store_bytes(self, upload_id: str, storage_key: str, payload: bytes) -> None:
+        await self.inner.init_upload(upload_id)
+        await self.inner.append_upload_chunk(upload_id, payload)
+        await self.inner.promote_upload(upload_id, storage_key)
+
+    # Promotion
+
+    async def promote_upload(self, upload_id: str, storage_key: str) -> bool:
+        if await self._exists(storage_key) or await self._exists(storage_key + INDEX_SUFFIX):
+            await self.inner.abort_upload(upload_id)
+            return False
+
+        frames_upload_id = f"{upload_id}-zf"
+        await self.inner.init_upload(frames_upload_id)
+        writer = await self.inner.open_upload_writer(frames_upload_id, buffer_size=4 * self.frame_size)
+        offsets = [0]
+        raw_size = 0
+        cpu_seconds = 0.0
+        started = time.perf_counter()
+        compress = True
+        try:
+            async with writer:
+                pending = bytearray()
+
+                async def _emit(frame: bytes) -> None:
+                    nonlocal raw_size, cpu_seconds
+                    compressed, cpu = await anyio.to_thread.run_sync(_compress_frame, frame, self.level)
+                    await writer.write(compressed)
+                    offsets.append(offsets[-1] + len(compressed))
+                    raw_size += len(frame)
+                    cpu_seconds += cpu
+
+                async for chunk in self.inner.stream_upload(upload_id, chunk_size=self.frame_size):
+                    pending += chunk
+                    while len(pending) >= self.frame_size:
+                        await _emit(bytes(pending[: self.frame_size]))
+                        del pending[: self.frame_size]
+                    if raw_size >= self.sample_bytes and offsets[-1] / raw_size >= self.max_ratio:
+                        compress = False
+                        break
+                if compress and pending:
+                    await _emit(bytes(pending))
+            if compress and raw_size and offsets[-1] / raw_size >= self.max_ratio:
+                compress = False
+        except BaseException:
+            await self.inner.abort_upload(frames_upload_id)
+            raise
+
+        elapsed = time.perf_counter() - started
+        compression_stats.cpu_seconds += cpu_seconds
+        if not compress or raw_size == 0:
+            await self.inner.abort_upload(frames_upload_id)
+            stored = await self.inner.promote_upload(upload_id, storage_key)
+            self._remember_index(storage_key, None)
+            compression_stats.blobs_stored_raw += 1
+            logger.info(
+                "[compression] stored raw key=%s sampled_bytes=%s sample_ratio=%.3f cpu_s=%.3f",
+                storage_key,
+                raw_size,
+                offsets[-1] / raw_size if raw_size else 1.0,
+                cpu_seconds,
+            )
+            return stored
+
+        stats = {
+            "ratio": round(offsets[-1] / raw_size, 4),
+            "cpu_seconds": round(cpu_seconds, 4),
+            "throughput_mib_s": round(raw_size / (1024 * 1024) / elapsed, 2) if elapsed > 0 else None,
+        }
+        index = FrameIndex(frame_size=self.frame_size, raw_size=raw_size, offsets=tuple(offsets), stats=stats)
+        await self.inner.promote_upload(frames_upload_id, storage_key + FRAMES_SUFFIX)
+        await self._store_bytes(f"{upload_id}-zidx", storage_key + INDEX_SUFFIX, index.to_json())
+        self._remember_index(storage_key, index)
+        await self.inner.abort_upload(upload_id)
+        compression_stats.blobs_compressed += 1
+        compression_stats.raw_bytes += raw_size
+        compression_stats.stored_bytes += offsets[-1]
+        logger.info("[compression] stored compressed key=%s raw_bytes=%s %s", storage_key, raw_size, stats)
+        return True
+
+    # Reads
+
+    async def stream_object(
+        self,
+        storage_key: str,
+        *,
+        start: int = 0,
+        end: int | None = None,
+        chunk_size: int = 1024 * 1024,
+    ) -> AsyncIterator[bytes]:
+        index = await self._load_index(storage_key)
+        if index is None:
+            started = False
+            try:
+                async for chunk in self.inner.stream_object(
+                    storage_key, start=start, end=end, chunk_size=chunk_size
+                ):
+                    started = True
+                    yield chunk
+                return
+            except FileNotFoundError:
+                # The cached raw verdict may predate another worker re-storing the key compressed.
+                if started:
+                    raise
+                self._forget_index(storage_key)
+            index = await self._load_index(storage_key)
+            if index is None:
+                raise FileNotFoundError(f"Object not found: {storage_key}")
+
+        last_byte = index.raw_size - 1 if end is None else min(end, index.raw_size - 1)
+        if start > last_byte:
+            return
+        first_frame = start // index.frame_size
+        last_frame = last_byte // index.frame_size
+        frame_no = first_frame
+        pending = bytearray()
+        # One ranged read covers every overlapping frame; frames are cut out by their offsets.
+        async for chunk in self.inner.stream_object(
+            storage_key + FRAMES_SUFFIX,
+            start=index.offsets[first_frame],
+            end=index.offsets[last_frame + 1] - 1,
+            chunk_size=chunk_size,
+        ):
+            pending += chunk
+            while frame_no <= last_frame:
+                frame_length = index.offsets[frame_no + 1] - index.offsets[frame_no]
+                if len(pending) < frame_length:
+                    break
+                raw = await anyio.to_thread.run_sync(zlib.decompress, bytes(pending[:frame_length]))
+                del pending[:frame_length]
+                frame_start = frame_no * index.frame_size
+                lo = max(start, frame_start) - frame_start
+                hi = min(last_byte, frame_start + len(raw) - 1) - frame_start + 1
+                for offset in range(lo, hi, chunk_size):
+                    yield raw[offset : min(hi, offset + chunk_size)]
+                frame_no += 1
+
+    async def get_object_size(self, storage_key: str) -> int:
+        index = await self._load_index(storage_key)
+        if index is not None:
+            return index.raw_size
+        try:
+            return await self.inner.get_object_size(storage_key)
+        except FileNotFoundError:
+            self._forget_index(storage_key)
+            index = await self._load_index(storage_key)
+            if index is None:
+                raise
+            return index.raw_size
+
+    async def list_objects(self, prefix: str = "") -> AsyncIterator[tuple[str, datetime, int]]:
+        # A compressed blob's frames and index sort next to each other; they are reported as one key.
+        current = None
+        async for key, modified, size in self.inner.list_objects(prefix):
+            for suffix in (FRAMES_SUFFIX, INDEX_SUFFIX):
+                if key.endswith(suffix):
+                    key = key[: -len(suffix)]
+                    break
+            if current is not None and current[0] == key:
+                current = (key, max(current[1], modified), current[2] + size)
+                continue
+            if current is not None:
+                yield current
+            current = (key, modified, size)
+        if current is not None:
+            yield current
+
+    async def get_local_path(self, storage_key: str) -> Path | None:
+        # Only raw blobs can be sent as files; compressed ones must go through stream_object.
+        if await self._load_index(storage_key) is not None:
+            return None
+        return await self.inner.get_local_path(storage_key)
+
+    def get_metrics(self) -> dict:
+        return {"compression": compression_stats.snapshot(), **self.inner.get_metrics()}
+
+    async def get_compression_stats(self, storage_key: str) -> dict | None:
+        index = await self._load_index(storage_key)
+        return None if index is None else {"raw_size": index.raw_size, **index.stats}
+
+    async def delete_object(self, storage_key: str) -> None:
+        self._forget_index(storage_key)
+        await self.inner.delete_object(storage_key + INDEX_SUFFIX)
+        await self.inner.delete_object(storage_key + FRAMES_SUFFIX)
+        await self.inner.delete_object(storage_key)
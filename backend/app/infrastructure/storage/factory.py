@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+
+from app.core.config import settings
+from app.infrastructure.storage.base import StorageBackend
+from app.infrastructure.storage.caching import CachingStorageBackend
+from app.infrastructure.storage.compressed import CompressedStorageBackend
+from app.infrastructure.storage.local_fs import LocalFileSystemStorage
+from app.infrastructure.storage.object_storage import ObjectStorageBackend
+
+
+@lru_cache(maxsize=1)
+def build_storage_backend() -> StorageBackend:
+    # One instance per process: wrappers keep caches, in-flight fills and counters.
+    if settings.PACKAGE_STORAGE_BACKEND == "local":
+        storage = LocalFileSystemStorage(Path(settings.UPLOAD_ROOT) / "software_packages")
+    elif settings.PACKAGE_STORAGE_BACKEND == "object":
+        storage = ObjectStorageBackend()
+    else:
+        raise RuntimeError(f"Unsupported PACKAGE_STORAGE_BACKEND: {settings.PACKAGE_STORAGE_BACKEND}")
+    if settings.PACKAGE_STORAGE_COMPRESSION:
+        storage = CompressedStorageBackend(
+            storage,
+            frame_size=settings.PACKAGE_COMPRESSION_FRAME_BYTES,
+            level=settings.PACKAGE_COMPRESSION_LEVEL,
+            max_ratio=settings.PACKAGE_COMPRESSION_MAX_RATIO,
+            sample_bytes=settings.PACKAGE_COMPRESSION_SAMPLE_BYTES,
+        )
+    if settings.PACKAGE_CACHE_ENABLED:
+        storage = CachingStorageBackend(
+            storage,
+            Path(settings.PACKAGE_CACHE_DIR),
+            max_bytes=settings.PACKAGE_CACHE_MAX_BYTES,
+            max_object_bytes=settings.PACKAGE_CACHE_MAX_OBJECT_BYTES,
+            workers=settings.WEB_CONCURRENCY,
+        )
+    return storage
@@ -1,11 +1,51 @@
 from __future__ import annotations
 
+import os
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import AsyncIterator
+from typing import AsyncIterable, AsyncIterator
 
 import anyio
 
 from app.infrastructure.storage.base import StorageBackend
+from app.infrastructure.storage.upload_writer import DEFAULT_WRITE_BUFFER_BYTES, UploadWriter
+
+
+class LocalFileUploadWriter(UploadWriter):
+    """Keeps one append handle open for the lifetime of a request instead of reopening per chunk."""
+
+    def __init__(self, handle, *, buffer_size: int):
+        super().__init__(buffer_size=buffer_size)
+        self._handle = handle
+
+    async def _write_block(self, block: bytes) -> None:
+        await anyio.to_thread.run_sync(self._handle.write, block)
+
+    async def _release(self) -> None:
+        await anyio.to_thread.run_sync(self._handle.close)
+
+
+class LocalPartWriter(UploadWriter):
+    """Writes coalesced blocks of one multipart part at fixed positions of a preallocated file."""
+
+    def __init__(self, fd: int, offset: int, *, buffer_size: int = DEFAULT_WRITE_BUFFER_BYTES):
+        super().__init__(buffer_size=buffer_size)
+        self._fd = fd
+        self._position = offset
+
+    async def _write_block(self, block: bytes) -> None:
+        await anyio.to_thread.run_sync(self._pwrite_all, block, self._position)
+        self._position += len(block)
+
+    def _pwrite_all(self, block: bytes, position: int) -> None:
+        view = memoryview(block)
+        while view:
+            written = os.pwrite(self._fd, view, position)
+            view = view[written:]
+            position += written
+
+    async def _release(self) -> None:
+        await anyio.to_thread.run_sync(os.close, self._fd)
 
 
 class LocalFileSystemStorage(StorageBackend):
@@ -46,6 +86,11 @@ class LocalFileSystemStorage(StorageBackend):
 
         await anyio.to_thread.run_sync(_append)
 
+    async def open_upload_writer(self, upload_id: str, *, buffer_size: int) -> UploadWriter:
+        path = self._temp_path(upload_id)
+        handle = await anyio.to_thread.run_sync(lambda: path.open("ab"))
+        return LocalFileUploadWriter(handle, buffer_size=buffer_size)
+
     async def get_upload_size(self, upload_id: str) -> int:
         path = self._temp_path(upload_id)
         return await anyio.to_thread.run_sync(lambda: path.stat().st_size if path.exists() else 0)
@@ -76,10 +121,61 @@ class LocalFileSystemStorage(StorageBackend):
         finally:
             await anyio.to_thread.run_sync(handle.close)
 
+    async def init_multipart_upload(self, upload_id: str, total_size: int) -> None:
+        path = self._temp_path(upload_id)
+
+        def _init() -> None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("wb") as handle:
+                # Preallocate so every part can be written in place with pwrite; no concat step needed.
+                if total_size > 0 and hasattr(os, "posix_fallocate"):
+                    try:
+                        os.posix_fallocate(handle.fileno(), 0, total_size)
+                        return
+                    except OSError:
+                        pass
+                handle.truncate(total_size)
+
+        await anyio.to_thread.run_sync(_init)
+
+    async def write_upload_part(
+        self,
+        upload_id: str,
+        *,
+        part_number: int,
+        offset: int,
+        chunk_stream: AsyncIterable[bytes],
+    ) -> tuple[int, str | None]:
+        path = self._temp_path(upload_id)
+        fd = await anyio.to_thread.run_sync(lambda: os.open(path, os.O_WRONLY))
+        writer = LocalPartWriter(fd, offset)
+        async with writer:
+            async for chunk in chunk_stream:
+                await writer.write(chunk)
+        return writer.bytes_written, None
+
+    async def complete_multipart_upload(self, upload_id: str, parts: list[tuple[int, str | None]]) -> None:
+        path = self._temp_path(upload_id)
+        if not await anyio.to_thread.run_sync(path.exists):
+            raise FileNotFoundError(f"Upload temp file not found: {path}")
+
     async def abort_upload(self, upload_id: str) -> None:
         path = self._temp_path(upload_id)
         await anyio.to_thread.run_sync(lambda: path.unlink(missing_ok=True))
 
+    async def list_temp_uploads(self) -> AsyncIterator[tuple[str, datetime]]:
+        def _scan() -> list[tuple[str, datetime]]:
+            found = []
+            with os.scandir(self.temp_root) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.endswith(".part"):
+                        modified = datetime.fromtimestamp(entry.stat().st_mtime, tz=timezone.utc)
+                        found.append((entry.name[: -len(".part")], modified))
+            return found
+
+        for upload_id, modified in await anyio.to_thread.run_sync(_scan):
+            yield upload_id, modified
+
     async def promote_upload(self, upload_id: str, storage_key: str) -> bool:
         src = self._temp_path(upload_id)
         dst = self._object_path(storage_key)
@@ -122,6 +218,28 @@ class LocalFileSystemStorage(StorageBackend):
         finally:
             await anyio.to_thread.run_sync(handle.close)
 
+    async def list_objects(self, prefix: str = "") -> AsyncIterator[tuple[str, datetime, int]]:
+        base = self.object_root / prefix.rpartition("/")[0] if "/" in prefix else self.object_root
+
+        def _scan() -> list[tuple[str, datetime, int]]:
+            found = []
+            for directory, _, files in os.walk(base):
+                for name in files:
+                    path = Path(directory) / name
+                    storage_key = path.relative_to(self.object_root).as_posix()
+                    if storage_key.startswith(prefix):
+                        stat = path.stat()
+                        found.append(
+                            (storage_key, datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc), stat.st_size)
+                        )
+            return sorted(found)
+
+        for item in await anyio.to_thread.run_sync(_scan):
+            yield item
+
+    async def get_local_path(self, storage_key: str) -> Path | None:
+        return self._object_path(storage_key)
+
     async def get_object_size(self, storage_key: str) -> int:
         path = self._object_path(storage_key)
         return await anyio.to_thread.run_sync(lambda: path.stat().st_size)
@@ -1,24 +1,422 @@
 from __future__ import annotations
 
-from typing import AsyncIterator
+import json
+import math
+import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator
+from urllib.parse import quote, urlsplit
 
+import httpx
+
+from app.core.config import settings
+from app.exceptions.exceptions import ExternalServiceError
 from app.infrastructure.storage.base import StorageBackend
+from app.infrastructure.storage.s3_signing import SigV4Signer, canonical_query, quote_key
+from app.infrastructure.storage.upload_writer import UploadWriter
+
+S3_MIN_PART_BYTES = 5 * 1024 * 1024
+S3_COPY_OBJECT_MAX_BYTES = 5 * 1024 * 1024 * 1024
+S3_COPY_PART_BYTES = 512 * 1024 * 1024
+
+_shared_client: httpx.AsyncClient | None = None
+
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled client so every request reuses keep-alive connections to the object store."""
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.PACKAGE_S3_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PACKAGE_S3_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(settings.PACKAGE_S3_TIMEOUT_SECONDS),
+        )
+    return _shared_client
+
+
+async def close_shared_http_client() -> None:
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+
+
+def _xml_name(element: ET.Element) -> str:
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def _xml_find(body: bytes, tag: str) -> str | None:
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError:
+        return None
+    for element in root.iter():
+        if _xml_name(element) == tag:
+            return element.text
+    return None
+
+
+def _xml_is_error(body: bytes) -> bool:
+    try:
+        return _xml_name(ET.fromstring(body)) == "Error"
+    except ET.ParseError:
+        return False
+
+
+@dataclass
+class _UploadManifest:
+    """
+    Persistent state of a temporary upload, stored next to it so any worker can resume it.
+    Stream uploads keep the sub-part remainder in a generation-numbered tail object;
+    the manifest is written last, so a crash mid-request leaves the previous state intact.
+    """
+
+    mode: str = "stream"
+    s3_upload_id: str | None = None
+    parts: list[list] = field(default_factory=list)  # [part_number, size_bytes, etag]
+    tail_key: str | None = None
+    tail_size: int = 0
+    generation: int = 0
+    sealed: bool = False
+    size_bytes: int = 0
+
+    @property
+    def current_size(self) -> int:
+        if self.sealed:
+            return self.size_bytes
+        return sum(part[1] for part in self.parts) + self.tail_size
+
+
+class ObjectUploadWriter(UploadWriter):
+    """
+    Streams an upload into S3 multipart parts.
+    The previous tail is prepended to the buffer; full parts are uploaded as they fill
+    and the remainder is persisted as the new tail when the writer closes.
+    """
+
+    def __init__(self, backend: "ObjectStorageBackend", upload_id: str, manifest: _UploadManifest, tail: bytes):
+        super().__init__(buffer_size=backend.part_size)
+        self._backend = backend
+        self._upload_id = upload_id
+        self._manifest = manifest
+        self._buffer += tail
+        self._failed = False
+
+    async def _write_block(self, block: bytes) -> None:
+        try:
+            await self._backend._append_part(self._upload_id, self._manifest, block)
+        except BaseException:
+            self._failed = True
+            raise
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        # After a failed part the buffered bytes no longer follow the stored parts; drop them and
+        # let the client resume from the end of the last uploaded part.
+        tail = b"" if self._failed else bytes(self._buffer)
+        self._buffer.clear()
+        await self._backend._save_tail(self._upload_id, self._manifest, tail)
 
 
 class ObjectStorageBackend(StorageBackend):
     """
-    Placeholder for object storage adapters (S3, GCS, MinIO).
-    Implementations should stream chunks and avoid buffering whole objects.
+    S3-compatible object storage (AWS S3, MinIO, moto, ...).
+    Temporary uploads become S3 multipart uploads under `tmp/`, promotion is a server-side copy
+    into `objects/`, and reads are ranged GETs over a shared pooled HTTP client.
     """
 
+    def __init__(
+        self,
+        *,
+        bucket: str | None = None,
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        access_key: str | None = None,
+        secret_key: str | None = None,
+        prefix: str | None = None,
+        part_size: int | None = None,
+        client: httpx.AsyncClient | None = None,
+    ):
+        self.bucket = bucket or settings.PACKAGE_S3_BUCKET
+        self.region = region or settings.PACKAGE_S3_REGION
+        self.prefix = (settings.PACKAGE_S3_PREFIX if prefix is None else prefix).strip("/")
+        self.part_size = max(S3_MIN_PART_BYTES, part_size or settings.PACKAGE_S3_PART_SIZE_BYTES)
+        if not self.bucket:
+            raise RuntimeError("PACKAGE_S3_BUCKET is required for object storage")
+
+        endpoint = (endpoint_url if endpoint_url is not None else settings.PACKAGE_S3_ENDPOINT_URL).rstrip("/")
+        if endpoint:
+            # Custom endpoints (MinIO, local stand-ins) use path-style addressing.
+            self._base_url = f"{endpoint}/{quote_key(self.bucket)}"
+        else:
+            self._base_url = f"https://{self.bucket}.s3.{self.region}.amazonaws.com"
+        parsed = urlsplit(self._base_url)
+        self._host = parsed.netloc
+        self._base_path = parsed.path
+        self._signer = SigV4Signer(
+            access_key=access_key or settings.PACKAGE_S3_ACCESS_KEY_ID,
+            secret_key=secret_key or settings.PACKAGE_S3_SECRET_ACCESS_KEY,
+            region=self.region,
+        )
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_shared_http_client()
+
+    # Keys
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def _object_key(self, storage_key: str) -> str:
+        if storage_key.startswith("/") or ".." in storage_key.split("/"):
+            raise ValueError("Invalid storage key")
+        return self._key(f"objects/{storage_key}")
+
+    def _temp_key(self, upload_id: str, name: str) -> str:
+        return self._key(f"tmp/{upload_id}/{name}")
+
+    # HTTP
+
+    def _build_request(
+        self,
+        method: str,
+        key: str,
+        *,
+        query: dict[str, str] | None = None,
+        headers: dict[str, str] | None = None,
+        content: bytes | None = None,
+    ) -> httpx.Request:
+        path = f"{self._base_path}/{quote_key(key)}"
+        signed = self._signer.sign(method, host=self._host, path=path, query=query, headers=headers)
+        url = f"{urlsplit(self._base_url).scheme}://{self._host}{path}"
+        query_string = canonical_query(query)
+        if query_string:
+            url = f"{url}?{query_string}"
+        return self.client.build_request(method, url, headers=signed, content=content)
+
+    async def _request(
+        self,
+        method: str,
+        key: str,
+        *,
+        query: dict[str, str] | None = None,
+        headers: dict[str, str] | None = None,
+        content: bytes | None = None,
+        allow_missing: bool = False,
+    ) -> httpx.Response | None:
+        request = self._build_request(method, key, query=query, headers=headers, content=content)
+        try:
+            response = await self.client.send(request)
+        except httpx.HTTPError as exc:
+            raise ExternalServiceError(f"Object storage {method} {key} failed: {exc}") from exc
+        if response.status_code == 404:
+            if allow_missing:
+                return None
+            raise FileNotFoundError(f"Object not found: {key}")
+        # CompleteMultipartUpload and CopyObject can report errors inside a 200 response.
+        if response.status_code >= 300 or (method in {"POST", "PUT"} and _xml_is_error(response.content)):
+            code = _xml_find(response.content, "Code") or response.reason_phrase
+            raise ExternalServiceError(f"Object storage {method} {key} failed: {response.status_code} {code}")
+        return response
+
+    async def _stream(self, key: str, *, start: int, end: int | None, chunk_size: int) -> AsyncIterator[bytes]:
+        headers = None
+        if start > 0 or end is not None:
+            headers = {"range": f"bytes={start}-{'' if end is None else end}"}
+        request = self._build_request("GET", key, headers=headers)
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.HTTPError as exc:
+            raise ExternalServiceError(f"Object storage GET {key} failed: {exc}") from exc
+        try:
+            if response.status_code == 404:
+                raise FileNotFoundError(f"Object not found: {key}")
+            if response.status_code == 416:
+                return
+            if response.status_code >= 300:
+                raise ExternalServiceError(f"Object storage GET {key} failed: {response.status_code}")
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+        finally:
+            await response.aclose()
+
+    async def _head_size(self, key: str) -> int | None:
+        response = await self._request("HEAD", key, allow_missing=True)
+        if response is None:
+            return None
+        return int(response.headers.get("content-length", "0"))
+
+    async def _delete(self, key: str) -> None:
+        await self._request("DELETE", key, allow_missing=True)
+
+    async def _list(self, prefix: str) -> AsyncIterator[tuple[str, datetime, int]]:
+        """ListObjectsV2 over a prefix, yielding (key, last_modified, size) page by page."""
+        token = None
+        while True:
+            query = {"list-type": "2", "prefix": prefix}
+            if token:
+                query["continuation-token"] = token
+            response = await self._request("GET", "", query=query)
+            root = ET.fromstring(response.content)
+            for contents in (element for element in root if _xml_name(element) == "Contents"):
+                fields = {_xml_name(child): child.text or "" for child in contents}
+                modified = datetime.fromisoformat(fields["LastModified"].replace("Z", "+00:00"))
+                yield fields["Key"], modified, int(fields.get("Size") or 0)
+            token = _xml_find(response.content, "NextContinuationToken")
+            if _xml_find(response.content, "IsTruncated") != "true" or not token:
+                return
+
+    # Multipart primitives
+
+    async def _create_multipart(self, key: str) -> str:
+        response = await self._request("POST", key, query={"uploads": ""})
+        upload_id = _xml_find(response.content, "UploadId")
+        if not upload_id:
+            raise ExternalServiceError(f"Object storage did not return an UploadId for {key}")
+        return upload_id
+
+    async def _upload_part(self, key: str, s3_upload_id: str, part_number: int, data: bytes) -> str:
+        response = await self._request(
+            "PUT",
+            key,
+            query={"partNumber": str(part_number), "uploadId": s3_upload_id},
+            content=data,
+        )
+        return response.headers.get("etag", "")
+
+    async def _complete_multipart(self, key: str, s3_upload_id: str, parts: list[tuple[int, str]]) -> None:
+        body = "".join(
+            f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>" for number, etag in sorted(parts)
+        )
+        await self._request(
+            "POST",
+            key,
+            query={"uploadId": s3_upload_id},
+            headers={"content-type": "application/xml"},
+            content=f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode(),
+        )
+
+    async def _abort_multipart(self, key: str, s3_upload_id: str) -> None:
+        await self._request("DELETE", key, query={"uploadId": s3_upload_id}, allow_missing=True)
+
+    async def _copy(self, src_key: str, dst_key: str, size: int) -> None:
+        source = quote(f"/{self.bucket}/{src_key}", safe="/~")
+        if size <= S3_COPY_OBJECT_MAX_BYTES:
+            await self._request("PUT", dst_key, headers={"x-amz-copy-source": source})
+            return
+        s3_upload_id = await self._create_multipart(dst_key)
+        try:
+            parts = []
+            for index in range(math.ceil(size / S3_COPY_PART_BYTES)):
+                first = index * S3_COPY_PART_BYTES
+                last = min(size, first + S3_COPY_PART_BYTES) - 1
+                response = await self._request(
+                    "PUT",
+                    dst_key,
+                    query={"partNumber": str(index + 1), "uploadId": s3_upload_id},
+                    headers={"x-amz-copy-source": source, "x-amz-copy-source-range": f"bytes={first}-{last}"},
+                )
+                parts.append((index + 1, _xml_find(response.content, "ETag") or ""))
+            await self._complete_multipart(dst_key, s3_upload_id, parts)
+        except BaseException:
+            await self._abort_multipart(dst_key, s3_upload_id)
+            raise
+
+    # Upload manifest
+
+    async def _load_manifest(self, upload_id: str) -> _UploadManifest:
+        response = await self._request("GET", self._temp_key(upload_id, "manifest.json"), allow_missing=True)
+        if response is None:
+            raise FileNotFoundError(f"Upload not found: {upload_id}")
+        return _UploadManifest(**json.loads(response.content))
+
+    async def _save_manifest(self, upload_id: str, manifest: _UploadManifest) -> None:
+        await self._request(
+            "PUT",
+            self._temp_key(upload_id, "manifest.json"),
+            headers={"content-type": "application/json"},
+            content=json.dumps(asdict(manifest)).encode(),
+        )
+
+    async def _read_tail(self, manifest: _UploadManifest) -> bytes:
+        if not manifest.tail_key or not manifest.tail_size:
+            return b""
+        response = await self._request("GET", manifest.tail_key)
+        return response.content
+
+    async def _append_part(self, upload_id: str, manifest: _UploadManifest, block: bytes) -> None:
+        data_key = self._temp_key(upload_id, "data")
+        if manifest.s3_upload_id is None:
+            manifest.s3_upload_id = await self._create_multipart(data_key)
+        part_number = len(manifest.parts) + 1
+        etag = await self._upload_part(data_key, manifest.s3_upload_id, part_number, block)
+        manifest.parts.append([part_number, len(block), etag])
+
+    async def _save_tail(self, upload_id: str, manifest: _UploadManifest, tail: bytes) -> None:
+        previous_tail = manifest.tail_key
+        manifest.generation += 1
+        manifest.tail_key = None
+        manifest.tail_size = len(tail)
+        if tail:
+            manifest.tail_key = self._temp_key(upload_id, f"tail-{manifest.generation}")
+            await self._request("PUT", manifest.tail_key, content=tail)
+        await self._save_manifest(upload_id, manifest)
+        if previous_tail and previous_tail != manifest.tail_key:
+            await self._delete(previous_tail)
+
+    async def _seal(self, upload_id: str, manifest: _UploadManifest) -> None:
+        """Turn the parts and tail of a stream upload into one readable temporary object."""
+        if manifest.sealed:
+            return
+        data_key = self._temp_key(upload_id, "data")
+        size = manifest.current_size
+        tail = await self._read_tail(manifest)
+        if manifest.s3_upload_id is None:
+            await self._request("PUT", data_key, content=tail)
+        else:
+            if tail:
+                await self._append_part(upload_id, manifest, tail)
+            await self._complete_multipart(
+                data_key, manifest.s3_upload_id, [(part[0], part[2]) for part in manifest.parts]
+            )
+        previous_tail = manifest.tail_key
+        manifest.size_bytes = size
+        manifest.sealed = True
+        manifest.tail_key = None
+        manifest.tail_size = 0
+        await self._save_manifest(upload_id, manifest)
+        if previous_tail:
+            await self._delete(previous_tail)
+
+    # StorageBackend
+
     async def init_upload(self, upload_id: str) -> None:
-        raise NotImplementedError
+        # The S3 multipart upload is created lazily, so uploads smaller than one part cost a single PUT.
+        await self._save_manifest(upload_id, _UploadManifest(mode="stream"))
 
     async def append_upload_chunk(self, upload_id: str, chunk: bytes) -> None:
-        raise NotImplementedError
+        async with await self.open_upload_writer(upload_id, buffer_size=self.part_size) as writer:
+            await writer.write(chunk)
+
+    async def open_upload_writer(self, upload_id: str, *, buffer_size: int) -> UploadWriter:
+        manifest = await self._load_manifest(upload_id)
+        if manifest.mode != "stream" or manifest.sealed:
+            raise RuntimeError(f"Upload {upload_id} no longer accepts appended bytes")
+        return ObjectUploadWriter(self, upload_id, manifest, await self._read_tail(manifest))
 
     async def get_upload_size(self, upload_id: str) -> int:
-        raise NotImplementedError
+        try:
+            manifest = await self._load_manifest(upload_id)
+        except FileNotFoundError:
+            return 0
+        return manifest.current_size
 
     async def stream_upload(
         self,
@@ -28,13 +426,97 @@ class ObjectStorageBackend(StorageBackend):
         end: int | None = None,
         chunk_size: int = 1024 * 1024,
     ) -> AsyncIterator[bytes]:
-        raise NotImplementedError
+        manifest = await self._load_manifest(upload_id)
+        if not manifest.sealed:
+            # Parts of an open S3 multipart upload cannot be read back.
+            raise RuntimeError(f"Upload {upload_id} must be sealed before it is read")
+        if start >= manifest.size_bytes:
+            return
+        async for chunk in self._stream(self._temp_key(upload_id, "data"), start=start, end=end, chunk_size=chunk_size):
+            yield chunk
+
+    async def seal_upload(self, upload_id: str) -> None:
+        try:
+            manifest = await self._load_manifest(upload_id)
+        except FileNotFoundError:
+            return  # already promoted or aborted
+        # Multipart uploads are sealed by complete_multipart_upload.
+        if manifest.mode == "stream":
+            await self._seal(upload_id, manifest)
+
+    async def init_multipart_upload(self, upload_id: str, total_size: int) -> None:
+        s3_upload_id = await self._create_multipart(self._temp_key(upload_id, "data"))
+        await self._save_manifest(upload_id, _UploadManifest(mode="multipart", s3_upload_id=s3_upload_id))
+
+    async def write_upload_part(
+        self,
+        upload_id: str,
+        *,
+        part_number: int,
+        offset: int,
+        chunk_stream: AsyncIterable[bytes],
+    ) -> tuple[int, str | None]:
+        manifest = await self._load_manifest(upload_id)
+        if manifest.mode != "multipart" or manifest.s3_upload_id is None:
+            raise RuntimeError(f"Upload {upload_id} is not a multipart upload")
+        # UploadPart needs a Content-Length, so one part is held in memory (bounded by the part size).
+        data = bytearray()
+        async for chunk in chunk_stream:
+            data += chunk
+        etag = await self._upload_part(self._temp_key(upload_id, "data"), manifest.s3_upload_id, part_number, bytes(data))
+        return len(data), etag
+
+    async def complete_multipart_upload(self, upload_id: str, parts: list[tuple[int, str | None]]) -> None:
+        manifest = await self._load_manifest(upload_id)
+        if manifest.sealed:
+            return
+        if manifest.s3_upload_id is None or any(not etag for _, etag in parts):
+            raise ValueError("Every multipart part needs the ETag returned by the object store")
+        data_key = self._temp_key(upload_id, "data")
+        await self._complete_multipart(data_key, manifest.s3_upload_id, [(number, etag) for number, etag in parts])
+        manifest.size_bytes = await self._head_size(data_key) or 0
+        manifest.sealed = True
+        await self._save_manifest(upload_id, manifest)
 
     async def abort_upload(self, upload_id: str) -> None:
-        raise NotImplementedError
+        try:
+            manifest = await self._load_manifest(upload_id)
+        except FileNotFoundError:
+            manifest = None
+        data_key = self._temp_key(upload_id, "data")
+        if manifest is not None:
+            if manifest.s3_upload_id and not manifest.sealed:
+                await self._abort_multipart(data_key, manifest.s3_upload_id)
+            if manifest.tail_key:
+                await self._delete(manifest.tail_key)
+        await self._delete(data_key)
+        await self._delete(self._temp_key(upload_id, "manifest.json"))
+
+    async def list_temp_uploads(self) -> AsyncIterator[tuple[str, datetime]]:
+        # Keys come back sorted, so every upload's objects are contiguous.
+        temp_prefix = self._key("tmp/")
+        current_id, latest = None, None
+        async for key, modified, _ in self._list(temp_prefix):
+            upload_id = key[len(temp_prefix) :].split("/", 1)[0]
+            if upload_id != current_id:
+                if current_id is not None:
+                    yield current_id, latest
+                current_id, latest = upload_id, modified
+            else:
+                latest = max(latest, modified)
+        if current_id is not None:
+            yield current_id, latest
 
     async def promote_upload(self, upload_id: str, storage_key: str) -> bool:
-        raise NotImplementedError
+        object_key = self._object_key(storage_key)
+        manifest = await self._load_manifest(upload_id)
+        if await self._head_size(object_key) is not None:
+            await self.abort_upload(upload_id)
+            return False
+        await self._seal(upload_id, manifest)
+        await self._copy(self._temp_key(upload_id, "data"), object_key, manifest.size_bytes)
+        await self.abort_upload(upload_id)
+        return True
 
     async def stream_object(
         self,
@@ -44,10 +526,19 @@ class ObjectStorageBackend(StorageBackend):
         end: int | None = None,
         chunk_size: int = 1024 * 1024,
     ) -> AsyncIterator[bytes]:
-        raise NotImplementedError
+        async for chunk in self._stream(self._object_key(storage_key), start=start, end=end, chunk_size=chunk_size):
+            yield chunk
+
+    async def list_objects(self, prefix: str = "") -> AsyncIterator[tuple[str, datetime, int]]:
+        object_prefix = self._key("objects/")
+        async for key, modified, size in self._list(object_prefix + prefix):
+            yield key[len(object_prefix) :], modified, size
 
     async def get_object_size(self, storage_key: str) -> int:
-        raise NotImplementedError
+        size = await self._head_size(self._object_key(storage_key))
+        if size is None:
+            raise FileNotFoundError(f"Object not found: {storage_key}")
+        return size
 
     async def delete_object(self, storage_key: str) -> None:
-        raise NotImplementedError
+        await self._delete(self._object_key(storage_key))
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.infrastructure.storage.base import StorageBackend
+
+WRITE_ALIGNMENT_BYTES = 64 * 1024
+DEFAULT_WRITE_BUFFER_BYTES = 8 * 1024 * 1024
+
+
+class UploadWriter(ABC):
+    """
+    Request-scoped writer for an in-progress upload.
+    Small body chunks are coalesced in memory and written in large, aligned blocks.
+    Callers must close the writer (or use it as an async context manager) so buffered bytes land.
+    """
+
+    def __init__(self, *, buffer_size: int, alignment: int = WRITE_ALIGNMENT_BYTES):
+        self.alignment = max(1, alignment)
+        self.buffer_size = max(self.alignment, buffer_size - buffer_size % self.alignment)
+        self._buffer = bytearray()
+        self._bytes_written = 0
+        self._closed = False
+
+    @property
+    def bytes_written(self) -> int:
+        """Bytes accepted by this writer, including bytes still buffered."""
+        return self._bytes_written
+
+    async def write(self, chunk: bytes) -> None:
+        if self._closed:
+            raise RuntimeError("Upload writer is closed")
+        if not chunk:
+            return
+        self._buffer += chunk
+        self._bytes_written += len(chunk)
+        if len(self._buffer) >= self.buffer_size:
+            aligned = len(self._buffer) - len(self._buffer) % self.alignment
+            await self._drain(aligned)
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._buffer:
+                await self._drain(len(self._buffer))
+        finally:
+            await self._release()
+
+    async def _drain(self, size: int) -> None:
+        block = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        await self._write_block(block)
+
+    @abstractmethod
+    async def _write_block(self, block: bytes) -> None:
+        """Persist one coalesced block."""
+
+    async def _release(self) -> None:
+        """Release handles held by the writer."""
+
+    async def __aenter__(self) -> "UploadWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+
+class BufferedUploadWriter(UploadWriter):
+    """Backend-agnostic writer that flushes coalesced blocks through append_upload_chunk."""
+
+    def __init__(self, storage: "StorageBackend", upload_id: str, *, buffer_size: int):
+        super().__init__(buffer_size=buffer_size)
+        self.storage = storage
+        self.upload_id = upload_id
+
+    async def _write_block(self, block: bytes) -> None:
+        await self.storage.append_upload_chunk(self.upload_id, block)
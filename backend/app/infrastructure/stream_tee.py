@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import AsyncIterable, Awaitable, Callable, Sequence
+
+import anyio
+from anyio.abc import ObjectReceiveStream
+
+ChunkSink = Callable[[bytes], Awaitable[None]]
+
+
+async def tee_stream(
+    source: AsyncIterable[bytes],
+    sinks: Sequence[ChunkSink],
+    *,
+    max_buffered_chunks: int = 4,
+) -> int:
+    """
+    Fan every chunk of `source` out to all sinks concurrently in a single pass.
+    Each sink reads from its own bounded buffer; a slow sink applies backpressure to the source
+    once its buffer is full. The first failure (source or sink) cancels the whole pipeline and is
+    re-raised as-is. Returns the number of bytes read from the source.
+    """
+    total = 0
+    try:
+        async with anyio.create_task_group() as task_group:
+            senders = []
+            for sink in sinks:
+                send_stream, receive_stream = anyio.create_memory_object_stream[bytes](max_buffered_chunks)
+                senders.append(send_stream)
+                task_group.start_soon(_drain, receive_stream, sink)
+            try:
+                async for chunk in source:
+                    if not chunk:
+                        continue
+                    for send_stream in senders:
+                        await send_stream.send(chunk)
+                    total += len(chunk)
+            finally:
+                for send_stream in senders:
+                    await send_stream.aclose()
+    except BaseExceptionGroup as group:
+        raise _first_error(group) from None
+    return total
+
+
+async def _drain(receive_stream: ObjectReceiveStream[bytes], sink: ChunkSink) -> None:
+    async with receive_stream:
+        async for chunk in receive_stream:
+            await sink(chunk)
+
+
+def _first_error(group: BaseExceptionGroup) -> BaseException:
+    cancelled = anyio.get_cancelled_exc_class()
+    leaves: list[BaseException] = []
+    pending: list[BaseException] = [group]
+    while pending:
+        exc = pending.pop(0)
+        if isinstance(exc, BaseExceptionGroup):
+            pending.extend(exc.exceptions)
+        else:
+            leaves.append(exc)
+    for exc in leaves:
+        if not isinstance(exc, cancelled):
+            return exc
+    return leaves[0] if leaves else group
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import math
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+from app.exceptions.exceptions import OverloadedError
+
+
+@dataclass
+class TransferLease:
+    controller: "TransferAdmission"
+    user_id: int
+    kind: str
+    nbytes: int
+    released: bool = field(default=False)
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+
+class TransferAdmission:
+    """
+    Per-worker admission control for upload and download transfers.
+    A transfer is admitted while the worker runs fewer than `max_transfers`, the user fewer than
+    `max_per_user`, and the declared bytes fit the in-flight budget (a lone transfer is always
+    admitted, whatever its size). Otherwise it waits up to `queue_timeout_seconds` in a queue of
+    at most `max_queue` and is then shed with OverloadedError, which the API turns into 503.
+    All state lives on the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_transfers: int,
+        max_per_user: int,
+        max_bytes_in_flight: int,
+        max_queue: int,
+        queue_timeout_seconds: float,
+    ) -> None:
+        self.max_transfers = max_transfers
+        self.max_per_user = max_per_user
+        self.max_bytes_in_flight = max_bytes_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.active = 0
+        self.bytes_in_flight = 0
+        self.waiting = 0
+        self._per_user: Counter[int] = Counter()
+        self._changed: asyncio.Event | None = None
+        self.admitted: Counter[str] = Counter()
+        self.queued: Counter[str] = Counter()
+        self.rejected: Counter[str] = Counter()
+
+    @property
+    def retry_after_seconds(self) -> int:
+        return max(1, math.ceil(self.queue_timeout_seconds))
+
+    def _can_admit(self, user_id: int, nbytes: int) -> bool:
+        if self.max_transfers > 0 and self.active >= self.max_transfers:
+            return False
+        if self.max_per_user > 0 and self._per_user[user_id] >= self.max_per_user:
+            return False
+        if self.max_bytes_in_flight > 0 and self.active and self.bytes_in_flight + nbytes > self.max_bytes_in_flight:
+            return False
+        return True
+
+    def _grant(self, user_id: int, kind: str, nbytes: int) -> TransferLease:
+        self.active += 1
+        self.bytes_in_flight += nbytes
+        self._per_user[user_id] += 1
+        self.admitted[kind] += 1
+        return TransferLease(controller=self, user_id=user_id, kind=kind, nbytes=nbytes)
+
+    def _release(self, lease: TransferLease) -> None:
+        self.active -= 1
+        self.bytes_in_flight -= lease.nbytes
+        self._per_user[lease.user_id] -= 1
+        if self._per_user[lease.user_id] <= 0:
+            del self._per_user[lease.user_id]
+        if self._changed is not None:
+            changed, self._changed = self._changed, None
+            changed.set()
+
+    def _reject(self, kind: str, reason: str) -> OverloadedError:
+        self.rejected[f"{kind}:{reason}"] += 1
+        return OverloadedError(
+            "Too many transfers in progress. Please retry shortly.",
+            retry_after=self.retry_after_seconds,
+        )
+
+    async def acquire(self, *, user_id: int, kind: str, nbytes: int = 0) -> TransferLease:
+        nbytes = max(0, nbytes)
+        if self._can_admit(user_id, nbytes):
+            return self._grant(user_id, kind, nbytes)
+        if self.waiting >= self.max_queue:
+            raise self._reject(kind, "queue_full")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout_seconds
+        self.waiting += 1
+        self.queued[kind] += 1
+        try:
+            while not self._can_admit(user_id, nbytes):
+                if self._changed is None:
+                    self._changed = asyncio.Event()
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise self._reject(kind, "timeout")
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    raise self._reject(kind, "timeout") from None
+        finally:
+            self.waiting -= 1
+        return self._grant(user_id, kind, nbytes)
+
+    @asynccontextmanager
+    async def admit(self, *, user_id: int, kind: str, nbytes: int = 0) -> AsyncIterator[TransferLease]:
+        lease = await self.acquire(user_id=user_id, kind=kind, nbytes=nbytes)
+        try:
+            yield lease
+        finally:
+            lease.release()
+
+    def get_metrics(self) -> dict:
+        return {
+            "active": self.active,
+            "bytes_in_flight": self.bytes_in_flight,
+            "queue_depth": self.waiting,
+            "active_users": len(self._per_user),
+            "admitted": dict(self.admitted),
+            "queued": dict(self.queued),
+            "rejected": dict(self.rejected),
+        }
+
+
+class LeasedStreamingResponse(StreamingResponse):
+    """StreamingResponse that gives its admission lease back however the response ends."""
+
+    def __init__(self, content: AsyncIterable[bytes], *, lease: TransferLease, **kwargs) -> None:
+        super().__init__(content, **kwargs)
+        self.lease = lease
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.lease.release()
+
+
+transfer_admission = TransferAdmission(
+    max_transfers=settings.PACKAGE_TRANSFER_MAX_CONCURRENT,
+    max_per_user=settings.PACKAGE_TRANSFER_MAX_PER_USER,
+    max_bytes_in_flight=settings.PACKAGE_TRANSFER_MAX_BYTES_IN_FLIGHT,
+    max_queue=settings.PACKAGE_TRANSFER_MAX_QUEUE,
+    queue_timeout_seconds=settings.PACKAGE_TRANSFER_QUEUE_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable
+
+from app.infrastructure.checksum import StreamingSHA256
+from app.infrastructure.security.malware_scanner import ScanSession
+from app.infrastructure.stream_tee import ChunkSink
+
+
+@dataclass
+class UploadCheckpoint:
+    """Hash and scan state covering the first `offset` bytes of an in-progress upload."""
+
+    hasher: StreamingSHA256 = field(default_factory=StreamingSHA256)
+    scan_session: ScanSession | None = None
+
+    @property
+    def offset(self) -> int:
+        return self.hasher.size_bytes
+
+    def sinks(self) -> list[ChunkSink]:
+        async def _hash(chunk: bytes) -> None:
+            await self.hasher.update_async(chunk)
+
+        sinks: list[ChunkSink] = [_hash]
+        if self.scan_session is not None:
+            sinks.append(self.scan_session.feed)
+        return sinks
+
+
+class UploadCheckpointRegistry:
+    """
+    Process-local checkpoints of in-flight uploads, keyed by upload id.
+    Scan sessions cannot be serialized, so a live checkpoint only exists inside the worker that
+    produced it; the hash midstate is also persisted on the session row at each progress milestone
+    (see StreamingSHA256.export_state) and callers re-hash whatever neither covers.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._checkpoints: OrderedDict[str, UploadCheckpoint] = OrderedDict()
+
+    def resume(
+        self,
+        upload_id: str,
+        offset: int,
+        *,
+        scan_session_factory: Callable[[], ScanSession | None],
+    ) -> UploadCheckpoint | None:
+        """Return a checkpoint positioned exactly at `offset`, or None if this worker has no such state."""
+        with self._lock:
+            checkpoint = self._checkpoints.get(upload_id)
+            if checkpoint is None and offset == 0:
+                checkpoint = UploadCheckpoint(scan_session=scan_session_factory())
+                self._checkpoints[upload_id] = checkpoint
+                while len(self._checkpoints) > self._max_entries:
+                    self._checkpoints.popitem(last=False)
+            if checkpoint is None or checkpoint.offset != offset:
+                return None
+            self._checkpoints.move_to_end(upload_id)
+            return checkpoint
+
+    def pop(self, upload_id: str) -> UploadCheckpoint | None:
+        with self._lock:
+            return self._checkpoints.pop(upload_id, None)
+
+    def discard(self, upload_id: str) -> None:
+        self.pop(upload_id)
+
+
+upload_checkpoints = UploadCheckpointRegistry()
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.exceptions.exceptions import ExternalServiceError
+
+try:
+    from redis.asyncio import Redis
+    from redis.exceptions import RedisError
+except Exception:  # pragma: no cover - fallback path if redis package is unavailable
+    Redis = None
+
+    class RedisError(Exception):
+        pass
+
+
+logger = logging.getLogger(__name__)
+
+WRITABLE_STATUSES = ("PENDING", "UPLOADING")
+REDIS_RETRY_MIN_SECONDS = 1.0
+REDIS_RETRY_MAX_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class UploadProgressState:
+    user_id: int
+    offset: int
+    status: str
+    max_size_bytes: int
+    file_name: str
+    content_type: str | None
+    updated_at: float
+    writer_until: float = 0.0
+
+    @property
+    def busy(self) -> bool:
+        return self.writer_until > time.time()
+
+
+@dataclass(frozen=True)
+class UploadClaim:
+    """Outcome of a claim: "ok", "missing", "status", "busy" or "offset", with the state it saw."""
+
+    outcome: str
+    offset: int
+    status: str
+
+
+# KEYS[1] session hash; ARGV: ttl, then field/value pairs. Never overwrites live state.
+_SEED = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+  local now = redis.call('TIME')[1]
+  redis.call('HSET', KEYS[1], 'updated_at', now, 'flushed_at', now, 'writer', '', 'writer_until', 0, unpack(ARGV, 2))
+  redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+# ARGV: user_id, expected_offset, token, lease_seconds, ttl, actual_offset ('' when unknown)
+_CLAIM = """
+local s = redis.call('HMGET', KEYS[1], 'user_id', 'offset', 'status', 'writer', 'writer_until')
+if not s[1] or s[1] ~= ARGV[1] then return {'missing', '0', ''} end
+if s[3] ~= 'PENDING' and s[3] ~= 'UPLOADING' then return {'status', s[2], s[3]} end
+local now = tonumber(redis.call('TIME')[1])
+if s[4] ~= '' and tonumber(s[5]) > now then return {'busy', s[2], s[3]} end
+local offset = s[2]
+if ARGV[6] ~= '' and ARGV[6] ~= offset then
+  offset = ARGV[6]
+  redis.call('HSET', KEYS[1], 'offset', offset)
+end
+if offset ~= ARGV[2] then return {'offset', offset, s[3]} end
+redis.call('HSET', KEYS[1], 'status', 'UPLOADING', 'writer', ARGV[3], 'writer_until', now + tonumber(ARGV[4]), 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return {'ok', offset, 'UPLOADING'}
+"""
+
+# ARGV: token, new_offset, ttl, flush_bytes, flush_seconds. Returns 1 when a database flush is due.
+_ADVANCE = """
+local s = redis.call('HMGET', KEYS[1], 'writer', 'flushed_offset', 'flushed_at')
+if s[1] ~= ARGV[1] then return -1 end
+local now = tonumber(redis.call('TIME')[1])
+redis.call('HSET', KEYS[1], 'offset', ARGV[2], 'writer', '', 'writer_until', 0, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+if tonumber(ARGV[2]) - tonumber(s[2]) >= tonumber(ARGV[4]) or now - tonumber(s[3]) >= tonumber(ARGV[5]) then
+  return 1
+end
+return 0
+"""
+
+# ARGV: token, lease_seconds (0 releases the claim), offset reached ('' when unchanged)
+_RENEW = """
+if redis.call('HGET', KEYS[1], 'writer') ~= ARGV[1] then return 0 end
+if tonumber(ARGV[2]) > 0 then
+  redis.call('HSET', KEYS[1], 'writer_until', tonumber(redis.call('TIME')[1]) + tonumber(ARGV[2]))
+else
+  redis.call('HSET', KEYS[1], 'writer', '', 'writer_until', 0)
+end
+if ARGV[3] ~= '' then
+  redis.call('HSET', KEYS[1], 'offset', ARGV[3])
+end
+return 1
+"""
+
+# ARGV: offset
+_MARK_FLUSHED = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+  redis.call('HSET', KEYS[1], 'flushed_offset', ARGV[1], 'flushed_at', redis.call('TIME')[1])
+end
+return 1
+"""
+
+
+class UploadProgressStore:
+    """
+    Hot state of stream upload sessions (owner, offset, status), so a PATCH needs no row lock.
+    A request claims the session with an atomic compare-and-set on the offset, which also takes a
+    writer lease that keeps concurrent appends out; the lease is renewed while the body streams and
+    expires if the worker dies. The `upload_sessions` row is only written at milestones (every
+    PACKAGE_UPLOAD_PROGRESS_FLUSH_BYTES / _SECONDS), and by the service on completion and failure.
+
+    State lives in Redis. The in-process stand-in keeps the same semantics and is only used while
+    Redis is unreachable in a single-worker deployment (and in tests); with WEB_CONCURRENCY > 1 the
+    store fails closed instead, since per-process state would split offsets and leases between
+    workers. Redis is retried with exponential backoff, and on reconnect the in-process state is
+    handed over. Lost state is harmless: it is re-seeded from the row and the bytes in storage.
+    """
+
+    KEY_PREFIX = "upload:progress:"
+
+    def __init__(self) -> None:
+        self._redis = None
+        self._scripts: dict = {}
+        self._retry_at = 0.0
+        self._retry_delay = 0.0
+        self._connect_lock: asyncio.Lock | None = None
+        self._lock = threading.Lock()
+        self._local: dict[str, dict] = {}
+
+    async def _get_redis(self):
+        """The Redis client, or None while it is unreachable and the in-process stand-in may be used."""
+        if self._redis is not None:
+            return self._redis
+        if Redis is not None and time.monotonic() >= self._retry_at:
+            if self._connect_lock is None:
+                self._connect_lock = asyncio.Lock()
+            # One reconnect at a time; the in-process state is only handed over once.
+            async with self._connect_lock:
+                if self._redis is None and time.monotonic() >= self._retry_at:
+                    await self._connect()
+        if self._redis is None and settings.WEB_CONCURRENCY > 1:
+            raise ExternalServiceError("Upload progress store unavailable: Redis is required with multiple workers")
+        return self._redis
+
+    async def _connect(self) -> None:
+        client = Redis.from_url(settings.REDIS_URL, decode_responses=True, socket_connect_timeout=2)
+        try:
+            await client.ping()
+            scripts = {
+                name: client.register_script(source)
+                for name, source in (
+                    ("seed", _SEED),
+                    ("claim", _CLAIM),
+                    ("advance", _ADVANCE),
+                    ("renew", _RENEW),
+                    ("mark_flushed", _MARK_FLUSHED),
+                )
+            }
+            await self._hand_over(scripts["seed"])
+        except Exception as exc:
+            await client.aclose()
+            self._retry_delay = min(REDIS_RETRY_MAX_SECONDS, max(REDIS_RETRY_MIN_SECONDS, self._retry_delay * 2))
+            self._retry_at = time.monotonic() + self._retry_delay
+            logger.warning(
+                "Redis unavailable for upload progress (retrying in %.0fs): %s", self._retry_delay, exc
+            )
+            return
+        if self._retry_delay:
+            logger.info("Redis reachable again for upload progress; in-process state handed over")
+        self._redis, self._scripts = client, scripts
+        self._retry_at = self._retry_delay = 0.0
+
+    async def _hand_over(self, seed) -> None:
+        """Copy in-process sessions (leases included) into Redis, keeping any state already there."""
+        with self._lock:
+            local = {upload_id: dict(fields) for upload_id, fields in self._local.items()}
+        for upload_id, fields in local.items():
+            pairs = [item for name, value in fields.items() for item in (name, "" if value is None else value)]
+            await seed(keys=[self.KEY_PREFIX + upload_id], args=[self._ttl(), *pairs])
+        with self._lock:
+            for upload_id in local:
+                self._local.pop(upload_id, None)
+
+    async def _run(self, name: str, upload_id: str, *args):
+        try:
+            return await self._scripts[name](keys=[self.KEY_PREFIX + upload_id], args=list(args))
+        except RedisError as exc:
+            raise ExternalServiceError(f"Upload progress store unavailable: {exc}") from exc
+
+    @staticmethod
+    def _ttl() -> int:
+        return max(60, settings.UPLOAD_SESSION_IDLE_TTL_SECONDS)
+
+    @staticmethod
+    def _to_state(fields: dict) -> UploadProgressState:
+        return UploadProgressState(
+            user_id=int(fields["user_id"]),
+            offset=int(fields["offset"]),
+            status=fields["status"],
+            max_size_bytes=int(fields["max_size_bytes"]),
+            file_name=fields["file_name"],
+            content_type=fields["content_type"] or None,
+            updated_at=float(fields["updated_at"]),
+            writer_until=float(fields["writer_until"]) if fields["writer"] else 0.0,
+        )
+
+    async def get(self, upload_id: str) -> UploadProgressState | None:
+        redis_client = await self._get_redis()
+        if redis_client is not None:
+            try:
+                fields = await redis_client.hgetall(self.KEY_PREFIX + upload_id)
+            except RedisError as exc:
+                raise ExternalServiceError(f"Upload progress store unavailable: {exc}") from exc
+        else:
+            with self._lock:
+                fields = dict(self._local.get(upload_id) or {})
+        return self._to_state(fields) if fields else None
+
+    async def seed(self, upload_id: str, state: UploadProgressState) -> UploadProgressState:
+        """Start tracking a session unless another request already did; returns the live state."""
+        fields = {
+            "user_id": state.user_id,
+            "offset": state.offset,
+            "flushed_offset": state.offset,
+            "status": state.status,
+            "max_size_bytes": state.max_size_bytes,
+            "file_name": state.file_name,
+            "content_type": state.content_type or "",
+        }
+        if await self._get_redis() is not None:
+            await self._run("seed", upload_id, self._ttl(), *(item for pair in fields.items() for item in pair))
+        else:
+            now = time.time()
+            with self._lock:
+                self._local.setdefault(
+                    upload_id,
+                    {**fields, "updated_at": now, "flushed_at": now, "writer": "", "writer_until": 0.0},
+                )
+        return await self.get(upload_id) or state
+
+    async def claim(
+        self,
+        upload_id: str,
+        *,
+        user_id: int,
+        expected_offset: int,
+        token: str,
+        actual_offset: int | None = None,
+    ) -> UploadClaim:
+        """
+        Take the writer lease if the session is writable, idle and at `expected_offset`.
+        `actual_offset` (the size found in storage) replaces a stale tracked offset first.
+        """
+        lease = settings.PACKAGE_UPLOAD_WRITER_LEASE_SECONDS
+        if await self._get_redis() is not None:
+            outcome, offset, status = await self._run(
+                "claim",
+                upload_id,
+                user_id,
+                expected_offset,
+                token,
+                lease,
+                self._ttl(),
+                "" if actual_offset is None else actual_offset,
+            )
+            return UploadClaim(outcome=outcome, offset=int(offset), status=status)
+
+        now = time.time()
+        with self._lock:
+            fields = self._local.get(upload_id)
+            if fields is None or int(fields["user_id"]) != user_id:
+                return UploadClaim(outcome="missing", offset=0, status="")
+            if fields["status"] not in WRITABLE_STATUSES:
+                return UploadClaim(outcome="status", offset=fields["offset"], status=fields["status"])
+            if fields["writer"] and fields["writer_until"] > now:
+                return UploadClaim(outcome="busy", offset=fields["offset"], status=fields["status"])
+            if actual_offset is not None:
+                fields["offset"] = actual_offset
+            if fields["offset"] != expected_offset:
+                return UploadClaim(outcome="offset", offset=fields["offset"], status=fields["status"])
+            fields.update(status="UPLOADING", writer=token, writer_until=now + lease, updated_at=now)
+            return UploadClaim(outcome="ok", offset=expected_offset, status="UPLOADING")
+
+    async def renew(self, upload_id: str, token: str) -> bool:
+        return await self._renew(upload_id, token, settings.PACKAGE_UPLOAD_WRITER_LEASE_SECONDS)
+
+    async def release(self, upload_id: str, token: str, offset: int | None = None) -> None:
+        """Drop the writer lease without a milestone, recording the `offset` storage reached if given."""
+        await self._renew(upload_id, token, 0, offset)
+
+    async def _renew(self, upload_id: str, token: str, lease: int, offset: int | None = None) -> bool:
+        if await self._get_redis() is not None:
+            return bool(await self._run("renew", upload_id, token, lease, "" if offset is None else offset))
+        with self._lock:
+            fields = self._local.get(upload_id)
+            if fields is None or fields["writer"] != token:
+                return False
+            if lease > 0:
+                fields["writer_until"] = time.time() + lease
+            else:
+                fields.update(writer="", writer_until=0.0)
+            if offset is not None:
+                fields["offset"] = offset
+            return True
+
+    async def advance(self, upload_id: str, token: str, offset: int) -> bool:
+        """Record the new offset and release the lease; True when the session row is due a flush."""
+        flush_bytes = settings.PACKAGE_UPLOAD_PROGRESS_FLUSH_BYTES
+        flush_seconds = settings.PACKAGE_UPLOAD_PROGRESS_FLUSH_SECONDS
+        if await self._get_redis() is not None:
+            result = await self._run("advance", upload_id, token, offset, self._ttl(), flush_bytes, flush_seconds)
+        else:
+            now = time.time()
+            with self._lock:
+                fields = self._local.get(upload_id)
+                if fields is None or fields["writer"] != token:
+                    result = -1
+                else:
+                    fields.update(offset=offset, writer="", writer_until=0.0, updated_at=now)
+                    due = offset - fields["flushed_offset"] >= flush_bytes or now - fields["flushed_at"] >= flush_seconds
+                    result = 1 if due else 0
+        if result < 0:
+            logger.warning("Upload %s lost its writer lease before the append finished", upload_id)
+        return result > 0
+
+    async def mark_flushed(self, upload_id: str, offset: int) -> None:
+        if await self._get_redis() is not None:
+            await self._run("mark_flushed", upload_id, offset)
+            return
+        with self._lock:
+            fields = self._local.get(upload_id)
+            if fields is not None:
+                fields.update(flushed_offset=offset, flushed_at=time.time())
+
+    async def discard(self, upload_id: str) -> None:
+        """Forget a session whose row has taken over (completed, failed, expired or re-seedable)."""
+        redis_client = await self._get_redis()
+        if redis_client is not None:
+            try:
+                await redis_client.delete(self.KEY_PREFIX + upload_id)
+            except RedisError as exc:
+                raise ExternalServiceError(f"Upload progress store unavailable: {exc}") from exc
+            return
+        with self._lock:
+            self._local.pop(upload_id, None)
+
+
+upload_progress = UploadProgressStore()
@@ -9,10 +9,15 @@ from app.exceptions.handlers import register_exception_handlers
 from app.core.config import settings
 from app.core.audit_middleware import AuditMiddleware
 from app.core.logging_setup import configure_logging
-from app.database.db_setup import SessionLocal
+from app.database.db_setup import SessionLocal, async_engine
+from app.infrastructure.download_metadata_cache import download_metadata_cache
+from app.infrastructure.storage.object_storage import close_shared_http_client
 from app.database.initialize_db import init_db
 from app.services.superuser_seeder import seed_superuser
 from app.services.email_service.verification_recovery import run_verification_recovery_loop
+from app.services.download_counter_flush import run_download_counter_flush_loop
+from app.services.storage_scrubber import run_storage_scrubber_loop
+from app.services.upload_reaper import run_upload_reaper_loop
 
 from app.api.v1.users import router as user_router
 from app.api.v1.auth import router as auth_router
@@ -20,6 +25,7 @@ from app.api.v1.support_chat import router as support_chat_router
 from app.api.v1.projects import router as project_router
 from app.api.v1.resources import router as resource_router
 from app.api.v1.software_packages import router as software_package_router
+from app.api.v1.tus_uploads import router as tus_upload_router
 from app.api.v1.admin import router as admin_router
 from app.api.v1.analytics import router as analytics_router
 
@@ -65,6 +71,23 @@ async def startup():
               run_verification_recovery_loop(app.state.email_recovery_stop_event)
           )
           logging.info("[startup] Verification email recovery loop started.")
+      download_metadata_cache.start_listener()
+      app.state.download_counter_stop_event = asyncio.Event()
+      app.state.download_counter_task = asyncio.create_task(
+          run_download_counter_flush_loop(app.state.download_counter_stop_event)
+      )
+      if settings.UPLOAD_REAPER_ENABLED:
+          app.state.upload_reaper_stop_event = asyncio.Event()
+          app.state.upload_reaper_task = asyncio.create_task(
+              run_upload_reaper_loop(app.state.upload_reaper_stop_event)
+          )
+          logging.info("[startup] Upload reaper loop started.")
+      if settings.STORAGE_SCRUB_ENABLED:
+          app.state.storage_scrubber_stop_event = asyncio.Event()
+          app.state.storage_scrubber_task = asyncio.create_task(
+              run_storage_scrubber_loop(app.state.storage_scrubber_stop_event)
+          )
+          logging.info("[startup] Storage scrubber loop started.")
 
 
 @app.on_event("shutdown")
@@ -75,6 +98,26 @@ async def shutdown():
         stop_event.set()
         await recovery_task
         logging.info("[shutdown] Verification email recovery loop stopped.")
+    counter_stop_event = getattr(app.state, "download_counter_stop_event", None)
+    counter_task = getattr(app.state, "download_counter_task", None)
+    if counter_stop_event and counter_task:
+        counter_stop_event.set()
+        await counter_task
+    reaper_stop_event = getattr(app.state, "upload_reaper_stop_event", None)
+    reaper_task = getattr(app.state, "upload_reaper_task", None)
+    if reaper_stop_event and reaper_task:
+        reaper_stop_event.set()
+        await reaper_task
+        logging.info("[shutdown] Upload reaper loop stopped.")
+    scrubber_stop_event = getattr(app.state, "storage_scrubber_stop_event", None)
+    scrubber_task = getattr(app.state, "storage_scrubber_task", None)
+    if scrubber_stop_event and scrubber_task:
+        scrubber_stop_event.set()
+        await scrubber_task
+        logging.info("[shutdown] Storage scrubber loop stopped.")
+    download_metadata_cache.stop_listener()
+    await close_shared_http_client()
+    await async_engine.dispose()
      
 
 
@@ -98,6 +141,7 @@ app.include_router(user_router)
 app.include_router(support_chat_router)
 app.include_router(project_router)
 app.include_router(resource_router)
+app.include_router(tus_upload_router)
 app.include_router(software_package_router)
 app.include_router(admin_router)
 app.include_router(analytics_router)
@@ -19,6 +19,9 @@ class FileBlob(Base):
     size_bytes: Mapped[int] = mapped_column(nullable=False)
     storage_key: Mapped[str] = mapped_column(String(600), nullable=False, unique=True)
     reference_count: Mapped[int] = mapped_column(nullable=False, default=1)
+    last_verified_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    quarantined_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    quarantine_reason: Mapped[str | None] = mapped_column(String(255), nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, String, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.db_setup import Base
+
+
+class UploadPart(Base):
+    __tablename__ = "upload_parts"
+    __table_args__ = (
+        UniqueConstraint("upload_id", "part_number", name="uq_upload_parts_upload_part"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    upload_id: Mapped[str] = mapped_column(ForeignKey("upload_sessions.id"), nullable=False, index=True)
+    part_number: Mapped[int] = mapped_column(nullable=False)
+    size_bytes: Mapped[int] = mapped_column(nullable=False)
+    etag: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # Set while a request is writing the part; the part counts as missing until it is cleared.
+    writer_token: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    # Bumped on every rewrite so completion can detect a part that changed underneath it.
+    revision: Mapped[int] = mapped_column(nullable=False, default=1)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, String, Text, func
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, LargeBinary, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database.db_setup import Base
@@ -10,6 +10,9 @@ from app.database.db_setup import Base
 
 class UploadSession(Base):
     __tablename__ = "upload_sessions"
+    __table_args__ = (
+        Index("ix_upload_sessions_status_updated_at", "status", "updated_at"),
+    )
 
     id: Mapped[str] = mapped_column(String(64), primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
@@ -23,6 +26,14 @@ class UploadSession(Base):
     content_type: Mapped[str | None] = mapped_column(String(120), nullable=True)
     bytes_received: Mapped[int] = mapped_column(nullable=False, default=0)
     max_size_bytes: Mapped[int] = mapped_column(nullable=False)
+    upload_mode: Mapped[str] = mapped_column(String(16), nullable=False, default="stream")
+    total_size_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    part_size_bytes: Mapped[int | None] = mapped_column(nullable=True)
+    expected_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    expected_size_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    reserved_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    hash_state: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    hash_state_offset: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     status: Mapped[str] = mapped_column(String(24), nullable=False, default="PENDING")
     error_message: Mapped[str | None] = mapped_column(String(500), nullable=True)
     completed_file_version_id: Mapped[int | None] = mapped_column(ForeignKey("file_versions.id"), nullable=True)
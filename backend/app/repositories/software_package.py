@@ -141,9 +141,6 @@ class SoftwarePackageRepo:
         stmt = select(FileVersion).where(FileVersion.package_id == package_id)
         return self.db.execute(stmt).scalars().all()
 
-    def increment_file_version_download_count(self, version_row: FileVersion) -> None:
-        version_row.download_count += 1
-
     def get_total_uploaded_bytes_for_user(self, user_id: int) -> int:
         stmt = (
             select(func.coalesce(func.sum(FileVersion.size_bytes), 0))
@@ -0,0 +1,511 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, case, delete, exists, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.file_blob import FileBlob
+from app.models.file_version import FileVersion
+from app.models.job_cursor import JobCursor
+from app.models.software_package import SoftwarePackage
+from app.models.upload_part import UploadPart
+from app.models.upload_session import UploadSession
+from app.models.user_storage_usage import UserStorageUsage
+
+
+class AsyncSoftwarePackageRepo:
+    """Async counterpart of SoftwarePackageRepo for the upload/download request paths."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_package_by_id(self, package_id: int) -> Optional[SoftwarePackage]:
+        return await self.db.get(SoftwarePackage, package_id)
+
+    async def get_package_by_owner_and_name(self, owner_id: int, name: str) -> Optional[SoftwarePackage]:
+        stmt = select(SoftwarePackage).where(
+            and_(SoftwarePackage.owner_id == owner_id, SoftwarePackage.name == name)
+        )
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def upsert_package(
+        self,
+        *,
+        owner_id: int,
+        name: str,
+        description: str,
+        category: str,
+        language: str,
+        is_public: bool,
+        latest_version: str,
+    ) -> SoftwarePackage:
+        package = await self.get_package_by_owner_and_name(owner_id=owner_id, name=name)
+        if package:
+            package.description = description
+            package.category = category
+            package.language = language
+            package.is_public = is_public
+            package.latest_version = latest_version
+            return package
+        package = SoftwarePackage(
+            owner_id=owner_id,
+            name=name,
+            description=description,
+            category=category,
+            language=language,
+            is_public=is_public,
+            latest_version=latest_version,
+        )
+        self.db.add(package)
+        await self.db.flush()
+        await self.db.refresh(package)
+        return package
+
+    async def get_blob_by_checksum_and_size(self, *, checksum_sha256: str, size_bytes: int) -> Optional[FileBlob]:
+        stmt = select(FileBlob).where(
+            and_(FileBlob.checksum_sha256 == checksum_sha256, FileBlob.size_bytes == size_bytes)
+        )
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def user_can_reference_blob(self, *, blob_id: int, user_id: int) -> bool:
+        stmt = (
+            select(FileVersion.id)
+            .join(SoftwarePackage, SoftwarePackage.id == FileVersion.package_id)
+            .where(
+                and_(
+                    FileVersion.blob_id == blob_id,
+                    or_(SoftwarePackage.owner_id == user_id, SoftwarePackage.is_public.is_(True)),
+                )
+            )
+            .limit(1)
+        )
+        return (await self.db.execute(stmt)).first() is not None
+
+    async def add_blob(self, *, checksum_sha256: str, size_bytes: int, storage_key: str) -> FileBlob:
+        blob = FileBlob(
+            checksum_sha256=checksum_sha256,
+            size_bytes=size_bytes,
+            storage_key=storage_key,
+        )
+        self.db.add(blob)
+        await self.db.flush()
+        await self.db.refresh(blob)
+        return blob
+
+    def increment_blob_refcount(self, blob: FileBlob) -> None:
+        blob.reference_count += 1
+
+    def decrement_blob_refcount(self, blob: FileBlob) -> None:
+        blob.reference_count = max(0, blob.reference_count - 1)
+
+    async def add_file_version(
+        self,
+        *,
+        package_id: int,
+        blob_id: int,
+        file_name: str,
+        content_type: str | None,
+        version: str,
+        size_bytes: int,
+        checksum_sha256: str,
+    ) -> FileVersion:
+        version_row = FileVersion(
+            package_id=package_id,
+            blob_id=blob_id,
+            file_name=file_name,
+            content_type=content_type,
+            version=version,
+            size_bytes=size_bytes,
+            checksum_sha256=checksum_sha256,
+        )
+        self.db.add(version_row)
+        await self.db.flush()
+        await self.db.refresh(version_row)
+        return version_row
+
+    async def get_file_version_for_package(self, *, package_id: int, version_id: int) -> Optional[FileVersion]:
+        stmt = select(FileVersion).where(
+            and_(FileVersion.id == version_id, FileVersion.package_id == package_id)
+        )
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def list_all_file_versions_for_package(self, *, package_id: int) -> list[FileVersion]:
+        stmt = select(FileVersion).where(FileVersion.package_id == package_id)
+        return (await self.db.execute(stmt)).scalars().all()
+
+    async def get_download_metadata(self, *, package_id: int, version_id: int):
+        """
+        Package visibility, the version row, its blob key and quarantine time in one indexed read.
+        Returns None for a missing package; version and key are None when they do not exist.
+        """
+        stmt = (
+            select(SoftwarePackage.is_public, FileVersion, FileBlob.storage_key, FileBlob.quarantined_at)
+            .select_from(SoftwarePackage)
+            .outerjoin(
+                FileVersion,
+                and_(FileVersion.package_id == SoftwarePackage.id, FileVersion.id == version_id),
+            )
+            .outerjoin(FileBlob, FileBlob.id == FileVersion.blob_id)
+            .where(SoftwarePackage.id == package_id)
+        )
+        return (await self.db.execute(stmt)).one_or_none()
+
+    async def add_file_version_download_counts(self, counts: dict[int, int]) -> None:
+        """Apply buffered increments as one UPDATE ... SET download_count = download_count + CASE id ... END."""
+        if not counts:
+            return
+        stmt = (
+            update(FileVersion)
+            .where(FileVersion.id.in_(list(counts)))
+            .values(download_count=FileVersion.download_count + case(counts, value=FileVersion.id, else_=0))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(stmt)
+
+    async def get_total_uploaded_bytes_for_user(self, user_id: int) -> int:
+        stmt = (
+            select(func.coalesce(func.sum(FileVersion.size_bytes), 0))
+            .select_from(FileVersion)
+            .join(SoftwarePackage, SoftwarePackage.id == FileVersion.package_id)
+            .where(SoftwarePackage.owner_id == user_id)
+        )
+        return int((await self.db.execute(stmt)).scalar_one())
+
+    async def get_storage_usage_for_update(self, user_id: int) -> UserStorageUsage:
+        """Lock the user's usage counter row, seeding it from file_versions the first time."""
+        stmt = select(UserStorageUsage).where(UserStorageUsage.user_id == user_id).with_for_update()
+        usage = (await self.db.execute(stmt)).scalar_one_or_none()
+        if usage:
+            return usage
+        try:
+            async with self.db.begin_nested():
+                usage = UserStorageUsage(
+                    user_id=user_id,
+                    used_bytes=await self.get_total_uploaded_bytes_for_user(user_id),
+                    reserved_bytes=0,
+                )
+                self.db.add(usage)
+        except IntegrityError:
+            usage = (await self.db.execute(stmt)).scalar_one()
+        return usage
+
+    async def get_blob_by_id(self, blob_id: int) -> Optional[FileBlob]:
+        return await self.db.get(FileBlob, blob_id)
+
+    async def delete_package_versions(self, package_id: int) -> tuple[int, list[str]]:
+        """
+        Delete every version of a package with set-based statements: one refcount decrement per
+        blob, bulk DELETEs, and DELETE ... RETURNING for the blobs nothing references any more.
+        Returns (bytes freed, storage keys of deleted blobs).
+        """
+        per_blob = (
+            await self.db.execute(
+                select(FileVersion.blob_id, func.count(FileVersion.id), func.sum(FileVersion.size_bytes))
+                .where(FileVersion.package_id == package_id)
+                .group_by(FileVersion.blob_id)
+            )
+        ).all()
+        if not per_blob:
+            return 0, []
+        decrements = {blob_id: count for blob_id, count, _ in per_blob}
+        freed_bytes = sum(size for _, _, size in per_blob)
+        # Serialize with uploads that deduplicate against the same blobs.
+        await self.db.execute(
+            select(FileBlob.id).where(FileBlob.id.in_(list(decrements))).order_by(FileBlob.id).with_for_update()
+        )
+
+        version_ids = select(FileVersion.id).where(FileVersion.package_id == package_id).scalar_subquery()
+        await self.db.execute(
+            update(UploadSession)
+            .where(UploadSession.completed_file_version_id.in_(version_ids))
+            .values(completed_file_version_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(
+            delete(FileVersion)
+            .where(FileVersion.package_id == package_id)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(
+            update(FileBlob)
+            .where(FileBlob.id.in_(list(decrements)))
+            .values(reference_count=FileBlob.reference_count - case(decrements, value=FileBlob.id, else_=0))
+            .execution_options(synchronize_session=False)
+        )
+        # reference_count can drift (see reconcile_blob_reference_counts); never drop a blob that
+        # another package's version still points at, whatever the counter says.
+        released = await self.db.execute(
+            delete(FileBlob)
+            .where(
+                and_(
+                    FileBlob.id.in_(list(decrements)),
+                    FileBlob.reference_count <= 0,
+                    ~exists(select(FileVersion.id).where(FileVersion.blob_id == FileBlob.id)),
+                )
+            )
+            .returning(FileBlob.storage_key)
+            .execution_options(synchronize_session=False)
+        )
+        return freed_bytes, list(released.scalars().all())
+
+    async def delete_package(self, package: SoftwarePackage) -> None:
+        await self.db.delete(package)
+
+    async def create_upload_session(
+        self,
+        *,
+        upload_id: str,
+        user_id: int,
+        package_name: str,
+        package_description: str,
+        package_category: str,
+        package_language: str,
+        package_version: str,
+        is_public: bool,
+        file_name: str,
+        content_type: str | None,
+        max_size_bytes: int,
+        status: str = "PENDING",
+        upload_mode: str = "stream",
+        total_size_bytes: int | None = None,
+        part_size_bytes: int | None = None,
+        expected_sha256: str | None = None,
+        expected_size_bytes: int | None = None,
+        reserved_bytes: int = 0,
+    ) -> UploadSession:
+        session = UploadSession(
+            id=upload_id,
+            user_id=user_id,
+            package_name=package_name,
+            package_description=package_description,
+            package_category=package_category,
+            package_language=package_language,
+            package_version=package_version,
+            is_public=is_public,
+            file_name=file_name,
+            content_type=content_type,
+            max_size_bytes=max_size_bytes,
+            status=status,
+            upload_mode=upload_mode,
+            total_size_bytes=total_size_bytes,
+            part_size_bytes=part_size_bytes,
+            expected_sha256=expected_sha256,
+            expected_size_bytes=expected_size_bytes,
+            reserved_bytes=reserved_bytes,
+        )
+        self.db.add(session)
+        await self.db.flush()
+        await self.db.refresh(session)
+        return session
+
+    async def get_upload_session_for_user(self, *, upload_id: str, user_id: int) -> Optional[UploadSession]:
+        stmt = select(UploadSession).where(
+            and_(UploadSession.id == upload_id, UploadSession.user_id == user_id)
+        )
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def get_upload_session_for_user_for_update(
+        self, *, upload_id: str, user_id: int
+    ) -> Optional[UploadSession]:
+        stmt = (
+            select(UploadSession)
+            .where(and_(UploadSession.id == upload_id, UploadSession.user_id == user_id))
+            .with_for_update()
+        )
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def claim_upload_part(
+        self, *, upload_id: str, part_number: int, token: str, stale_before: datetime
+    ) -> UploadPart | None:
+        """Mark a part as being written by `token`, or return None while another live writer holds it."""
+        stmt = select(UploadPart, UploadPart.updated_at < stale_before).where(
+            and_(UploadPart.upload_id == upload_id, UploadPart.part_number == part_number)
+        )
+        row = (await self.db.execute(stmt)).one_or_none()
+        if row is None:
+            part = UploadPart(upload_id=upload_id, part_number=part_number, size_bytes=0, writer_token=token)
+            self.db.add(part)
+            await self.db.flush()
+            return part
+        part, stale = row
+        if part.writer_token is not None and not stale:
+            return None
+        part.writer_token = token
+        part.size_bytes = 0
+        part.etag = None
+        part.revision += 1
+        return part
+
+    async def complete_upload_part(
+        self, *, upload_id: str, part_number: int, token: str, size_bytes: int, etag: str | None
+    ) -> bool:
+        """Record a written part, unless a later writer has since claimed it."""
+        stmt = select(UploadPart).where(
+            and_(
+                UploadPart.upload_id == upload_id,
+                UploadPart.part_number == part_number,
+                UploadPart.writer_token == token,
+            )
+        )
+        part = (await self.db.execute(stmt)).scalar_one_or_none()
+        if part is None:
+            return False
+        part.size_bytes = size_bytes
+        part.etag = etag
+        part.writer_token = None
+        return True
+
+    async def release_upload_part(self, *, upload_id: str, part_number: int, token: str) -> None:
+        await self.db.execute(
+            delete(UploadPart).where(
+                and_(
+                    UploadPart.upload_id == upload_id,
+                    UploadPart.part_number == part_number,
+                    UploadPart.writer_token == token,
+                )
+            )
+        )
+
+    async def list_upload_parts(self, upload_id: str) -> list[UploadPart]:
+        stmt = select(UploadPart).where(UploadPart.upload_id == upload_id).order_by(UploadPart.part_number)
+        return (await self.db.execute(stmt)).scalars().all()
+
+    async def get_upload_parts_total_bytes(self, upload_id: str) -> int:
+        stmt = select(func.coalesce(func.sum(UploadPart.size_bytes), 0)).where(
+            and_(UploadPart.upload_id == upload_id, UploadPart.writer_token.is_(None))
+        )
+        return int((await self.db.execute(stmt)).scalar_one())
+
+    async def list_idle_upload_sessions_for_update(
+        self, *, statuses: tuple[str, ...], idle_before: datetime, limit: int
+    ) -> list[UploadSession]:
+        stmt = (
+            select(UploadSession)
+            .where(and_(UploadSession.status.in_(statuses), UploadSession.updated_at < idle_before))
+            .order_by(UploadSession.updated_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return (await self.db.execute(stmt)).scalars().all()
+
+    async def delete_upload_parts(self, upload_ids: list[str]) -> None:
+        if upload_ids:
+            await self.db.execute(delete(UploadPart).where(UploadPart.upload_id.in_(upload_ids)))
+
+    async def get_upload_session_ids_with_status(self, upload_ids: list[str], statuses: tuple[str, ...]) -> set[str]:
+        if not upload_ids:
+            return set()
+        stmt = select(UploadSession.id).where(
+            and_(UploadSession.id.in_(upload_ids), UploadSession.status.in_(statuses))
+        )
+        return set((await self.db.execute(stmt)).scalars().all())
+
+    async def reconcile_blob_reference_counts(self, *, apply: bool) -> list[tuple[int, int, int]]:
+        """
+        Compare every blob's reference_count with its file_versions count in one set-based pass.
+        Returns (blob_id, recorded, actual) for drifted blobs; with `apply` they are corrected.
+        """
+        actual = (
+            select(func.count(FileVersion.id)).where(FileVersion.blob_id == FileBlob.id).scalar_subquery()
+        )
+        drift_stmt = select(FileBlob.id, FileBlob.reference_count, actual).where(FileBlob.reference_count != actual)
+        if apply:
+            # Lock drifted rows first so the UPDATE below counts versions committed by writers we waited for.
+            drift_stmt = drift_stmt.with_for_update(of=FileBlob)
+        drift = [tuple(row) for row in (await self.db.execute(drift_stmt)).all()]
+        if apply and drift:
+            await self.db.execute(
+                update(FileBlob)
+                .where(FileBlob.id.in_([blob_id for blob_id, _, _ in drift]))
+                .values(reference_count=actual)
+                .execution_options(synchronize_session=False)
+            )
+        return drift
+
+    async def delete_unreferenced_blobs(self, *, created_before: datetime, apply: bool) -> list[str]:
+        """Blob rows no file version points at (older than `created_before`); deleted with `apply`."""
+        referenced = select(FileVersion.id).where(FileVersion.blob_id == FileBlob.id).exists()
+        stmt = select(FileBlob.id, FileBlob.storage_key).where(
+            and_(~referenced, FileBlob.created_at < created_before)
+        )
+        if apply:
+            stmt = stmt.with_for_update(of=FileBlob, skip_locked=True)
+        rows = (await self.db.execute(stmt)).all()
+        if apply and rows:
+            await self.db.execute(
+                delete(FileBlob)
+                .where(FileBlob.id.in_([blob_id for blob_id, _ in rows]))
+                .execution_options(synchronize_session=False)
+            )
+        return [storage_key for _, storage_key in rows]
+
+    async def list_blob_storage_keys(self, prefix: str) -> list[str]:
+        stmt = select(FileBlob.storage_key).where(FileBlob.storage_key.startswith(prefix, autoescape=True))
+        return list((await self.db.execute(stmt)).scalars().all())
+
+    async def get_referenced_storage_keys(self, storage_keys: list[str]) -> set[str]:
+        if not storage_keys:
+            return set()
+        stmt = select(FileBlob.storage_key).where(FileBlob.storage_key.in_(storage_keys))
+        return set((await self.db.execute(stmt)).scalars().all())
+
+    async def list_blobs_to_scrub(
+        self, *, after_id: int, verified_before: datetime, limit: int
+    ) -> list[tuple[int, str, int, str]]:
+        """Next unquarantined blobs after `after_id` in id order that were not verified since `verified_before`."""
+        stmt = (
+            select(FileBlob.id, FileBlob.checksum_sha256, FileBlob.size_bytes, FileBlob.storage_key)
+            .where(
+                and_(
+                    FileBlob.id > after_id,
+                    FileBlob.quarantined_at.is_(None),
+                    or_(FileBlob.last_verified_at.is_(None), FileBlob.last_verified_at < verified_before),
+                )
+            )
+            .order_by(FileBlob.id)
+            .limit(limit)
+        )
+        return [tuple(row) for row in (await self.db.execute(stmt)).all()]
+
+    async def mark_blobs_verified(self, blob_ids: list[int], verified_at: datetime) -> None:
+        if not blob_ids:
+            return
+        await self.db.execute(
+            update(FileBlob)
+            .where(FileBlob.id.in_(blob_ids))
+            .values(last_verified_at=verified_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def quarantine_blob(self, *, blob_id: int, reason: str, quarantined_at: datetime) -> list[int]:
+        """Quarantine a blob and return the ids of the packages with versions stored in it."""
+        await self.db.execute(
+            update(FileBlob)
+            .where(FileBlob.id == blob_id)
+            .values(quarantined_at=quarantined_at, quarantine_reason=reason[:255])
+            .execution_options(synchronize_session=False)
+        )
+        stmt = select(FileVersion.package_id).where(FileVersion.blob_id == blob_id).distinct()
+        return list((await self.db.execute(stmt)).scalars().all())
+
+    async def clear_blob_quarantine(self, blob_id: int, verified_at: datetime) -> None:
+        await self.db.execute(
+            update(FileBlob)
+            .where(FileBlob.id == blob_id)
+            .values(quarantined_at=None, quarantine_reason=None, last_verified_at=verified_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_job_cursor(self, name: str) -> int:
+        cursor = await self.db.get(JobCursor, name)
+        return cursor.position if cursor else 0
+
+    async def set_job_cursor(self, name: str, position: int) -> None:
+        cursor = await self.db.get(JobCursor, name)
+        if cursor is None:
+            self.db.add(JobCursor(name=name, position=position))
+        else:
+            cursor.position = position
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -15,12 +16,28 @@ class UploadSessionInitRequest(BaseModel):
     content_type: str | None = Field(default=None, max_length=120)
     is_public: bool = True
     max_size_bytes: int | None = None
+    upload_mode: Literal["stream", "multipart"] = "stream"
+    total_size_bytes: int | None = Field(default=None, gt=0)
+    expected_sha256: str | None = Field(default=None, pattern=r"^[0-9a-fA-F]{64}$")
+    expected_size_bytes: int | None = Field(default=None, gt=0)
 
 
 class UploadSessionInitResponse(BaseModel):
     upload_id: str
     offset: int
     max_size_bytes: int
+    upload_mode: str = "stream"
+    part_size_bytes: int | None = None
+    part_count: int | None = None
+    status: str = "PENDING"
+    file_version_id: int | None = None
+
+
+class UploadPartResponse(BaseModel):
+    upload_id: str
+    part_number: int
+    size_bytes: int
+    bytes_received: int
 
 
 class UploadAppendResponse(BaseModel):
@@ -0,0 +1,181 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, TypeVar
+
+from app.core.config import settings
+from app.core.unit_of_work import AsyncUnitOfWork
+from app.database.db_setup import AsyncSessionLocal
+from app.infrastructure.storage.base import StorageBackend
+from app.infrastructure.storage.factory import build_storage_backend
+from app.repositories.software_package_async import AsyncSoftwarePackageRepo
+
+T = TypeVar("T")
+
+BLOB_KEY_PREFIX = "blobs/"
+# Storage keys are blobs/<first two hex digits>/<sha256>; the sweep walks one shard at a time.
+BLOB_KEY_SHARDS = [f"{BLOB_KEY_PREFIX}{value:02x}/" for value in range(256)]
+
+
+@dataclass
+class BlobGcReport:
+    dry_run: bool
+    refcounts_drifted: int = 0
+    refcount_drift_sample: list[dict] = field(default_factory=list)
+    unreferenced_blob_rows: int = 0
+    objects_scanned: int = 0
+    unreferenced_objects: int = 0
+    unreferenced_bytes: int = 0
+    unreferenced_objects_deleted: int = 0
+    unreferenced_objects_in_grace: int = 0
+    missing_objects: int = 0
+    missing_object_sample: list[str] = field(default_factory=list)
+    delete_failures: int = 0
+    elapsed_ms: int = 0
+
+
+async def _reconcile_database(report: BlobGcReport, *, blob_grace_cutoff: datetime) -> None:
+    async with AsyncSessionLocal() as async_db:
+        uow = AsyncUnitOfWork(async_db)
+        async with uow.read_only() if report.dry_run else uow:
+            repo = uow.software_package_repo
+            drift = await repo.reconcile_blob_reference_counts(apply=not report.dry_run)
+            report.refcounts_drifted = len(drift)
+            report.refcount_drift_sample = [
+                {"blob_id": blob_id, "recorded": recorded, "actual": actual}
+                for blob_id, recorded, actual in drift[: settings.BLOB_GC_REPORT_SAMPLE_SIZE]
+            ]
+            # Their objects become unreferenced and are picked up by the sweep below.
+            dropped = await repo.delete_unreferenced_blobs(
+                created_before=blob_grace_cutoff, apply=not report.dry_run
+            )
+            report.unreferenced_blob_rows = len(dropped)
+
+
+async def _read(query: Callable[[AsyncSoftwarePackageRepo], Awaitable[T]]) -> T:
+    async with AsyncSessionLocal() as async_db:
+        uow = AsyncUnitOfWork(async_db)
+        async with uow.read_only():
+            return await query(uow.software_package_repo)
+
+
+async def _sweep_shard(
+    storage: StorageBackend, shard: str, report: BlobGcReport, *, object_grace_cutoff: datetime
+) -> None:
+    listed: dict[str, tuple[datetime, int]] = {}
+    async for storage_key, modified, size in storage.list_objects(shard):
+        listed[storage_key] = (modified, size)
+    report.objects_scanned += len(listed)
+    referenced = set(await _read(lambda repo: repo.list_blob_storage_keys(shard)))
+
+    for storage_key in sorted(referenced - listed.keys()):
+        report.missing_objects += 1
+        if len(report.missing_object_sample) < settings.BLOB_GC_REPORT_SAMPLE_SIZE:
+            report.missing_object_sample.append(storage_key)
+
+    unreferenced = []
+    for storage_key in sorted(listed.keys() - referenced):
+        modified, size = listed[storage_key]
+        report.unreferenced_objects += 1
+        report.unreferenced_bytes += size
+        if modified >= object_grace_cutoff:
+            # Possibly promoted by an upload whose blob row is not committed yet.
+            report.unreferenced_objects_in_grace += 1
+            continue
+        unreferenced.append(storage_key)
+    if report.dry_run or not unreferenced:
+        return
+
+    # An upload may have deduplicated against one of these objects since the listing.
+    still_referenced = await _read(lambda repo: repo.get_referenced_storage_keys(unreferenced))
+    for storage_key in unreferenced:
+        if storage_key in still_referenced:
+            continue
+        try:
+            await storage.delete_object(storage_key)
+            report.unreferenced_objects_deleted += 1
+        except Exception as exc:
+            report.delete_failures += 1
+            logging.warning("[blob_gc] failed to delete storage_key=%s: %s", storage_key, exc)
+
+
+async def delete_released_objects(storage_keys: list[str], *, storage: StorageBackend | None = None) -> int:
+    """
+    Delete the objects of blob rows that were just dropped (e.g. by a package delete).
+    Keys an upload has deduplicated into a new blob row since then are kept; anything that
+    fails here is left for the sweep in `collect_blob_garbage`.
+    """
+    if not storage_keys:
+        return 0
+    storage = storage or build_storage_backend()
+    try:
+        reused = await _read(lambda repo: repo.get_referenced_storage_keys(storage_keys))
+    except Exception as exc:
+        logging.warning("[blob_gc] could not re-check %s released storage key(s): %s", len(storage_keys), exc)
+        return 0
+    deleted = 0
+    for storage_key in storage_keys:
+        if storage_key in reused:
+            continue
+        try:
+            await storage.delete_object(storage_key)
+            deleted += 1
+        except Exception as exc:
+            logging.warning("[blob_gc] failed to delete storage_key=%s: %s", storage_key, exc)
+    return deleted
+
+
+async def collect_blob_garbage(*, dry_run: bool = True, storage: StorageBackend | None = None) -> BlobGcReport:
+    """
+    Mark and sweep for content-addressed blobs.
+    Reference counts are recomputed from file_versions in one set-based pass, blob rows nothing
+    points at are dropped, then storage is listed shard by shard: objects without a blob row and
+    older than the grace period are deleted, and blob rows without an object are reported.
+    With `dry_run`, nothing is changed and the report shows what would be done.
+    """
+    storage = storage or build_storage_backend()
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    grace_cutoff = now - timedelta(seconds=settings.BLOB_GC_GRACE_SECONDS)
+    report = BlobGcReport(dry_run=dry_run)
+
+    await _reconcile_database(report, blob_grace_cutoff=grace_cutoff)
+    for shard in BLOB_KEY_SHARDS:
+        await _sweep_shard(storage, shard, report, object_grace_cutoff=grace_cutoff)
+
+    report.elapsed_ms = int((time.perf_counter() - started) * 1000)
+    logging.info(
+        "[blob_gc] dry_run=%s refcounts_fixed=%s blob_rows_dropped=%s scanned=%s unreferenced=%s deleted=%s "
+        "missing=%s elapsed_ms=%s",
+        dry_run,
+        report.refcounts_drifted,
+        report.unreferenced_blob_rows,
+        report.objects_scanned,
+        report.unreferenced_objects,
+        report.unreferenced_objects_deleted,
+        report.missing_objects,
+        report.elapsed_ms,
+    )
+    if report.missing_objects:
+        logging.error(
+            "[blob_gc] %s blob(s) reference missing objects, e.g. %s",
+            report.missing_objects,
+            report.missing_object_sample,
+        )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reconcile blob refcounts and sweep unreferenced package objects.")
+    parser.add_argument("--apply", action="store_true", help="Fix refcounts and delete garbage (default: dry run).")
+    args = parser.parse_args()
+    report = asyncio.run(collect_blob_garbage(dry_run=not args.apply))
+    print(json.dumps(asdict(report), indent=2))
+
+
+if __name__ == "__main__":
+    main()
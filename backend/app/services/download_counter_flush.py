@@ -0,0 +1,35 @@
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.unit_of_work import AsyncUnitOfWork
+from app.database.db_setup import AsyncSessionLocal
+from app.infrastructure.download_counter import download_counter
+
+
+async def apply_download_counts(counts: dict[int, int]) -> None:
+    async with AsyncSessionLocal() as session:
+        uow = AsyncUnitOfWork(session)
+        async with uow:
+            await uow.software_package_repo.add_file_version_download_counts(counts)
+
+
+async def flush_download_counts_once() -> int:
+    flushed = await download_counter.flush(apply_download_counts)
+    if flushed:
+        logging.info("[download_counter] Flushed %s download(s).", flushed)
+    return flushed
+
+
+async def run_download_counter_flush_loop(stop_event: asyncio.Event) -> None:
+    while not stop_event.is_set():
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=settings.DOWNLOAD_COUNTER_FLUSH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+        # Runs once more after stop is requested so buffered counts are not lost on shutdown.
+        try:
+            await flush_download_counts_once()
+        except Exception as exc:
+            logging.exception("[download_counter] Flush failed, counts kept for the next run: %s", exc)
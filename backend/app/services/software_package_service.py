@@ -1,21 +1,36 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import math
 import time
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import AsyncIterable
 
 from sqlalchemy.exc import IntegrityError
 
 from app.core.config import settings
-from app.core.unit_of_work import UnitOfWork
+from app.core.unit_of_work import AsyncUnitOfWork, UnitOfWork
 from app.domain.software_package import FileVersionDraft, SoftwarePackageDraft
-from app.exceptions.exceptions import ConflictError, NotFoundError, PermissionError, ValidationError
+from app.exceptions.exceptions import (
+    ConflictError,
+    ExternalServiceError,
+    NotFoundError,
+    PermissionError,
+    ValidationError,
+)
 from app.infrastructure.checksum import StreamingSHA256
-from app.infrastructure.security.malware_scanner import MalwareScanner, NoOpMalwareScanner
+from app.infrastructure.download_counter import download_counter
+from app.infrastructure.download_metadata_cache import download_metadata_cache
+from app.infrastructure.signed_download import build_internal_download_url
+from app.infrastructure.security.malware_scanner import MalwareScanner, NoOpMalwareScanner, ScanSession
 from app.infrastructure.storage.base import StorageBackend
+from app.infrastructure.stream_tee import tee_stream
+from app.infrastructure.upload_checkpoint import UploadCheckpoint, upload_checkpoints
+from app.infrastructure.upload_progress import UploadProgressState, upload_progress
 
 
 @dataclass(frozen=True)
@@ -23,6 +38,20 @@ class UploadInitResult:
     upload_id: str
     offset: int
     max_size_bytes: int
+    upload_mode: str = "stream"
+    total_size_bytes: int | None = None
+    part_size_bytes: int | None = None
+    part_count: int | None = None
+    status: str = "PENDING"
+    file_version_id: int | None = None
+
+
+@dataclass(frozen=True)
+class UploadPartResult:
+    upload_id: str
+    part_number: int
+    size_bytes: int
+    bytes_received: int
 
 
 @dataclass(frozen=True)
@@ -32,13 +61,27 @@ class UploadAppendResult:
     status: str
 
 
+@dataclass(frozen=True)
+class UploadProgress:
+    upload_id: str
+    offset: int
+    length: int | None
+    upload_mode: str
+    status: str
+    updated_at: datetime
+    file_version_id: int | None = None
+
+
 @dataclass(frozen=True)
 class DownloadTicket:
+    version_id: int
     storage_key: str
     file_name: str
     content_type: str | None
     file_size_bytes: int
     checksum_sha256: str
+    last_modified: datetime
+    internal_url: str | None = None
 
 
 @dataclass(frozen=True)
@@ -81,11 +124,13 @@ class SoftwarePackageService:
         self,
         uow: UnitOfWork,
         storage: StorageBackend,
+        async_uow: AsyncUnitOfWork | None = None,
         scanner: MalwareScanner | None = None,
         max_file_size_bytes: int = settings.PACKAGE_UPLOAD_MAX_SIZE_BYTES,
         user_quota_bytes: int = settings.PACKAGE_USER_QUOTA_BYTES,
     ):
         self.uow = uow
+        self.async_uow = async_uow
         self.storage = storage
         self.scanner = scanner or NoOpMalwareScanner()
         self.max_file_size_bytes = max_file_size_bytes
@@ -99,7 +144,7 @@ class SoftwarePackageService:
     def _build_storage_key(self, checksum_sha256: str) -> str:
         return f"blobs/{checksum_sha256[:2]}/{checksum_sha256}"
 
-    def init_upload_session(
+    async def init_upload_session(
         self,
         *,
         user_id: int,
@@ -112,6 +157,10 @@ class SoftwarePackageService:
         file_name: str,
         content_type: str | None,
         max_size_bytes: int | None = None,
+        upload_mode: str = "stream",
+        total_size_bytes: int | None = None,
+        expected_sha256: str | None = None,
+        expected_size_bytes: int | None = None,
     ) -> UploadInitResult:
         package_draft = SoftwarePackageDraft(
             owner_id=user_id,
@@ -135,9 +184,50 @@ class SoftwarePackageService:
         if effective_max > self.max_file_size_bytes:
             raise ValidationError("Requested max size exceeds server limit")
 
+        expected_sha256 = (expected_sha256 or "").strip().lower() or None
+        if (expected_sha256 is None) != (expected_size_bytes is None):
+            raise ValidationError("expected_sha256 and expected_size_bytes must be provided together")
+        if expected_sha256 is not None:
+            FileVersionDraft(
+                version=package_draft.version,
+                checksum_sha256=expected_sha256,
+                size_bytes=expected_size_bytes,
+            ).validate()
+            if expected_size_bytes > effective_max:
+                raise ValidationError("Upload exceeds maximum allowed file size")
+            if total_size_bytes is not None and total_size_bytes != expected_size_bytes:
+                raise ValidationError("total_size_bytes does not match expected_size_bytes")
+
+        part_size_bytes = None
+        part_count = None
+        if upload_mode == "multipart":
+            if not total_size_bytes or total_size_bytes <= 0:
+                raise ValidationError("Multipart uploads require total_size_bytes")
+            if total_size_bytes > effective_max:
+                raise ValidationError("Upload exceeds maximum allowed file size")
+            part_size_bytes = self._multipart_part_size(total_size_bytes)
+            part_count = math.ceil(total_size_bytes / part_size_bytes)
+        elif upload_mode != "stream":
+            raise ValidationError("Unsupported upload mode")
+        elif total_size_bytes is not None and total_size_bytes > effective_max:
+            # A stream session with a declared length (e.g. tus Upload-Length) reserves exactly that much.
+            raise ValidationError("Upload exceeds maximum allowed file size")
+
+        declared_size = expected_size_bytes or total_size_bytes
         upload_id = uuid.uuid4().hex
-        with self.uow:
-            self.uow.software_package_repo.create_upload_session(
+        async with self.async_uow:
+            repo = self.async_uow.software_package_repo
+            usage = await repo.get_storage_usage_for_update(user_id)
+            available = self.user_quota_bytes - usage.used_bytes - usage.reserved_bytes
+            if declared_size is not None:
+                effective_max = declared_size
+            elif max_size_bytes is None:
+                # Undeclared size: cap the session at what is left of the quota instead of failing outright.
+                effective_max = min(effective_max, available)
+            if effective_max <= 0 or effective_max > available:
+                raise ValidationError("Storage quota exceeded")
+            usage.reserved_bytes += effective_max
+            await repo.create_upload_session(
                 upload_id=upload_id,
                 user_id=user_id,
                 package_name=package_draft.name,
@@ -150,66 +240,377 @@ class SoftwarePackageService:
                 content_type=content_type,
                 max_size_bytes=effective_max,
                 status="PENDING",
+                upload_mode=upload_mode,
+                total_size_bytes=total_size_bytes,
+                part_size_bytes=part_size_bytes,
+                expected_sha256=expected_sha256,
+                expected_size_bytes=expected_size_bytes,
+                reserved_bytes=effective_max,
             )
 
-        return UploadInitResult(upload_id=upload_id, offset=0, max_size_bytes=effective_max)
+        if expected_sha256 is not None:
+            version_id = await self._complete_from_existing_blob(
+                upload_id=upload_id,
+                user_id=user_id,
+                checksum=expected_sha256,
+                size_bytes=expected_size_bytes,
+            )
+            if version_id is not None:
+                return UploadInitResult(
+                    upload_id=upload_id,
+                    offset=expected_size_bytes,
+                    max_size_bytes=effective_max,
+                    upload_mode=upload_mode,
+                    total_size_bytes=total_size_bytes,
+                    status="COMPLETED",
+                    file_version_id=version_id,
+                )
 
-    async def append_upload_stream(
+        return UploadInitResult(
+            upload_id=upload_id,
+            offset=0,
+            max_size_bytes=effective_max,
+            upload_mode=upload_mode,
+            total_size_bytes=total_size_bytes,
+            part_size_bytes=part_size_bytes,
+            part_count=part_count,
+        )
+
+    async def _complete_from_existing_blob(
         self,
         *,
         upload_id: str,
         user_id: int,
-        expected_offset: int,
-        chunk_stream: AsyncIterable[bytes],
-    ) -> UploadAppendResult:
-        with self.uow:
-            session = self.uow.software_package_repo.get_upload_session_for_user_for_update(
+        checksum: str,
+        size_bytes: int,
+    ) -> int | None:
+        """
+        Complete an upload without any data transfer when the declared content is already stored.
+        Only blobs the user can already see (own versions or public packages) may be referenced,
+        so a leaked checksum cannot be used to claim someone else's private file.
+        """
+        async with self.async_uow:
+            repo = self.async_uow.software_package_repo
+            blob = await repo.get_blob_by_checksum_and_size(checksum_sha256=checksum, size_bytes=size_bytes)
+            if not blob or not await repo.user_can_reference_blob(blob_id=blob.id, user_id=user_id):
+                return None
+            session = await repo.get_upload_session_for_user_for_update(upload_id=upload_id, user_id=user_id)
+            if not session:
+                raise NotFoundError("Upload session not found")
+            session.status = "FINALIZING"
+            repo.increment_blob_refcount(blob)
+            blob_id = blob.id
+        return await self._publish_file_version(
+            upload_id=upload_id,
+            user_id=user_id,
+            blob_id=blob_id,
+            checksum=checksum,
+            size_bytes=size_bytes,
+        )
+
+    def _multipart_part_size(self, total_size_bytes: int) -> int:
+        part_size = settings.PACKAGE_MULTIPART_PART_SIZE_BYTES
+        max_parts = max(1, settings.PACKAGE_MULTIPART_MAX_PARTS)
+        if math.ceil(total_size_bytes / part_size) > max_parts:
+            # Grow parts in whole MiB steps so very large uploads stay within the part limit.
+            mib = 1024 * 1024
+            part_size = math.ceil(math.ceil(total_size_bytes / max_parts) / mib) * mib
+        return part_size
+
+    async def start_upload(self, init: UploadInitResult) -> None:
+        """Create the temporary storage target matching the session's upload mode."""
+        if init.upload_mode == "multipart":
+            await self.storage.init_multipart_upload(init.upload_id, init.total_size_bytes or 0)
+        else:
+            await self.storage.init_upload(init.upload_id)
+
+    async def _load_upload_progress(self, *, upload_id: str, user_id: int) -> UploadProgressState:
+        """Hot state of a stream session, seeded from its row and the bytes in storage on first use."""
+        state = await upload_progress.get(upload_id)
+        if state is not None:
+            return state
+        async with self.async_uow.read_only():
+            session = await self.async_uow.software_package_repo.get_upload_session_for_user(
                 upload_id=upload_id, user_id=user_id
             )
             if not session:
                 raise NotFoundError("Upload session not found")
-            if session.status in {"COMPLETED", "FAILED", "FINALIZING"}:
+            if session.status in {"COMPLETED", "FAILED", "EXPIRED", "FINALIZING"}:
                 raise ConflictError(f"Upload session is not writable (status={session.status})")
-            if session.bytes_received != expected_offset:
-                raise ConflictError(
-                    f"Upload offset mismatch. expected={session.bytes_received}, provided={expected_offset}"
-                )
-            session.status = "UPLOADING"
-            max_size = session.max_size_bytes
+            if session.upload_mode not in {"stream", "partial"}:
+                raise ConflictError("Multipart upload sessions accept numbered parts only")
+            state = UploadProgressState(
+                user_id=session.user_id,
+                offset=session.bytes_received,
+                status=session.status,
+                max_size_bytes=session.max_size_bytes,
+                file_name=session.file_name,
+                content_type=session.content_type,
+                updated_at=time.time(),
+            )
+        # Storage, not the row, knows how much was really written since the last flush.
+        state = replace(state, offset=await self.storage.get_upload_size(upload_id))
+        return await upload_progress.seed(upload_id, state)
 
-        bytes_appended = 0
+    async def _apply_upload_progress(self, session) -> None:
+        """Copy hot progress into a locked session row, inside the caller's transaction."""
+        state = await upload_progress.get(session.id)
+        if state is None:
+            return
+        if state.busy:
+            raise ConflictError("Upload session is busy with another request")
+        session.bytes_received = state.offset
+        if session.status == "PENDING":
+            session.status = state.status
+
+    async def append_upload_stream(
+        self,
+        *,
+        upload_id: str,
+        user_id: int,
+        expected_offset: int,
+        chunk_stream: AsyncIterable[bytes],
+    ) -> UploadAppendResult:
+        """
+        Append a chunk without locking the session row: the offset check and writer lease are one
+        compare-and-set on the progress store, and the row only sees milestones and failures.
+        """
+        state = await self._load_upload_progress(upload_id=upload_id, user_id=user_id)
+        token = uuid.uuid4().hex
+        claim = await upload_progress.claim(upload_id, user_id=user_id, expected_offset=expected_offset, token=token)
+        if claim.outcome == "offset":
+            # The tracked offset may trail storage after a lost update; storage is authoritative.
+            actual_offset = await self.storage.get_upload_size(upload_id)
+            if actual_offset != claim.offset:
+                claim = await upload_progress.claim(
+                    upload_id,
+                    user_id=user_id,
+                    expected_offset=expected_offset,
+                    token=token,
+                    actual_offset=actual_offset,
+                )
+        if claim.outcome == "missing":
+            raise NotFoundError("Upload session not found")
+        if claim.outcome == "status":
+            raise ConflictError(f"Upload session is not writable (status={claim.status})")
+        if claim.outcome == "busy":
+            raise ConflictError("Upload session is busy with another request")
+        if claim.outcome == "offset":
+            raise ConflictError(f"Upload offset mismatch. expected={claim.offset}, provided={expected_offset}")
+        # The tracked offset can run ahead of storage (a writer that lost its lease, a lost flush);
+        # appending is only safe where the temp upload really ends.
         try:
+            stored_offset = await self.storage.get_upload_size(upload_id)
+        except BaseException:
+            await upload_progress.release(upload_id, token)
+            raise
+        if stored_offset != expected_offset:
+            await upload_progress.release(upload_id, token, stored_offset)
+            raise ConflictError(f"Upload offset mismatch. expected={stored_offset}, provided={expected_offset}")
+
+        max_size = state.max_size_bytes
+        checkpoint = upload_checkpoints.resume(
+            upload_id,
+            expected_offset,
+            scan_session_factory=lambda: self.scanner.open_session(
+                filename=state.file_name, content_type=state.content_type
+            ),
+        )
+
+        async def _bounded_stream() -> AsyncIterable[bytes]:
+            bytes_appended = 0
             async for chunk in chunk_stream:
                 if not chunk:
                     continue
                 bytes_appended += len(chunk)
-                projected = expected_offset + bytes_appended
-                if projected > max_size:
+                if expected_offset + bytes_appended > max_size:
                     raise ValidationError("Upload exceeds maximum allowed file size")
-                await self.storage.append_upload_chunk(upload_id, chunk)
-        except Exception:
-            current_size = await self.storage.get_upload_size(upload_id)
-            with self.uow:
-                failed = self.uow.software_package_repo.get_upload_session_for_user_for_update(
-                    upload_id=upload_id, user_id=user_id
+                yield chunk
+
+        async def _keep_lease() -> None:
+            # Renewed on a timer, not per chunk: a client that stalls mid-body still owns the writer,
+            # so a retried PATCH at the same offset cannot append alongside it.
+            while True:
+                await asyncio.sleep(settings.PACKAGE_UPLOAD_WRITER_LEASE_SECONDS / 3)
+                try:
+                    if not await upload_progress.renew(upload_id, token):
+                        return
+                except ExternalServiceError as exc:
+                    logging.warning("Could not renew the writer lease of upload %s: %s", upload_id, exc)
+
+        lease_keeper = asyncio.create_task(_keep_lease())
+        try:
+            try:
+                writer = await self.storage.open_upload_writer(
+                    upload_id, buffer_size=settings.PACKAGE_UPLOAD_WRITE_BUFFER_BYTES
                 )
-                if failed:
-                    failed.bytes_received = current_size
-                    failed.status = "FAILED"
-                    failed.error_message = "Chunk append failed"
+                async with writer:
+                    sinks = [writer.write]
+                    if checkpoint is not None:
+                        sinks.extend(checkpoint.sinks())
+                    await tee_stream(_bounded_stream(), sinks)
+            finally:
+                lease_keeper.cancel()
+        except Exception as exc:
+            upload_checkpoints.discard(upload_id)
+            current_size = None
+            try:
+                current_size = await self.storage.get_upload_size(upload_id)
+            except FileNotFoundError:
+                pass
+            # A dropped connection or a storage hiccup leaves the bytes already written resumable;
+            # only an oversize body or a temp upload that can no longer take appends ends the session.
+            fatal = current_size is None or isinstance(exc, (ValidationError, FileNotFoundError, RuntimeError))
+            try:
+                async with self.async_uow:
+                    session = await self.async_uow.software_package_repo.get_upload_session_for_user_for_update(
+                        upload_id=upload_id, user_id=user_id
+                    )
+                    if session and current_size is not None and session.status in {"PENDING", "UPLOADING"}:
+                        session.bytes_received = current_size
+                    if session and fatal:
+                        await self._mark_session_failed(session, "Chunk append failed")
+            finally:
+                if fatal:
+                    await upload_progress.discard(upload_id)
+                else:
+                    await upload_progress.release(upload_id, token, current_size)
             raise
 
         new_offset = await self.storage.get_upload_size(upload_id)
-        with self.uow:
-            session = self.uow.software_package_repo.get_upload_session_for_user_for_update(
+        if await upload_progress.advance(upload_id, token, new_offset):
+            async with self.async_uow:
+                session = await self.async_uow.software_package_repo.get_upload_session_for_user_for_update(
+                    upload_id=upload_id, user_id=user_id
+                )
+                if session and session.status in {"PENDING", "UPLOADING"}:
+                    session.bytes_received = new_offset
+                    session.status = "UPLOADING"
+                    session.error_message = None
+                    # Persist the hash midstate with the milestone so completion on another worker,
+                    # or after a restart, only re-hashes the tail.
+                    hash_state = checkpoint.hasher.export_state() if checkpoint is not None else None
+                    if hash_state is not None and checkpoint.offset == new_offset:
+                        session.hash_state = hash_state
+                        session.hash_state_offset = new_offset
+            await upload_progress.mark_flushed(upload_id, new_offset)
+        return UploadAppendResult(upload_id=upload_id, offset=new_offset, status="UPLOADING")
+
+    async def upload_part(
+        self,
+        *,
+        upload_id: str,
+        user_id: int,
+        part_number: int,
+        chunk_stream: AsyncIterable[bytes],
+    ) -> UploadPartResult:
+        async with self.async_uow.read_only():
+            session = await self.async_uow.software_package_repo.get_upload_session_for_user(
                 upload_id=upload_id, user_id=user_id
             )
             if not session:
                 raise NotFoundError("Upload session not found")
-            session.bytes_received = new_offset
+            if session.upload_mode != "multipart":
+                raise ConflictError("Upload session does not accept numbered parts")
+            if session.status in {"COMPLETED", "FAILED", "EXPIRED", "FINALIZING"}:
+                raise ConflictError(f"Upload session is not writable (status={session.status})")
+            total_size = session.total_size_bytes or 0
+            part_size = session.part_size_bytes or 0
+        part_count = math.ceil(total_size / part_size) if part_size else 0
+        if part_number < 1 or part_number > part_count:
+            raise ValidationError(f"Part number must be between 1 and {part_count}")
+        offset = (part_number - 1) * part_size
+        expected_size = min(part_size, total_size - offset)
+
+        async def _bounded_part() -> AsyncIterable[bytes]:
+            received = 0
+            async for chunk in chunk_stream:
+                if not chunk:
+                    continue
+                received += len(chunk)
+                if received > expected_size:
+                    raise ValidationError(f"Part {part_number} exceeds its expected size of {expected_size} bytes")
+                yield chunk
+
+        # Parts are written in place, so a retry overwrites bytes already recorded. Mark the part
+        # incomplete first: completion then sees it missing instead of hashing a half-written part.
+        token = uuid.uuid4().hex
+        lease = timedelta(seconds=settings.PACKAGE_UPLOAD_WRITER_LEASE_SECONDS)
+        async with self.async_uow:
+            repo = self.async_uow.software_package_repo
+            session = await repo.get_upload_session_for_user_for_update(upload_id=upload_id, user_id=user_id)
+            if not session:
+                raise NotFoundError("Upload session not found")
+            if session.status in {"COMPLETED", "FAILED", "EXPIRED", "FINALIZING"}:
+                raise ConflictError(f"Upload session is not writable (status={session.status})")
+            claimed = await repo.claim_upload_part(
+                upload_id=upload_id,
+                part_number=part_number,
+                token=token,
+                stale_before=datetime.now(timezone.utc) - lease,
+            )
+            if claimed is None:
+                raise ConflictError(f"Part {part_number} is busy with another request")
+
+        try:
+            written, etag = await self.storage.write_upload_part(
+                upload_id,
+                part_number=part_number,
+                offset=offset,
+                chunk_stream=_bounded_part(),
+            )
+            if written != expected_size:
+                raise ValidationError(f"Part {part_number} must be exactly {expected_size} bytes, got {written}")
+        except Exception:
+            async with self.async_uow:
+                await self.async_uow.software_package_repo.release_upload_part(
+                    upload_id=upload_id, part_number=part_number, token=token
+                )
+            raise
+
+        async with self.async_uow:
+            repo = self.async_uow.software_package_repo
+            session = await repo.get_upload_session_for_user_for_update(upload_id=upload_id, user_id=user_id)
+            if not session:
+                raise NotFoundError("Upload session not found")
+            recorded = await repo.complete_upload_part(
+                upload_id=upload_id, part_number=part_number, token=token, size_bytes=written, etag=etag
+            )
+            if not recorded:
+                raise ConflictError(f"Part {part_number} was taken over by another request")
+            session.bytes_received = await repo.get_upload_parts_total_bytes(upload_id)
             session.status = "UPLOADING"
-            session.error_message = None
-            return UploadAppendResult(upload_id=upload_id, offset=new_offset, status=session.status)
+            return UploadPartResult(
+                upload_id=upload_id,
+                part_number=part_number,
+                size_bytes=written,
+                bytes_received=session.bytes_received,
+            )
+
+    async def _assemble_multipart_upload(self, *, upload_id: str, user_id: int) -> dict[int, int] | None:
+        """Seal a multipart upload; returns the part revisions it was assembled from."""
+        async with self.async_uow.read_only():
+            repo = self.async_uow.software_package_repo
+            session = await repo.get_upload_session_for_user(upload_id=upload_id, user_id=user_id)
+            if not session:
+                raise NotFoundError("Upload session not found")
+            if session.upload_mode != "multipart" or session.status == "COMPLETED":
+                return None
+            total_size = session.total_size_bytes or 0
+            part_size = session.part_size_bytes or 0
+            rows = await repo.list_upload_parts(upload_id)
+            parts = [(part.part_number, part.size_bytes, part.etag) for part in rows if part.writer_token is None]
+            revisions = {part.part_number: part.revision for part in rows if part.writer_token is None}
+        part_count = math.ceil(total_size / part_size) if part_size else 0
+        received = {number for number, _, _ in parts}
+        missing = [number for number in range(1, part_count + 1) if number not in received]
+        if missing:
+            preview = ", ".join(str(number) for number in missing[:10])
+            raise ConflictError(f"Upload is missing {len(missing)} part(s): {preview}")
+        if sum(size for _, size, _ in parts) != total_size:
+            raise ConflictError("Uploaded parts do not add up to the declared total size")
+        await self.storage.complete_multipart_upload(upload_id, [(number, etag) for number, _, etag in parts])
+        return revisions
 
     async def upload_single_request(
         self,
@@ -226,7 +627,7 @@ class SoftwarePackageService:
         chunk_stream: AsyncIterable[bytes],
     ) -> tuple[str, int]:
         start = time.perf_counter()
-        init = self.init_upload_session(
+        init = await self.init_upload_session(
             user_id=user_id,
             package_name=package_name,
             package_description=package_description,
@@ -237,28 +638,17 @@ class SoftwarePackageService:
             file_name=file_name,
             content_type=content_type,
         )
-        await self.storage.init_upload(init.upload_id)
-        hasher = StreamingSHA256()
+        await self.start_upload(init)
         try:
-            async def _single_request_stream():
-                async for chunk in chunk_stream:
-                    if chunk:
-                        hasher.update(chunk)
-                        yield chunk
-
             await self.append_upload_stream(
                 upload_id=init.upload_id,
                 user_id=user_id,
                 expected_offset=0,
-                chunk_stream=_single_request_stream(),
-            )
-            version_id = await self._finalize_upload_with_checksum(
-                upload_id=init.upload_id,
-                user_id=user_id,
-                checksum=hasher.hexdigest(),
-                size_bytes=hasher.size_bytes,
+                chunk_stream=chunk_stream,
             )
+            version_id = await self.complete_upload(upload_id=init.upload_id, user_id=user_id)
         except Exception:
+            upload_checkpoints.discard(init.upload_id)
             await self.storage.abort_upload(init.upload_id)
             raise
         finally:
@@ -272,16 +662,58 @@ class SoftwarePackageService:
         return init.upload_id, version_id
 
     async def complete_upload(self, *, upload_id: str, user_id: int) -> int:
-        hasher = StreamingSHA256()
-        async for chunk in self.storage.stream_upload(upload_id, chunk_size=settings.PACKAGE_UPLOAD_CHUNK_SIZE_BYTES):
-            hasher.update(chunk)
+        part_revisions = await self._assemble_multipart_upload(upload_id=upload_id, user_id=user_id)
+        await self.storage.seal_upload(upload_id)
+        checkpoint = await self._resolve_upload_checkpoint(upload_id=upload_id, user_id=user_id)
         return await self._finalize_upload_with_checksum(
             upload_id=upload_id,
             user_id=user_id,
-            checksum=hasher.hexdigest(),
-            size_bytes=hasher.size_bytes,
+            checksum=checkpoint.hasher.hexdigest(),
+            size_bytes=checkpoint.hasher.size_bytes,
+            scan_session=checkpoint.scan_session,
+            part_revisions=part_revisions,
         )
 
+    async def _resolve_upload_checkpoint(self, *, upload_id: str, user_id: int) -> UploadCheckpoint:
+        """
+        Complete hash and scan state from the live checkpoint when this worker has one, else from
+        the midstate persisted at the last milestone. Only bytes past the checkpoint are re-read;
+        a restored checkpoint carries no scan session, so finalize scans the upload on its own.
+        Without either, the whole upload is read once for both.
+        """
+        checkpoint = upload_checkpoints.pop(upload_id)
+        current_size = await self.storage.get_upload_size(upload_id)
+        if checkpoint is None or checkpoint.offset > current_size:
+            async with self.async_uow.read_only():
+                session = await self.async_uow.software_package_repo.get_upload_session_for_user(
+                    upload_id=upload_id, user_id=user_id
+                )
+                if not session:
+                    raise NotFoundError("Upload session not found")
+                file_name = session.file_name
+                content_type = session.content_type
+                hash_state = session.hash_state
+                hash_state_offset = session.hash_state_offset
+            restored = None
+            if hash_state_offset is not None and hash_state_offset <= current_size:
+                restored = StreamingSHA256.restore(hash_state, hash_state_offset)
+            if restored is not None:
+                checkpoint = UploadCheckpoint(hasher=restored)
+            else:
+                checkpoint = UploadCheckpoint(
+                    scan_session=self.scanner.open_session(filename=file_name, content_type=content_type)
+                )
+        if checkpoint.offset < current_size:
+            await tee_stream(
+                self.storage.stream_upload(
+                    upload_id,
+                    start=checkpoint.offset,
+                    chunk_size=settings.PACKAGE_UPLOAD_CHUNK_SIZE_BYTES,
+                ),
+                checkpoint.sinks(),
+            )
+        return checkpoint
+
     async def _finalize_upload_with_checksum(
         self,
         *,
@@ -289,9 +721,11 @@ class SoftwarePackageService:
         user_id: int,
         checksum: str,
         size_bytes: int,
+        scan_session: ScanSession | None = None,
+        part_revisions: dict[int, int] | None = None,
     ) -> int:
-        with self.uow:
-            session = self.uow.software_package_repo.get_upload_session_for_user_for_update(
+        async with self.async_uow:
+            session = await self.async_uow.software_package_repo.get_upload_session_for_user_for_update(
                 upload_id=upload_id, user_id=user_id
             )
             if not session:
@@ -300,13 +734,29 @@ class SoftwarePackageService:
                 if session.completed_file_version_id is None:
                     raise ConflictError("Upload already completed with missing version reference")
                 return session.completed_file_version_id
-            if session.status == "FAILED":
-                raise ConflictError("Upload session failed and cannot be completed")
+            if session.status in {"FAILED", "EXPIRED"}:
+                raise ConflictError(f"Upload session {session.status.lower()} and cannot be completed")
             if session.status == "FINALIZING":
                 raise ConflictError("Upload session is already finalizing")
-            session.status = "FINALIZING"
-            if session.bytes_received <= 0:
+            if session.upload_mode == "partial":
+                raise ConflictError("Partial uploads are completed by concatenating them")
+            if part_revisions is not None:
+                # A part claimed or rewritten after assembly may have changed the bytes just hashed.
+                parts = await self.async_uow.software_package_repo.list_upload_parts(upload_id)
+                if {part.part_number: part.revision for part in parts if part.writer_token is None} != part_revisions:
+                    raise ConflictError("Upload parts changed while completing; retry the completion")
+            await self._apply_upload_progress(session)
+            if session.expected_sha256 and (
+                session.expected_sha256 != checksum or session.expected_size_bytes != size_bytes
+            ):
+                raise ValidationError("Uploaded file does not match the declared checksum")
+            # size_bytes was measured from storage; the row counter may trail the last milestone flush.
+            if size_bytes <= 0:
                 raise ValidationError("Upload contains no data")
+            session.status = "FINALIZING"
+            session.bytes_received = size_bytes
+            session.hash_state = None
+            session.hash_state_offset = None
 
             package_name = session.package_name
             package_description = session.package_description
@@ -317,102 +767,195 @@ class SoftwarePackageService:
             file_name = session.file_name
             content_type = session.content_type
             max_size_bytes = session.max_size_bytes
+        await upload_progress.discard(upload_id)
 
-        if size_bytes <= 0:
-            raise ValidationError("Upload contains no data")
-        if size_bytes > max_size_bytes:
-            raise ValidationError("Upload exceeds maximum allowed file size")
-
-        version_draft = FileVersionDraft(
-            version=package_version,
-            checksum_sha256=checksum,
-            size_bytes=size_bytes,
-        )
-        version_draft.validate()
-
-        await self.scanner.scan_stream(
-            self.storage.stream_upload(upload_id, chunk_size=settings.PACKAGE_UPLOAD_CHUNK_SIZE_BYTES),
-            filename=file_name,
-            content_type=content_type,
-        )
-
-        storage_key = self._build_storage_key(checksum_sha256=checksum)
-
-        with self.uow:
-            repo = self.uow.software_package_repo
-            current_usage = repo.get_total_uploaded_bytes_for_user(user_id)
-            if current_usage + size_bytes > self.user_quota_bytes:
-                raise ValidationError("Storage quota exceeded")
+        try:
+            if size_bytes <= 0:
+                raise ValidationError("Upload contains no data")
+            if size_bytes > max_size_bytes:
+                raise ValidationError("Upload exceeds maximum allowed file size")
 
-        blob = None
-        with self.uow:
-            blob = self.uow.software_package_repo.get_blob_by_checksum_and_size(
+            version_draft = FileVersionDraft(
+                version=package_version,
                 checksum_sha256=checksum,
                 size_bytes=size_bytes,
             )
-            if blob:
-                self.uow.software_package_repo.increment_blob_refcount(blob)
+            version_draft.validate()
 
-        if not blob:
-            await self.storage.promote_upload(upload_id, storage_key)
-            try:
-                with self.uow:
-                    blob = self.uow.software_package_repo.get_blob_by_checksum_and_size(
-                        checksum_sha256=checksum,
-                        size_bytes=size_bytes,
-                    )
-                    if blob:
-                        self.uow.software_package_repo.increment_blob_refcount(blob)
-                    else:
-                        blob = self.uow.software_package_repo.add_blob(
+            if scan_session is not None:
+                await scan_session.finish()
+            else:
+                await self.scanner.scan_stream(
+                    self.storage.stream_upload(upload_id, chunk_size=settings.PACKAGE_UPLOAD_CHUNK_SIZE_BYTES),
+                    filename=file_name,
+                    content_type=content_type,
+                )
+
+            storage_key = self._build_storage_key(checksum_sha256=checksum)
+
+            blob = None
+            quarantined_key = None
+            async with self.async_uow:
+                blob = await self.async_uow.software_package_repo.get_blob_by_checksum_and_size(
+                    checksum_sha256=checksum,
+                    size_bytes=size_bytes,
+                )
+                if blob:
+                    self.async_uow.software_package_repo.increment_blob_refcount(blob)
+                    if blob.quarantined_at is not None:
+                        quarantined_key = blob.storage_key
+
+            if not blob:
+                await self.storage.promote_upload(upload_id, storage_key)
+                try:
+                    async with self.async_uow:
+                        blob = await self.async_uow.software_package_repo.get_blob_by_checksum_and_size(
                             checksum_sha256=checksum,
                             size_bytes=size_bytes,
-                            storage_key=storage_key,
                         )
-            except IntegrityError as exc:
-                raise ConflictError("Blob consistency conflict") from exc
-        else:
-            await self.storage.abort_upload(upload_id)
+                        if blob:
+                            self.async_uow.software_package_repo.increment_blob_refcount(blob)
+                        else:
+                            blob = await self.async_uow.software_package_repo.add_blob(
+                                checksum_sha256=checksum,
+                                size_bytes=size_bytes,
+                                storage_key=storage_key,
+                            )
+                except IntegrityError as exc:
+                    raise ConflictError("Blob consistency conflict") from exc
+            else:
+                try:
+                    if quarantined_key is not None:
+                        # The upload matches the blob's checksum, so it replaces the corrupted object.
+                        await self.storage.delete_object(quarantined_key)
+                        await self.storage.promote_upload(upload_id, quarantined_key)
+                        async with self.async_uow:
+                            await self.async_uow.software_package_repo.clear_blob_quarantine(
+                                blob.id, datetime.now(timezone.utc)
+                            )
+                        logging.warning(
+                            "[scrubber] repaired quarantined blob_id=%s from upload_id=%s", blob.id, upload_id
+                        )
+                    else:
+                        await self.storage.abort_upload(upload_id)
+                except Exception:
+                    await self._release_blob_ref(blob.id)
+                    raise
+
+            return await self._publish_file_version(
+                upload_id=upload_id,
+                user_id=user_id,
+                blob_id=blob.id,
+                checksum=checksum,
+                size_bytes=size_bytes,
+            )
+        except Exception as exc:
+            await self._fail_upload_session(
+                upload_id=upload_id,
+                user_id=user_id,
+                message=str(exc) or "Upload finalization failed",
+            )
+            raise
 
+    async def _publish_file_version(
+        self,
+        *,
+        upload_id: str,
+        user_id: int,
+        blob_id: int,
+        checksum: str,
+        size_bytes: int,
+    ) -> int:
+        """
+        Attach an already-referenced blob to a new package version and complete the session.
+        The caller has incremented the blob refcount; it is handed back if the version is not published.
+        """
         try:
-            with self.uow:
-                repo = self.uow.software_package_repo
-                package = repo.upsert_package(
+            async with self.async_uow:
+                repo = self.async_uow.software_package_repo
+                session = await repo.get_upload_session_for_user_for_update(upload_id=upload_id, user_id=user_id)
+                if not session:
+                    raise NotFoundError("Upload session not found")
+                package = await repo.upsert_package(
                     owner_id=user_id,
-                    name=package_name,
-                    description=package_description,
-                    category=package_category,
-                    language=package_language,
-                    is_public=is_public,
-                    latest_version=package_version,
+                    name=session.package_name,
+                    description=session.package_description,
+                    category=session.package_category,
+                    language=session.package_language,
+                    is_public=session.is_public,
+                    latest_version=session.package_version,
                 )
-                version_row = repo.add_file_version(
+                version_row = await repo.add_file_version(
                     package_id=package.id,
-                    blob_id=blob.id,
-                    file_name=file_name,
-                    content_type=content_type,
-                    version=package_version,
+                    blob_id=blob_id,
+                    file_name=session.file_name,
+                    content_type=session.content_type,
+                    version=session.package_version,
                     size_bytes=size_bytes,
                     checksum_sha256=checksum,
                 )
-                session = repo.get_upload_session_for_user_for_update(upload_id=upload_id, user_id=user_id)
-                if not session:
-                    raise NotFoundError("Upload session not found")
+                usage = await repo.get_storage_usage_for_update(user_id)
+                usage.reserved_bytes = max(0, usage.reserved_bytes - session.reserved_bytes)
+                if (
+                    size_bytes > session.reserved_bytes
+                    and usage.used_bytes + usage.reserved_bytes + size_bytes > self.user_quota_bytes
+                ):
+                    raise ValidationError("Storage quota exceeded")
+                usage.used_bytes += size_bytes
+                session.reserved_bytes = 0
                 session.status = "COMPLETED"
+                session.bytes_received = size_bytes
                 session.completed_file_version_id = version_row.id
                 session.error_message = None
-                return version_row.id
+                package_id = package.id
+                version_id = version_row.id
         except IntegrityError as exc:
-            with self.uow:
-                repo = self.uow.software_package_repo
-                dup_blob = repo.get_blob_by_checksum_and_size(checksum_sha256=checksum, size_bytes=size_bytes)
-                if dup_blob and dup_blob.id == blob.id:
+            async with self.async_uow:
+                repo = self.async_uow.software_package_repo
+                dup_blob = await repo.get_blob_by_id(blob_id)
+                if dup_blob:
                     repo.decrement_blob_refcount(dup_blob)
-                failed = repo.get_upload_session_for_user_for_update(upload_id=upload_id, user_id=user_id)
+                failed = await repo.get_upload_session_for_user_for_update(upload_id=upload_id, user_id=user_id)
                 if failed:
-                    failed.status = "FAILED"
-                    failed.error_message = "Version already exists for this package"
+                    await self._mark_session_failed(failed, "Version already exists for this package")
             raise ConflictError("Package version already exists") from exc
+        except Exception:
+            # Nothing was committed (quota exceeded, lost connection, ...), so the reference is unused.
+            await self._release_blob_ref(blob_id)
+            raise
+        # A new version may flip the package's visibility.
+        await download_metadata_cache.invalidate_package(package_id)
+        return version_id
+
+    async def _release_blob_ref(self, blob_id: int) -> None:
+        """Hand back a refcount taken for a version that was never published."""
+        async with self.async_uow:
+            repo = self.async_uow.software_package_repo
+            blob = await repo.get_blob_by_id(blob_id)
+            if blob:
+                repo.decrement_blob_refcount(blob)
+
+    async def _mark_session_failed(self, session, message: str) -> None:
+        """Fail a locked session and hand its quota reservation back, inside the caller's transaction."""
+        session.status = "FAILED"
+        session.error_message = message[:500]
+        await self._release_reservation(session)
+
+    async def _release_reservation(self, session) -> None:
+        if not session.reserved_bytes:
+            return
+        usage = await self.async_uow.software_package_repo.get_storage_usage_for_update(session.user_id)
+        usage.reserved_bytes = max(0, usage.reserved_bytes - session.reserved_bytes)
+        session.reserved_bytes = 0
+
+    async def _fail_upload_session(self, *, upload_id: str, user_id: int, message: str) -> None:
+        async with self.async_uow:
+            session = await self.async_uow.software_package_repo.get_upload_session_for_user_for_update(
+                upload_id=upload_id, user_id=user_id
+            )
+            if session and session.status != "COMPLETED":
+                await self._mark_session_failed(session, message)
+        await upload_progress.discard(upload_id)
 
     def list_packages(self, *, user_id: int, offset: int = 0, limit: int = 50, language: str | None = None):
         with self.uow:
@@ -436,44 +979,66 @@ class SoftwarePackageService:
                 raise NotFoundError("Package not found")
             return repo.list_file_versions_for_package(package_id=package_id, limit=limit)
 
-    def get_download_ticket(
+    async def get_download_ticket(
         self,
         *,
         user_id: int,
         package_id: int,
         version_id: int,
+        with_internal_url: bool = False,
     ) -> DownloadTicket:
-        with self.uow:
-            repo = self.uow.software_package_repo
-            package = repo.get_package_by_id(package_id)
-            if not package:
-                raise NotFoundError("Package not found")
-            if not package.is_public:
-                raise PermissionError("Private software is view-only and cannot be downloaded")
+        """
+        Read-only lookup; callers record the download once they actually serve a body.
+        Hot versions are answered from the download metadata cache without touching the database.
+        With `with_internal_url`, locally stored blobs also get a signed URL for nginx X-Accel-Redirect.
+        """
+        cached = download_metadata_cache.get(package_id, version_id)
+        if cached is None:
+            generation = download_metadata_cache.generation(package_id)
+            async with self.async_uow.read_only():
+                row = await self.async_uow.software_package_repo.get_download_metadata(
+                    package_id=package_id,
+                    version_id=version_id,
+                )
+                if row is None:
+                    raise NotFoundError("Package not found")
+                is_public, version_row, storage_key, quarantined_at = row
+                if not is_public:
+                    raise PermissionError("Private software is view-only and cannot be downloaded")
+                if version_row is None:
+                    raise NotFoundError("File version not found")
+                if storage_key is None:
+                    raise NotFoundError("Backing file not found")
+                if quarantined_at is not None:
+                    raise ConflictError("Backing file failed an integrity check and is quarantined")
+                cached = (
+                    is_public,
+                    DownloadTicket(
+                        version_id=version_row.id,
+                        storage_key=storage_key,
+                        file_name=version_row.file_name,
+                        content_type=version_row.content_type,
+                        file_size_bytes=version_row.size_bytes,
+                        checksum_sha256=version_row.checksum_sha256,
+                        last_modified=version_row.created_at,
+                    ),
+                )
+            download_metadata_cache.put(package_id, version_id, cached, generation=generation)
 
-            version_row = repo.get_file_version_for_package(package_id=package_id, version_id=version_id)
-            if not version_row:
-                raise NotFoundError("File version not found")
+        is_public, ticket = cached
+        if not is_public:
+            raise PermissionError("Private software is view-only and cannot be downloaded")
+        if with_internal_url and await self.storage.get_local_path(ticket.storage_key) is not None:
+            ticket = replace(ticket, internal_url=build_internal_download_url(ticket.storage_key))
+        return ticket
 
-            blob = repo.get_blob_by_checksum_and_size(
-                checksum_sha256=version_row.checksum_sha256,
-                size_bytes=version_row.size_bytes,
-            )
-            if not blob:
-                raise NotFoundError("Backing file not found")
-
-            repo.increment_file_version_download_count(version_row)
-            return DownloadTicket(
-                storage_key=blob.storage_key,
-                file_name=version_row.file_name,
-                content_type=version_row.content_type,
-                file_size_bytes=version_row.size_bytes,
-                checksum_sha256=version_row.checksum_sha256,
-            )
+    async def record_download(self, *, version_id: int) -> None:
+        """Buffered in the write-behind counter; the database sees it on the next flush."""
+        await download_counter.record(version_id)
 
     async def cancel_upload(self, *, upload_id: str, user_id: int) -> None:
-        with self.uow:
-            session = self.uow.software_package_repo.get_upload_session_for_user_for_update(
+        async with self.async_uow:
+            session = await self.async_uow.software_package_repo.get_upload_session_for_user_for_update(
                 upload_id=upload_id,
                 user_id=user_id,
             )
@@ -481,36 +1046,236 @@ class SoftwarePackageService:
                 raise NotFoundError("Upload session not found")
             if session.status == "COMPLETED":
                 raise ConflictError("Cannot cancel completed upload")
-            session.status = "FAILED"
-            session.error_message = "Upload canceled by client"
+            await self._mark_session_failed(session, "Upload canceled by client")
+        await upload_progress.discard(upload_id)
+        upload_checkpoints.discard(upload_id)
         await self.storage.abort_upload(upload_id)
 
-    async def delete_package_for_owner(self, *, package_id: int, user_id: int) -> None:
-        storage_keys_to_delete: list[str] = []
-        with self.uow:
-            repo = self.uow.software_package_repo
-            package = repo.get_package_by_id(package_id)
+    async def get_upload_progress(self, *, upload_id: str, user_id: int) -> UploadProgress:
+        async with self.async_uow.read_only():
+            session = await self.async_uow.software_package_repo.get_upload_session_for_user(
+                upload_id=upload_id, user_id=user_id
+            )
+            if not session:
+                raise NotFoundError("Upload session not found")
+            progress = UploadProgress(
+                upload_id=session.id,
+                offset=session.bytes_received,
+                length=session.total_size_bytes,
+                upload_mode=session.upload_mode,
+                status=session.status,
+                updated_at=session.updated_at,
+                file_version_id=session.completed_file_version_id,
+            )
+        state = await upload_progress.get(upload_id) if progress.status in {"PENDING", "UPLOADING"} else None
+        if state is not None:
+            progress = replace(
+                progress,
+                offset=state.offset,
+                status=state.status,
+                updated_at=datetime.fromtimestamp(state.updated_at, timezone.utc),
+            )
+        return progress
+
+    async def init_partial_upload(self, *, user_id: int, length: int) -> UploadInitResult:
+        """
+        Reserve a scratch session for one piece of a parallel upload. Partial uploads carry no
+        package metadata and can only be consumed by `concat_partial_uploads`.
+        """
+        if length <= 0:
+            raise ValidationError("Partial uploads need a positive length")
+        if length > self.max_file_size_bytes:
+            raise ValidationError("Upload exceeds maximum allowed file size")
+        upload_id = uuid.uuid4().hex
+        async with self.async_uow:
+            repo = self.async_uow.software_package_repo
+            usage = await repo.get_storage_usage_for_update(user_id)
+            if length > self.user_quota_bytes - usage.used_bytes - usage.reserved_bytes:
+                raise ValidationError("Storage quota exceeded")
+            usage.reserved_bytes += length
+            await repo.create_upload_session(
+                upload_id=upload_id,
+                user_id=user_id,
+                package_name="",
+                package_description="",
+                package_category="",
+                package_language="",
+                package_version="",
+                is_public=False,
+                file_name="partial",
+                content_type=None,
+                max_size_bytes=length,
+                status="PENDING",
+                upload_mode="partial",
+                total_size_bytes=length,
+                reserved_bytes=length,
+            )
+        return UploadInitResult(
+            upload_id=upload_id,
+            offset=0,
+            max_size_bytes=length,
+            upload_mode="partial",
+            total_size_bytes=length,
+        )
+
+    async def _claim_partial_uploads(self, *, user_id: int, upload_ids: list[str]) -> int:
+        """Lock finished partial uploads for concatenation and hand their reservations back; returns their total size."""
+        total = 0
+        async with self.async_uow:
+            repo = self.async_uow.software_package_repo
+            for upload_id in upload_ids:
+                session = await repo.get_upload_session_for_user_for_update(upload_id=upload_id, user_id=user_id)
+                if not session:
+                    raise NotFoundError(f"Partial upload {upload_id} not found")
+                if session.upload_mode != "partial":
+                    raise ValidationError(f"Upload {upload_id} is not a partial upload")
+                if session.status not in {"PENDING", "UPLOADING"}:
+                    raise ConflictError(f"Partial upload {upload_id} is not available (status={session.status})")
+                await self._apply_upload_progress(session)
+                if session.bytes_received != session.total_size_bytes:
+                    raise ConflictError(f"Partial upload {upload_id} is incomplete")
+                session.status = "FINALIZING"
+                await self._release_reservation(session)
+                total += session.bytes_received
+        for upload_id in upload_ids:
+            await upload_progress.discard(upload_id)
+        return total
+
+    async def _settle_partial_uploads(
+        self, *, user_id: int, upload_ids: list[str], file_version_id: int | None
+    ) -> None:
+        """Mark claimed partials consumed by `file_version_id`, or make them available again when it is None."""
+        async with self.async_uow:
+            repo = self.async_uow.software_package_repo
+            for upload_id in upload_ids:
+                session = await repo.get_upload_session_for_user_for_update(upload_id=upload_id, user_id=user_id)
+                if not session or session.status != "FINALIZING":
+                    continue
+                if file_version_id is not None:
+                    session.status = "COMPLETED"
+                    session.completed_file_version_id = file_version_id
+                    continue
+                usage = await repo.get_storage_usage_for_update(user_id)
+                usage.reserved_bytes += session.bytes_received
+                session.reserved_bytes = session.bytes_received
+                session.status = "UPLOADING"
+        if file_version_id is not None:
+            for upload_id in upload_ids:
+                upload_checkpoints.discard(upload_id)
+                await self.storage.abort_upload(upload_id)
+
+    async def concat_partial_uploads(
+        self,
+        *,
+        user_id: int,
+        partial_upload_ids: list[str],
+        package_name: str,
+        package_description: str,
+        package_category: str,
+        package_language: str,
+        package_version: str,
+        is_public: bool,
+        file_name: str,
+        content_type: str | None,
+    ) -> tuple[UploadInitResult, int]:
+        """
+        Publish a package version from partial uploads joined in the given order.
+        The pieces are streamed into a fresh session, so hashing, scanning and deduplication run
+        exactly as for a single upload. If that fails, the partials stay available for another try.
+        """
+        if not partial_upload_ids or len(set(partial_upload_ids)) != len(partial_upload_ids):
+            raise ValidationError("Concatenation needs distinct partial uploads")
+        total = await self._claim_partial_uploads(user_id=user_id, upload_ids=partial_upload_ids)
+        version_id = None
+        try:
+            init = await self.init_upload_session(
+                user_id=user_id,
+                package_name=package_name,
+                package_description=package_description,
+                package_category=package_category,
+                package_language=package_language,
+                package_version=package_version,
+                is_public=is_public,
+                file_name=file_name,
+                content_type=content_type,
+                total_size_bytes=total,
+            )
+
+            async def _joined() -> AsyncIterable[bytes]:
+                for upload_id in partial_upload_ids:
+                    await self.storage.seal_upload(upload_id)
+                    async for chunk in self.storage.stream_upload(
+                        upload_id, chunk_size=settings.PACKAGE_UPLOAD_CHUNK_SIZE_BYTES
+                    ):
+                        yield chunk
+
+            await self.start_upload(init)
+            await self.append_upload_stream(
+                upload_id=init.upload_id, user_id=user_id, expected_offset=0, chunk_stream=_joined()
+            )
+            version_id = await self.complete_upload(upload_id=init.upload_id, user_id=user_id)
+        finally:
+            await self._settle_partial_uploads(
+                user_id=user_id, upload_ids=partial_upload_ids, file_version_id=version_id
+            )
+        return replace(init, offset=total, status="COMPLETED", file_version_id=version_id), version_id
+
+    async def expire_idle_upload_sessions(self, *, idle_before: datetime, limit: int) -> tuple[list[str], int]:
+        """
+        Expire up to `limit` sessions with no activity since `idle_before`: hand their quota
+        reservations back and delete their temporary data. Returns (expired ids, released bytes).
+        """
+        async with self.async_uow:
+            repo = self.async_uow.software_package_repo
+            sessions = await repo.list_idle_upload_sessions_for_update(
+                statuses=("PENDING", "UPLOADING", "FINALIZING", "FAILED"),
+                idle_before=idle_before,
+                limit=limit,
+            )
+            released = 0
+            now = datetime.now(timezone.utc)
+            expired_ids = []
+            for session in sessions:
+                state = await upload_progress.get(session.id) if session.status in {"PENDING", "UPLOADING"} else None
+                if state is not None and state.updated_at >= idle_before.timestamp():
+                    # Still receiving chunks; only the row was behind. Record the progress instead.
+                    session.bytes_received = state.offset
+                    session.status = state.status
+                    session.updated_at = now
+                    continue
+                expired_ids.append(session.id)
+                released += session.reserved_bytes
+                await self._release_reservation(session)
+                session.status = "EXPIRED"
+                session.error_message = session.error_message or "Upload session expired"
+            await repo.delete_upload_parts(expired_ids)
+        for upload_id in expired_ids:
+            await upload_progress.discard(upload_id)
+            upload_checkpoints.discard(upload_id)
+            await self.storage.abort_upload(upload_id)
+        return expired_ids, released
+
+    async def delete_package_for_owner(self, *, package_id: int, user_id: int) -> list[str]:
+        """
+        Delete a package and its versions in one short transaction.
+        Returns the storage keys of blobs nothing references any more; the caller deletes the
+        objects off the request path (see `blob_gc.delete_released_objects`).
+        """
+        async with self.async_uow:
+            repo = self.async_uow.software_package_repo
+            package = await repo.get_package_by_id(package_id)
             if not package:
                 raise NotFoundError("Package not found")
             if package.owner_id != user_id:
                 raise PermissionError("Only the package owner can delete this package")
 
-            versions = repo.list_all_file_versions_for_package(package_id=package_id)
-            for version_row in versions:
-                blob = repo.get_blob_by_id(version_row.blob_id)
-                repo.delete_file_version(version_row)
-                if blob:
-                    repo.decrement_blob_refcount(blob)
-                    if blob.reference_count <= 0:
-                        storage_keys_to_delete.append(blob.storage_key)
-                        repo.delete_blob(blob)
-            repo.delete_package(package)
+            usage = await repo.get_storage_usage_for_update(user_id)
+            freed_bytes, storage_keys = await repo.delete_package_versions(package_id)
+            usage.used_bytes = max(0, usage.used_bytes - freed_bytes)
+            await repo.delete_package(package)
 
-        for storage_key in storage_keys_to_delete:
-            try:
-                await self.storage.delete_object(storage_key)
-            except Exception as exc:
-                logging.warning("[package_delete] failed to delete storage_key=%s: %s", storage_key, exc)
+        await download_metadata_cache.invalidate_package(package_id)
+        return storage_keys
 
     def get_admin_summary(self) -> dict:
         with self.uow:
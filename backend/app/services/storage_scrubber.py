@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.core.throttle import IoThrottle
+from app.core.unit_of_work import AsyncUnitOfWork
+from app.database.db_setup import AsyncSessionLocal
+from app.infrastructure.checksum import StreamingSHA256
+from app.infrastructure.download_metadata_cache import download_metadata_cache
+from app.infrastructure.storage.base import StorageBackend
+from app.infrastructure.storage.caching import CachingStorageBackend
+from app.infrastructure.storage.factory import build_storage_backend
+from app.models.security_alert import SecurityAlert
+
+CURSOR_NAME = "storage_scrubber"
+ALERT_RULE_CODE = "STORAGE_INTEGRITY_MISMATCH"
+
+
+@dataclass
+class StorageScrubberMetrics:
+    passes_completed: int = 0
+    blobs_verified: int = 0
+    bytes_verified: int = 0
+    blobs_quarantined: int = 0
+    read_errors: int = 0
+    failed_runs: int = 0
+    cursor: int = 0
+    last_run_at: str | None = None
+    last_run_ms: int | None = None
+
+    def snapshot(self) -> dict:
+        return asdict(self)
+
+
+storage_scrubber_metrics = StorageScrubberMetrics()
+
+
+async def _verify_blob(
+    storage: StorageBackend, throttle: IoThrottle, *, storage_key: str, checksum: str, size_bytes: int
+) -> str | None:
+    """Re-hash one object; returns why it failed verification, or None when it matches."""
+    hasher = StreamingSHA256()
+    try:
+        async for chunk in storage.stream_object(storage_key, chunk_size=settings.STORAGE_SCRUB_CHUNK_BYTES):
+            await throttle.consume(nbytes=len(chunk))
+            await hasher.update_async(chunk)
+    except FileNotFoundError:
+        return "object missing from storage"
+    if hasher.size_bytes != size_bytes:
+        return f"size mismatch: expected {size_bytes} bytes, read {hasher.size_bytes}"
+    if hasher.hexdigest() != checksum:
+        return f"checksum mismatch: expected {checksum}, computed {hasher.hexdigest()}"
+    return None
+
+
+async def _quarantine(blob_id: int, storage_key: str, reason: str) -> None:
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as async_db:
+        uow = AsyncUnitOfWork(async_db)
+        async with uow:
+            package_ids = await uow.software_package_repo.quarantine_blob(
+                blob_id=blob_id, reason=reason, quarantined_at=now
+            )
+            uow.session.add(
+                SecurityAlert(
+                    rule_code=ALERT_RULE_CODE,
+                    severity="high",
+                    title="Stored package file failed integrity check",
+                    description=(
+                        f"Blob {blob_id} ({storage_key}) was quarantined: {reason}. "
+                        f"Affected package ids: {package_ids or 'none'}."
+                    ),
+                )
+            )
+    for package_id in package_ids:
+        await download_metadata_cache.invalidate_package(package_id)
+    logging.error("[scrubber] quarantined blob_id=%s storage_key=%s: %s", blob_id, storage_key, reason)
+
+
+async def scrub_batch(storage: StorageBackend, throttle: IoThrottle) -> bool:
+    """
+    Verify the next batch after the persisted cursor and advance it.
+    Returns False once a pass over all blobs is finished; the cursor then starts over at the beginning.
+    """
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as async_db:
+        uow = AsyncUnitOfWork(async_db)
+        async with uow.read_only():
+            repo = uow.software_package_repo
+            after_id = await repo.get_job_cursor(CURSOR_NAME)
+            blobs = await repo.list_blobs_to_scrub(
+                after_id=after_id,
+                verified_before=now - timedelta(seconds=settings.STORAGE_SCRUB_REVERIFY_AFTER_SECONDS),
+                limit=settings.STORAGE_SCRUB_BATCH_SIZE,
+            )
+
+    verified = []
+    for blob_id, checksum, size_bytes, storage_key in blobs:
+        try:
+            reason = await _verify_blob(
+                storage, throttle, storage_key=storage_key, checksum=checksum, size_bytes=size_bytes
+            )
+        except Exception as exc:
+            # Transient backend errors are retried on the next pass rather than quarantining good data.
+            storage_scrubber_metrics.read_errors += 1
+            logging.warning("[scrubber] could not read blob_id=%s storage_key=%s: %s", blob_id, storage_key, exc)
+            continue
+        if reason is None:
+            verified.append(blob_id)
+            storage_scrubber_metrics.bytes_verified += size_bytes
+        else:
+            await _quarantine(blob_id, storage_key, reason)
+            storage_scrubber_metrics.blobs_quarantined += 1
+
+    position = blobs[-1][0] if blobs else 0
+    async with AsyncSessionLocal() as async_db:
+        uow = AsyncUnitOfWork(async_db)
+        async with uow:
+            await uow.software_package_repo.mark_blobs_verified(verified, datetime.now(timezone.utc))
+            await uow.software_package_repo.set_job_cursor(CURSOR_NAME, position)
+    storage_scrubber_metrics.blobs_verified += len(verified)
+    storage_scrubber_metrics.cursor = position
+    if not blobs:
+        storage_scrubber_metrics.passes_completed += 1
+    return bool(blobs)
+
+
+async def scrub_storage_once(storage: StorageBackend | None = None, *, stop_event: asyncio.Event | None = None) -> None:
+    """Run the scrubber from its saved cursor to the end of the blob table."""
+    storage = storage or build_storage_backend()
+    if isinstance(storage, CachingStorageBackend):
+        # Verify what the backend holds; reading through the cache would also evict hot blobs.
+        storage = storage.inner
+    throttle = IoThrottle(
+        bytes_per_second=settings.STORAGE_SCRUB_MAX_MB_PER_SECOND * 1024 * 1024,
+        ops_per_second=settings.STORAGE_SCRUB_MAX_IOPS,
+    )
+    started = time.perf_counter()
+    storage_scrubber_metrics.last_run_at = datetime.now(timezone.utc).isoformat()
+    try:
+        while not (stop_event and stop_event.is_set()):
+            if not await scrub_batch(storage, throttle):
+                break
+    except Exception:
+        storage_scrubber_metrics.failed_runs += 1
+        raise
+    finally:
+        storage_scrubber_metrics.last_run_ms = int((time.perf_counter() - started) * 1000)
+
+
+async def run_storage_scrubber_loop(stop_event: asyncio.Event) -> None:
+    startup_wait = max(0, settings.STORAGE_SCRUB_STARTUP_DELAY_SECONDS)
+    if startup_wait:
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=startup_wait)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+    while not stop_event.is_set():
+        try:
+            await scrub_storage_once(stop_event=stop_event)
+        except Exception as exc:
+            logging.exception("[scrubber] Scrub loop iteration failed: %s", exc)
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=settings.STORAGE_SCRUB_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            continue
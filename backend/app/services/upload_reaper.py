@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.core.unit_of_work import AsyncUnitOfWork, UnitOfWork
+from app.database.db_setup import AsyncSessionLocal, SessionLocal
+from app.infrastructure.storage.base import StorageBackend
+from app.infrastructure.storage.factory import build_storage_backend
+from app.services.software_package_service import SoftwarePackageService
+
+LIVE_UPLOAD_STATUSES = ("PENDING", "UPLOADING", "FINALIZING")
+
+
+@dataclass
+class UploadReaperMetrics:
+    runs: int = 0
+    failed_runs: int = 0
+    sessions_expired: int = 0
+    reserved_bytes_released: int = 0
+    orphan_uploads_deleted: int = 0
+    last_run_at: str | None = None
+    last_run_ms: int | None = None
+    last_run_budget_exhausted: bool = False
+
+    def snapshot(self) -> dict:
+        return asdict(self)
+
+
+upload_reaper_metrics = UploadReaperMetrics()
+
+
+async def expire_idle_sessions(storage: StorageBackend, *, idle_before: datetime, budget: int) -> tuple[int, int]:
+    """Expire idle sessions batch by batch until none are left or `budget` aborts were spent."""
+    expired = released = 0
+    while expired < budget:
+        db = SessionLocal()
+        try:
+            async with AsyncSessionLocal() as async_db:
+                service = SoftwarePackageService(
+                    uow=UnitOfWork(session=db),
+                    async_uow=AsyncUnitOfWork(session=async_db),
+                    storage=storage,
+                )
+                upload_ids, batch_released = await service.expire_idle_upload_sessions(
+                    idle_before=idle_before,
+                    limit=min(settings.UPLOAD_REAPER_BATCH_SIZE, budget - expired),
+                )
+        finally:
+            db.close()
+        expired += len(upload_ids)
+        released += batch_released
+        if len(upload_ids) < settings.UPLOAD_REAPER_BATCH_SIZE:
+            break
+    return expired, released
+
+
+async def _delete_orphans(storage: StorageBackend, candidates: list[str]) -> int:
+    async with AsyncSessionLocal() as async_db:
+        uow = AsyncUnitOfWork(async_db)
+        async with uow.read_only():
+            # Promotion temp uploads (e.g. compressed frames) are named "<upload_id>-<suffix>".
+            owners = {candidate: candidate.split("-", 1)[0] for candidate in candidates}
+            live = await uow.software_package_repo.get_upload_session_ids_with_status(
+                list(set(owners.values())), LIVE_UPLOAD_STATUSES
+            )
+    deleted = 0
+    for candidate in candidates:
+        if owners[candidate] in live:
+            continue
+        await storage.abort_upload(candidate)
+        deleted += 1
+    return deleted
+
+
+async def sweep_orphan_uploads(storage: StorageBackend, *, modified_before: datetime, budget: int) -> int:
+    """Delete temporary uploads older than `modified_before` that no live session owns."""
+    deleted = 0
+    candidates: list[str] = []
+    async for upload_id, modified in storage.list_temp_uploads():
+        if deleted >= budget:
+            break
+        if modified >= modified_before:
+            continue
+        candidates.append(upload_id)
+        if len(candidates) >= min(settings.UPLOAD_REAPER_BATCH_SIZE, budget - deleted):
+            deleted += await _delete_orphans(storage, candidates)
+            candidates = []
+    if candidates:
+        deleted += await _delete_orphans(storage, candidates)
+    return deleted
+
+
+async def reap_uploads_once(storage: StorageBackend | None = None) -> None:
+    storage = storage or build_storage_backend()
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    budget = settings.UPLOAD_REAPER_MAX_DELETES_PER_RUN
+    upload_reaper_metrics.runs += 1
+    upload_reaper_metrics.last_run_at = now.isoformat()
+    try:
+        expired, released = await expire_idle_sessions(
+            storage,
+            idle_before=now - timedelta(seconds=settings.UPLOAD_SESSION_IDLE_TTL_SECONDS),
+            budget=budget,
+        )
+        orphans = await sweep_orphan_uploads(
+            storage,
+            modified_before=now - timedelta(seconds=settings.UPLOAD_REAPER_ORPHAN_GRACE_SECONDS),
+            budget=budget - expired,
+        )
+    except Exception:
+        upload_reaper_metrics.failed_runs += 1
+        raise
+    finally:
+        upload_reaper_metrics.last_run_ms = int((time.perf_counter() - started) * 1000)
+
+    upload_reaper_metrics.sessions_expired += expired
+    upload_reaper_metrics.reserved_bytes_released += released
+    upload_reaper_metrics.orphan_uploads_deleted += orphans
+    upload_reaper_metrics.last_run_budget_exhausted = expired + orphans >= budget
+    if expired or orphans:
+        logging.info(
+            "[upload_reaper] Expired %s session(s), released %s reserved byte(s), deleted %s orphan upload(s).",
+            expired,
+            released,
+            orphans,
+        )
+
+
+async def run_upload_reaper_loop(stop_event: asyncio.Event) -> None:
+    startup_wait = max(0, settings.UPLOAD_REAPER_STARTUP_DELAY_SECONDS)
+    if startup_wait:
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=startup_wait)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+    while not stop_event.is_set():
+        try:
+            await reap_uploads_once()
+        except Exception as exc:
+            logging.exception("[upload_reaper] Reaper loop iteration failed: %s", exc)
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=settings.UPLOAD_REAPER_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            continue
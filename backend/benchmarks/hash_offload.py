@@ -0,0 +1,98 @@
+"""
+Event-loop lag while hashing uploads inline vs. in the hash thread pool.
+
+Simulates concurrent uploads whose chunks go through the same path as the upload service
+(tee_stream into an UploadCheckpoint hash sink) while a probe task measures how late the
+event loop wakes it up. Run from backend/:
+
+    python -m benchmarks.hash_offload --size-mb 256 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from app.core.config import settings
+from app.infrastructure.stream_tee import tee_stream
+from app.infrastructure.upload_checkpoint import UploadCheckpoint
+
+PROBE_INTERVAL_SECONDS = 0.001
+
+
+async def _fake_upload(payload: bytes, chunk_size: int, total_bytes: int):
+    sent = 0
+    while sent < total_bytes:
+        # Yield to the loop like a socket read would.
+        await asyncio.sleep(0)
+        chunk = payload[: min(chunk_size, total_bytes - sent)]
+        sent += len(chunk)
+        yield chunk
+
+
+async def _probe(stop: asyncio.Event, lags: list[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+        lags.append(max(0.0, loop.time() - started - PROBE_INTERVAL_SECONDS))
+
+
+async def _run(*, offload: bool, payload: bytes, chunk_size: int, per_upload_bytes: int, concurrency: int) -> dict:
+    settings.PACKAGE_HASH_OFFLOAD_MIN_BYTES = chunk_size if offload else 0
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(stop, lags))
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    checkpoints = [UploadCheckpoint() for _ in range(concurrency)]
+    await asyncio.gather(
+        *(
+            tee_stream(_fake_upload(payload, chunk_size, per_upload_bytes), checkpoint.sinks())
+            for checkpoint in checkpoints
+        )
+    )
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    assert len({checkpoint.hasher.hexdigest() for checkpoint in checkpoints}) == 1
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    return {
+        "mode": "offload" if offload else "inline",
+        "throughput_mb_s": round(per_upload_bytes * concurrency / elapsed / (1024 * 1024), 1),
+        "lag_p50_ms": round(statistics.median(lags_ms), 2),
+        "lag_p99_ms": round(lags_ms[int(len(lags_ms) * 0.99) - 1], 2),
+        "lag_max_ms": round(lags_ms[-1], 2),
+        "probe_samples": len(lags_ms),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256, help="Bytes per simulated upload, in MiB.")
+    parser.add_argument("--chunk-kb", type=int, default=1024, help="Chunk size, in KiB.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Simultaneous uploads.")
+    parser.add_argument("--threads", type=int, default=settings.PACKAGE_HASH_WORKER_THREADS, help="Hash pool size.")
+    args = parser.parse_args()
+
+    settings.PACKAGE_HASH_WORKER_THREADS = args.threads
+    chunk_size = args.chunk_kb * 1024
+    payload = os.urandom(chunk_size)
+    for offload in (False, True):
+        result = asyncio.run(
+            _run(
+                offload=offload,
+                payload=payload,
+                chunk_size=chunk_size,
+                per_upload_bytes=args.size_mb * 1024 * 1024,
+                concurrency=args.concurrency,
+            )
+        )
+        print("  ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
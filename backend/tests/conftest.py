@@ -0,0 +1,96 @@
+import os
+import tempfile
+from pathlib import Path
+
+# Settings are read at import time, so point the app at throwaway state before importing it.
+_TMP = Path(tempfile.mkdtemp(prefix="techpulse-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP / 'test.db'}"
+os.environ["UPLOAD_ROOT"] = str(_TMP / "storage")
+os.environ["REDIS_URL"] = "redis://127.0.0.1:1/0"
+os.environ["EMAIL_RECOVERY_ENABLED"] = "false"
+
+import itertools  # noqa: E402
+
+import pytest  # noqa: E402
+
+from app.core.unit_of_work import AsyncUnitOfWork, UnitOfWork  # noqa: E402
+from app.database.db_setup import AsyncSessionLocal, SessionLocal  # noqa: E402
+from app.database.initialize_db import init_db  # noqa: E402
+from app.infrastructure.storage.local_fs import LocalFileSystemStorage  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.software_package_service import SoftwarePackageService  # noqa: E402
+
+init_db()
+_usernames = itertools.count(1)
+
+PACKAGE_FIELDS = dict(
+    package_name="pkg",
+    package_description="test package",
+    package_category="student projects",
+    package_language="py",
+    package_version="v1.0.0",
+    is_public=True,
+    file_name="pkg.zip",
+    content_type="application/zip",
+)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def user_id() -> int:
+    name = f"user{next(_usernames)}"
+    with SessionLocal() as db:
+        user = User(full_name=name, username=name, email=f"{name}@example.com", password_hash="x", gender="MALE")
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+@pytest.fixture
+def storage() -> LocalFileSystemStorage:
+    return LocalFileSystemStorage(_TMP / "storage" / "software_packages")
+
+
+@pytest.fixture
+async def make_service(storage):
+    """Factory for services that each own a sync and an async session, closed at teardown."""
+    opened = []
+
+    def _make() -> SoftwarePackageService:
+        db, async_db = SessionLocal(), AsyncSessionLocal()
+        opened.append((db, async_db))
+        return SoftwarePackageService(
+            uow=UnitOfWork(session=db),
+            async_uow=AsyncUnitOfWork(session=async_db),
+            storage=storage,
+        )
+
+    yield _make
+    for db, async_db in opened:
+        await async_db.close()
+        db.close()
+
+
+async def chunks(data: bytes, size: int = 64 * 1024):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+@pytest.fixture
+def publish(make_service, user_id):
+    """Upload `data` through a stream session and return the new file version id."""
+
+    async def _publish(data: bytes, *, owner_id: int | None = None, **fields) -> int:
+        owner_id = owner_id or user_id
+        init = await make_service().init_upload_session(user_id=owner_id, **{**PACKAGE_FIELDS, **fields})
+        await make_service().start_upload(init)
+        await make_service().append_upload_stream(
+            upload_id=init.upload_id, user_id=owner_id, expected_offset=0, chunk_stream=chunks(data)
+        )
+        return await make_service().complete_upload(upload_id=init.upload_id, user_id=owner_id)
+
+    return _publish
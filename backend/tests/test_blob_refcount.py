@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from app.database.db_setup import SessionLocal
+from app.exceptions.exceptions import ConflictError
+from app.models.file_blob import FileBlob
+from app.models.file_version import FileVersion
+from app.models.upload_session import UploadSession
+from app.repositories.software_package_async import AsyncSoftwarePackageRepo
+
+pytestmark = pytest.mark.anyio
+
+
+def _refcount(version_id: int) -> tuple[int, int]:
+    with SessionLocal() as db:
+        blob = db.get(FileBlob, db.get(FileVersion, version_id).blob_id)
+        return blob.id, blob.reference_count
+
+
+async def test_failed_publish_hands_the_blob_reference_back(publish, monkeypatch):
+    data = os.urandom(4096)
+    blob_id, before = _refcount(await publish(data, package_name="ref-kept"))
+
+    async def _lost_connection(self, **kwargs):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(AsyncSoftwarePackageRepo, "add_file_version", _lost_connection)
+    with pytest.raises(RuntimeError):
+        await publish(data, package_name="ref-failed")
+
+    with SessionLocal() as db:
+        assert db.get(FileBlob, blob_id).reference_count == before
+        assert db.query(UploadSession).filter_by(package_name="ref-failed").one().status == "FAILED"
+
+
+async def test_duplicate_version_hands_the_blob_reference_back(publish):
+    data = os.urandom(4096)
+    blob_id, before = _refcount(await publish(data, package_name="ref-dup"))
+
+    with pytest.raises(ConflictError):
+        await publish(data, package_name="ref-dup")
+
+    with SessionLocal() as db:
+        assert db.get(FileBlob, blob_id).reference_count == before
+
+
+async def test_failed_dedup_cleanup_hands_the_blob_reference_back(publish, storage, monkeypatch):
+    data = os.urandom(4096)
+    blob_id, before = _refcount(await publish(data, package_name="ref-abort"))
+
+    async def _broken_abort(upload_id):
+        raise OSError("disk error")
+
+    monkeypatch.setattr(storage, "abort_upload", _broken_abort)
+    with pytest.raises(OSError):
+        await publish(data, package_name="ref-abort-2")
+
+    with SessionLocal() as db:
+        assert db.get(FileBlob, blob_id).reference_count == before
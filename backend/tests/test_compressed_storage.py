@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from app.infrastructure.storage.compressed import INDEX_SUFFIX, CompressedStorageBackend
+from app.infrastructure.storage.local_fs import LocalFileSystemStorage
+
+pytestmark = pytest.mark.anyio
+
+FRAME = 64 * 1024
+
+
+class _ProbeCountingStorage(LocalFileSystemStorage):
+    index_probes = 0
+
+    async def stream_object(self, storage_key, **kwargs):
+        if storage_key.endswith(INDEX_SUFFIX):
+            self.index_probes += 1
+        async for chunk in super().stream_object(storage_key, **kwargs):
+            yield chunk
+
+
+def _backend(inner) -> CompressedStorageBackend:
+    return CompressedStorageBackend(inner, frame_size=FRAME, sample_bytes=FRAME)
+
+
+async def _store(backend, upload_id: str, storage_key: str, data: bytes) -> None:
+    await backend.init_upload(upload_id)
+    await backend.append_upload_chunk(upload_id, data)
+    await backend.promote_upload(upload_id, storage_key)
+
+
+async def _read(backend, storage_key: str, start: int = 0, end: int | None = None) -> bytes:
+    return b"".join([chunk async for chunk in backend.stream_object(storage_key, start=start, end=end)])
+
+
+async def test_raw_blobs_are_not_probed_for_an_index_on_every_read(tmp_path):
+    inner = _ProbeCountingStorage(tmp_path)
+    data = os.urandom(3 * FRAME)
+    await _store(_backend(inner), "u1", "aa/raw", data)
+
+    reader = _backend(inner)
+    for _ in range(3):
+        assert await _read(reader, "aa/raw", 10, 20) == data[10:21]
+    assert await reader.get_local_path("aa/raw") is not None
+    assert await reader.get_object_size("aa/raw") == len(data)
+    assert inner.index_probes == 1
+
+
+async def test_compressed_blob_serves_ranges_and_no_local_path(tmp_path):
+    backend = _backend(LocalFileSystemStorage(tmp_path))
+    data = b"package contents " * 20_000
+    await _store(backend, "u1", "bb/text", data)
+
+    assert await _read(backend, "bb/text") == data
+    assert await _read(backend, "bb/text", FRAME - 5, FRAME + 5) == data[FRAME - 5:FRAME + 6]
+    assert await backend.get_local_path("bb/text") is None
+    assert await backend.get_object_size("bb/text") == len(data)
+
+
+async def test_stale_raw_verdict_recovers_when_key_is_stored_compressed(tmp_path):
+    inner = LocalFileSystemStorage(tmp_path)
+    stale_reader, writer = _backend(inner), _backend(inner)
+    raw = os.urandom(2 * FRAME)
+    await _store(writer, "u1", "cc/blob", raw)
+    assert await _read(stale_reader, "cc/blob") == raw
+
+    text = b"recompressible " * 10_000
+    await writer.delete_object("cc/blob")
+    await _store(writer, "u2", "cc/blob", text)
+
+    assert await _read(stale_reader, "cc/blob", 3, 40) == text[3:41]
+    assert await stale_reader.get_local_path("cc/blob") is None
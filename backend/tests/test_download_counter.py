@@ -0,0 +1,54 @@
+import fakeredis
+import pytest
+
+import app.infrastructure.download_counter as download_counter_module
+from app.infrastructure.download_counter import DownloadCounter
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = fakeredis.FakeServer()
+
+    class _FakeRedisFactory:
+        @staticmethod
+        def from_url(url, **kwargs):
+            return fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+
+    monkeypatch.setattr(download_counter_module, "Redis", _FakeRedisFactory)
+    return server
+
+
+async def test_counts_drain_from_redis_once(server):
+    counter, applied = DownloadCounter(), []
+
+    async def _apply(counts):
+        applied.append(counts)
+
+    await counter.record(7)
+    await counter.record(7, 2)
+    await counter.record(9)
+
+    assert await counter.flush(_apply) == 4
+    assert applied == [{7: 3, 9: 1}]
+    assert await counter.flush(_apply) == 0
+
+
+async def test_redis_is_retried_after_a_failed_connect(server):
+    counter, applied = DownloadCounter(), []
+
+    async def _apply(counts):
+        applied.append(counts)
+
+    server.connected = False
+    await counter.record(7)
+    server.connected = True
+    await counter.record(7)  # still backing off: buffered in memory
+    assert counter._pending == {7: 2}
+
+    counter._retry_at = 0.0  # the backoff has elapsed
+    await counter.record(7, 5)
+    assert counter._pending == {7: 2}
+    assert await counter.flush(_apply) == 7
+    assert applied == [{7: 2}, {7: 5}]
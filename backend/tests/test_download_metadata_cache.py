@@ -0,0 +1,45 @@
+import threading
+
+import fakeredis
+import pytest
+
+import app.infrastructure.download_metadata_cache as metadata_cache_module
+from app.core.config import settings
+from app.infrastructure.download_metadata_cache import DownloadMetadataCache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_invalidation_is_published_off_the_event_loop(monkeypatch):
+    server = fakeredis.FakeServer()
+    publishers = []
+
+    class _RecordingRedis(fakeredis.FakeRedis):
+        def publish(self, channel, message):
+            publishers.append(threading.current_thread())
+            return super().publish(channel, message)
+
+    class _FakeRedisFactory:
+        @staticmethod
+        def from_url(url, **kwargs):
+            return _RecordingRedis(server=server, decode_responses=True)
+
+    monkeypatch.setattr(metadata_cache_module, "Redis", _FakeRedisFactory)
+    monkeypatch.setattr(settings, "DOWNLOAD_METADATA_CACHE_REDIS_INVALIDATION", True)
+    cache = DownloadMetadataCache(max_entries=10, ttl_seconds=60)
+    subscriber = fakeredis.FakeRedis(server=server, decode_responses=True).pubsub(ignore_subscribe_messages=True)
+    subscriber.subscribe(DownloadMetadataCache.CHANNEL)
+    cache.put(1, 10, "ticket", generation=cache.generation(1))
+
+    await cache.invalidate_package(1)
+
+    assert cache.get(1, 10) is None
+    assert publishers and publishers[0] is not threading.main_thread()
+    messages = [subscriber.get_message(timeout=0.1) for _ in range(3)]
+    assert [message["data"] for message in messages if message] == ["1"]
+
+    # Another worker's message drops the local copy without re-broadcasting it.
+    cache.put(1, 10, "ticket", generation=cache.generation(1))
+    cache._on_message({"data": "1"})
+    assert cache.get(1, 10) is None
+    assert len(publishers) == 1
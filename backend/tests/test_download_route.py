@@ -0,0 +1,69 @@
+import httpx
+import pytest
+
+import app.api.v1.software_packages as software_packages_api
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.database.db_setup import SessionLocal
+from app.infrastructure.transfer_admission import transfer_admission
+from app.main import app
+from app.models.file_version import FileVersion
+
+pytestmark = pytest.mark.anyio
+
+
+class _RecordingPacer:
+    def __init__(self):
+        self.charged = 0
+
+    async def charge(self, nbytes: int) -> None:
+        self.charged += nbytes
+
+    async def __call__(self, nbytes: int) -> None:
+        pass
+
+    async def flush(self) -> None:
+        pass
+
+
+@pytest.fixture
+async def client(make_service, user_id):
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": user_id, "role": "user"}
+    app.dependency_overrides[software_packages_api.get_service] = make_service
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as http:
+        yield http
+    app.dependency_overrides.clear()
+
+
+def _download_url(version_id: int) -> str:
+    with SessionLocal() as db:
+        package_id = db.get(FileVersion, version_id).package_id
+    return f"/api/v1/software-packages/{package_id}/versions/{version_id}/download"
+
+
+@pytest.mark.parametrize("range_header", [None, "bytes=0-9,20-29"])
+async def test_lease_is_released_when_building_the_response_fails(client, publish, monkeypatch, range_header):
+    url = _download_url(await publish(b"x" * 5000, package_name=f"lease-leak-{bool(range_header)}"))
+
+    def _broken_response(*args, **kwargs):
+        raise RuntimeError("response construction failed")
+
+    monkeypatch.setattr(software_packages_api, "RangeFileResponse", _broken_response)
+    monkeypatch.setattr(software_packages_api, "LeasedStreamingResponse", _broken_response)
+    with pytest.raises(RuntimeError):
+        await client.get(url, headers={"Range": range_header} if range_header else {})
+    assert transfer_admission.active == 0
+    assert transfer_admission.bytes_in_flight == 0
+
+
+async def test_nginx_offload_charges_every_requested_range(client, publish, monkeypatch):
+    url = _download_url(await publish(b"y" * 5000, package_name="accel-charge"))
+    pacer = _RecordingPacer()
+    monkeypatch.setattr(settings, "PACKAGE_DOWNLOAD_ACCEL_REDIRECT", True)
+    monkeypatch.setattr(settings, "PACKAGE_DOWNLOAD_URL_SECRET", "test-secret")
+    monkeypatch.setattr(software_packages_api.download_shaper, "pacer", lambda **kwargs: pacer)
+
+    response = await client.get(url, headers={"Range": "bytes=0-9,100-199,4990-"})
+
+    assert response.headers["X-Accel-Redirect"]
+    assert pacer.charged == 10 + 100 + 10
@@ -0,0 +1,20 @@
+from app.infrastructure.download_shaper import DownloadShaper
+
+
+def test_rates_are_split_between_workers():
+    shaper = DownloadShaper(user_rate=4000, ip_rate=8000, global_rate=12000, burst_seconds=1, workers=4)
+    pacer = shaper.pacer(user_id=1, ip_address="10.0.0.1")
+
+    assert [bucket.rate for bucket in pacer._own_buckets] == [1000, 2000]
+    assert [bucket.capacity for bucket in pacer._own_buckets] == [1000, 2000]
+    assert shaper.global_bucket.rate == 3000
+    # nginx limits each connection itself, independently of the backend's worker count.
+    assert shaper.connection_rate_limit() == 4000
+
+
+def test_a_single_worker_keeps_the_configured_rates():
+    shaper = DownloadShaper(user_rate=4000, ip_rate=0, global_rate=0, burst_seconds=1)
+    pacer = shaper.pacer(user_id=1, ip_address="10.0.0.1")
+
+    assert [bucket.rate for bucket in pacer._own_buckets] == [4000]
+    assert shaper.global_bucket is None
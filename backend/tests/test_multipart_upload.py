@@ -0,0 +1,89 @@
+import hashlib
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.database.db_setup import SessionLocal
+from app.exceptions.exceptions import ConflictError
+from app.models.file_version import FileVersion
+from app.models.upload_session import UploadSession
+from tests.conftest import PACKAGE_FIELDS, chunks
+
+pytestmark = pytest.mark.anyio
+
+PART = 1000
+
+
+@pytest.fixture
+def multipart(make_service, user_id, monkeypatch):
+    """Start a three-part session and return (upload_id, data)."""
+    monkeypatch.setattr(settings, "PACKAGE_MULTIPART_PART_SIZE_BYTES", PART)
+
+    async def _start(name: str):
+        data = os.urandom(PART * 2 + 500)
+        init = await make_service().init_upload_session(
+            user_id=user_id,
+            **{**PACKAGE_FIELDS, "package_name": name},
+            upload_mode="multipart",
+            total_size_bytes=len(data),
+        )
+        await make_service().start_upload(init)
+        return init.upload_id, data
+
+    return _start
+
+
+async def _upload_part(service, upload_id, user_id, number, payload):
+    return await service.upload_part(
+        upload_id=upload_id, user_id=user_id, part_number=number, chunk_stream=chunks(payload)
+    )
+
+
+async def test_retried_part_is_missing_while_it_is_rewritten(make_service, multipart, user_id):
+    upload_id, data = await multipart("parts-retry")
+    for number in (1, 2, 3):
+        await _upload_part(make_service(), upload_id, user_id, number, data[(number - 1) * PART:number * PART])
+
+    async def _stalled_retry():
+        yield data[:10]
+        with pytest.raises(ConflictError, match="missing 1 part"):
+            await make_service().complete_upload(upload_id=upload_id, user_id=user_id)
+        yield data[10:PART]
+
+    await make_service().upload_part(upload_id=upload_id, user_id=user_id, part_number=1, chunk_stream=_stalled_retry())
+    version_id = await make_service().complete_upload(upload_id=upload_id, user_id=user_id)
+    with SessionLocal() as db:
+        assert db.get(FileVersion, version_id).checksum_sha256 == hashlib.sha256(data).hexdigest()
+
+
+async def test_part_rewritten_during_completion_aborts_it(make_service, multipart, user_id, monkeypatch):
+    upload_id, data = await multipart("parts-race")
+    for number in (1, 2, 3):
+        await _upload_part(make_service(), upload_id, user_id, number, data[(number - 1) * PART:number * PART])
+
+    service = make_service()
+    resolve = service._resolve_upload_checkpoint
+
+    async def _resolve_after_rewrite(**kwargs):
+        await _upload_part(make_service(), upload_id, user_id, 2, os.urandom(PART))
+        return await resolve(**kwargs)
+
+    monkeypatch.setattr(service, "_resolve_upload_checkpoint", _resolve_after_rewrite)
+    with pytest.raises(ConflictError, match="changed while completing"):
+        await service.complete_upload(upload_id=upload_id, user_id=user_id)
+    with SessionLocal() as db:
+        assert db.get(UploadSession, upload_id).status == "UPLOADING"
+
+
+async def test_finalizing_session_rejects_parts_before_writing(make_service, multipart, storage, user_id):
+    upload_id, data = await multipart("parts-finalizing")
+    await _upload_part(make_service(), upload_id, user_id, 1, data[:PART])
+    with SessionLocal() as db:
+        db.get(UploadSession, upload_id).status = "FINALIZING"
+        db.commit()
+
+    with pytest.raises(ConflictError, match="FINALIZING"):
+        await _upload_part(make_service(), upload_id, user_id, 1, os.urandom(PART))
+    stored = b"".join([chunk async for chunk in storage.stream_upload(upload_id)])
+    assert stored[:PART] == data[:PART]
@@ -0,0 +1,222 @@
+import hashlib
+import os
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import unquote
+
+import httpx
+import pytest
+
+import app.infrastructure.storage.object_storage as object_storage_module
+from app.infrastructure.storage.object_storage import S3_MIN_PART_BYTES, ObjectStorageBackend
+
+pytestmark = pytest.mark.anyio
+
+MIB = 1024 * 1024
+
+
+class FakeS3:
+    """In-memory S3 speaking just enough of the REST API for ObjectStorageBackend."""
+
+    def __init__(self, bucket: str = "bucket"):
+        self.bucket = bucket
+        self.objects: dict[str, bytes] = {}
+        self.uploads: dict[str, dict] = {}
+        self.calls: list[str] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        key = unquote(request.url.path)[len(f"/{self.bucket}/"):]
+        query = dict(request.url.params)
+        copy_source = request.headers.get("x-amz-copy-source")
+        method = request.method
+        if method == "GET" and query.get("list-type") == "2":
+            return self._list(query.get("prefix", ""))
+        if method == "POST" and "uploads" in query:
+            upload_id = os.urandom(8).hex()
+            self.uploads[upload_id] = {"key": key, "parts": {}}
+            return self._xml("InitiateMultipartUploadResult", f"<UploadId>{upload_id}</UploadId>")
+        if "uploadId" in query:
+            return self._multipart(method, key, query, request, copy_source)
+        if method == "PUT" and copy_source:
+            self.calls.append("copy_object")
+            self.objects[key] = self._copy_source(copy_source, None)
+            return self._xml("CopyObjectResult", "<ETag>copied</ETag>")
+        if method == "PUT":
+            self.objects[key] = request.content
+            return httpx.Response(200, headers={"etag": self._etag(request.content)})
+        data = self.objects.get(key)
+        if data is None:
+            return httpx.Response(404)
+        if method == "HEAD":
+            return httpx.Response(200, headers={"content-length": str(len(data))})
+        if method == "DELETE":
+            del self.objects[key]
+            return httpx.Response(204)
+        byte_range = request.headers.get("range")
+        if byte_range is None:
+            return httpx.Response(200, content=data)
+        self.calls.append("ranged_get")
+        first, last = re.fullmatch(r"bytes=(\d+)-(\d*)", byte_range).groups()
+        if int(first) >= len(data):
+            return httpx.Response(416)
+        return httpx.Response(206, content=data[int(first):int(last) + 1 if last else None])
+
+    def _multipart(self, method, key, query, request, copy_source) -> httpx.Response:
+        upload = self.uploads.get(query["uploadId"])
+        if upload is None:
+            return httpx.Response(404)
+        if method == "PUT":
+            if copy_source:
+                self.calls.append("upload_part_copy")
+                data = self._copy_source(copy_source, request.headers.get("x-amz-copy-source-range"))
+            else:
+                data = request.content
+            upload["parts"][int(query["partNumber"])] = (data, self._etag(data))
+            if copy_source:
+                return self._xml("CopyPartResult", f"<ETag>{self._etag(data)}</ETag>")
+            return httpx.Response(200, headers={"etag": self._etag(data)})
+        if method == "DELETE":
+            del self.uploads[query["uploadId"]]
+            return httpx.Response(204)
+        listed = [
+            (int(part.findtext("PartNumber")), part.findtext("ETag"))
+            for part in ET.fromstring(request.content).iter("Part")
+        ]
+        for index, (number, etag) in enumerate(listed):
+            data, stored_etag = upload["parts"].get(number, (b"", None))
+            if etag != stored_etag:
+                return self._xml("Error", "<Code>InvalidPart</Code>")
+            if index < len(listed) - 1 and len(data) < S3_MIN_PART_BYTES:
+                return self._xml("Error", "<Code>EntityTooSmall</Code>")
+        self.objects[key] = b"".join(upload["parts"][number][0] for number, _ in listed)
+        del self.uploads[query["uploadId"]]
+        return self._xml("CompleteMultipartUploadResult", f"<Key>{key}</Key>")
+
+    def _copy_source(self, copy_source: str, byte_range: str | None) -> bytes:
+        data = self.objects[unquote(copy_source)[len(f"/{self.bucket}/"):]]
+        if byte_range is None:
+            return data
+        first, last = map(int, re.fullmatch(r"bytes=(\d+)-(\d+)", byte_range).groups())
+        return data[first:last + 1]
+
+    def _list(self, prefix: str) -> httpx.Response:
+        contents = "".join(
+            f"<Contents><Key>{key}</Key><LastModified>2026-01-01T00:00:00.000Z</LastModified>"
+            f"<Size>{len(data)}</Size></Contents>"
+            for key, data in sorted(self.objects.items())
+            if key.startswith(prefix)
+        )
+        return self._xml("ListBucketResult", f"<IsTruncated>false</IsTruncated>{contents}")
+
+    @staticmethod
+    def _etag(data: bytes) -> str:
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    @staticmethod
+    def _xml(root: str, body: str) -> httpx.Response:
+        return httpx.Response(200, content=f"<{root}>{body}</{root}>".encode())
+
+
+@pytest.fixture
+async def s3():
+    fake = FakeS3()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handle))
+    backend = ObjectStorageBackend(
+        bucket=fake.bucket,
+        endpoint_url="http://s3.test",
+        region="us-east-1",
+        access_key="test",
+        secret_key="test",
+        prefix="pkgs",
+        part_size=S3_MIN_PART_BYTES,
+        client=client,
+    )
+    yield fake, backend
+    await client.aclose()
+
+
+async def _read(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+async def test_stream_upload_spans_parts_and_is_sealed_explicitly(s3, monkeypatch):
+    fake, backend = s3
+    # Force promotion through the multipart copy path without 5 GiB fixtures.
+    monkeypatch.setattr(object_storage_module, "S3_COPY_OBJECT_MAX_BYTES", MIB)
+    monkeypatch.setattr(object_storage_module, "S3_COPY_PART_BYTES", S3_MIN_PART_BYTES)
+    data = os.urandom(12 * MIB + 123)
+
+    await backend.init_upload("u1")
+    # Two requests, so the second one resumes from the tail the first one persisted.
+    for piece in (data[:3 * MIB], data[3 * MIB:]):
+        async with await backend.open_upload_writer("u1", buffer_size=MIB) as writer:
+            await writer.write(piece)
+    assert await backend.get_upload_size("u1") == len(data)
+
+    # Reading is not allowed to seal as a side effect; the upload keeps accepting appends.
+    with pytest.raises(RuntimeError, match="sealed"):
+        await _read(backend.stream_upload("u1"))
+    async with await backend.open_upload_writer("u1", buffer_size=MIB) as writer:
+        await writer.write(b"")
+
+    await backend.seal_upload("u1")
+    assert await _read(backend.stream_upload("u1", start=MIB, end=2 * MIB - 1)) == data[MIB:2 * MIB]
+    with pytest.raises(RuntimeError, match="no longer accepts"):
+        await backend.open_upload_writer("u1", buffer_size=MIB)
+
+    assert await backend.promote_upload("u1", "ab/blob") is True
+    assert "upload_part_copy" in fake.calls
+    assert not [key for key in fake.objects if key.startswith("pkgs/tmp/")]
+    assert await backend.get_object_size("ab/blob") == len(data)
+    assert await _read(backend.stream_object("ab/blob")) == data
+    assert await _read(backend.stream_object("ab/blob", start=len(data) - 10)) == data[-10:]
+    assert await _read(backend.stream_object("ab/blob", start=len(data) + 5)) == b""
+    assert "ranged_get" in fake.calls
+    assert [key async for key, _, _ in backend.list_objects("ab/")] == ["ab/blob"]
+
+    await backend.delete_object("ab/blob")
+    with pytest.raises(FileNotFoundError):
+        await backend.get_object_size("ab/blob")
+
+
+async def test_small_upload_is_one_put_and_copied_whole(s3):
+    fake, backend = s3
+    await backend.init_upload("u2")
+    await backend.append_upload_chunk("u2", b"tiny package")
+    await backend.seal_upload("u2")
+    await backend.seal_upload("u2")
+
+    assert await backend.promote_upload("u2", "cd/tiny") is True
+    assert "copy_object" in fake.calls and not fake.uploads
+    assert await _read(backend.stream_object("cd/tiny", start=5, end=7)) == b"pac"
+    await backend.seal_upload("u2")  # promoted uploads have nothing left to seal
+
+    await backend.init_upload("u2-dup")
+    await backend.append_upload_chunk("u2-dup", b"tiny package")
+    assert await backend.promote_upload("u2-dup", "cd/tiny") is False
+    assert not [key for key in fake.objects if key.startswith("pkgs/tmp/")]
+
+
+async def test_multipart_parts_arrive_out_of_order(s3):
+    fake, backend = s3
+    data = os.urandom(2 * S3_MIN_PART_BYTES + 1000)
+    parts = [data[i:i + S3_MIN_PART_BYTES] for i in range(0, len(data), S3_MIN_PART_BYTES)]
+
+    await backend.init_multipart_upload("u3", len(data))
+
+    async def _once(payload: bytes):
+        yield payload
+
+    etags = {}
+    for number in (3, 1, 2):
+        written, etags[number] = await backend.write_upload_part(
+            "u3", part_number=number, offset=(number - 1) * S3_MIN_PART_BYTES, chunk_stream=_once(parts[number - 1])
+        )
+        assert written == len(parts[number - 1])
+
+    await backend.complete_multipart_upload("u3", [(number, etags[number]) for number in (1, 2, 3)])
+    await backend.seal_upload("u3")
+    assert await backend.get_upload_size("u3") == len(data)
+    assert await _read(backend.stream_upload("u3", start=len(data) - 1000)) == data[-1000:]
+    assert await backend.promote_upload("u3", "ef/multi") is True
+    assert await _read(backend.stream_object("ef/multi")) == data
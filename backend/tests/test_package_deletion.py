@@ -0,0 +1,44 @@
+import os
+
+import pytest
+from sqlalchemy import update
+
+from app.database.db_setup import SessionLocal
+from app.models.file_blob import FileBlob
+from app.models.file_version import FileVersion
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_delete_keeps_blob_still_referenced_despite_drifted_refcount(make_service, publish, user_id):
+    data = os.urandom(4096)
+    first = await publish(data, package_name="first")
+    second = await publish(data, package_name="second")
+    with SessionLocal() as db:
+        first_version, second_version = db.get(FileVersion, first), db.get(FileVersion, second)
+        assert first_version.blob_id == second_version.blob_id
+        blob_id, package_id = first_version.blob_id, first_version.package_id
+        # Simulate drift: the counter forgot the second reference.
+        db.execute(update(FileBlob).where(FileBlob.id == blob_id).values(reference_count=1))
+        db.commit()
+
+    released = await make_service().delete_package_for_owner(package_id=package_id, user_id=user_id)
+
+    assert released == []
+    with SessionLocal() as db:
+        assert db.get(FileBlob, blob_id) is not None
+        assert db.get(FileVersion, second) is not None
+
+
+async def test_delete_releases_blob_once_unreferenced(make_service, publish, user_id):
+    version_id = await publish(os.urandom(4096), package_name="only")
+    with SessionLocal() as db:
+        version = db.get(FileVersion, version_id)
+        blob = db.get(FileBlob, version.blob_id)
+        package_id, blob_id, storage_key = version.package_id, blob.id, blob.storage_key
+
+    released = await make_service().delete_package_for_owner(package_id=package_id, user_id=user_id)
+
+    assert released == [storage_key]
+    with SessionLocal() as db:
+        assert db.get(FileBlob, blob_id) is None
@@ -0,0 +1,62 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.core.config import AppSettings, settings
+from app.infrastructure.signed_download import build_internal_download_url, verify_internal_download_url
+
+NJS_MODULE = Path(__file__).resolve().parents[2] / "infra" / "nginx" / "njs" / "download_signature.js"
+SECRET = "test-download-secret"
+
+# Runs the njs handler under node: the module only needs `crypto` and a request-like object.
+_NODE_RUNNER = """
+const source = require('fs').readFileSync(process.argv[1], 'utf8').replace(/export default/, 'module.exports =');
+const mod = { exports: {} };
+new Function('require', 'module', 'process', source)(require, mod, process);
+const request = JSON.parse(process.argv[2]);
+process.stdout.write(mod.exports.verify(request));
+"""
+
+
+@pytest.fixture(autouse=True)
+def download_secret(monkeypatch):
+    monkeypatch.setattr(settings, "PACKAGE_DOWNLOAD_URL_SECRET", SECRET)
+
+
+def _njs_verify(url: str, *, secret: str = SECRET) -> str:
+    parts = urlsplit(url)
+    request = {"uri": parts.path, "args": {key: values[0] for key, values in parse_qs(parts.query).items()}}
+    result = subprocess.run(
+        ["node", "-e", _NODE_RUNNER, str(NJS_MODULE), json.dumps(request)],
+        env={"PACKAGE_DOWNLOAD_URL_SECRET": secret},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout
+
+
+def test_python_verifier_accepts_fresh_url_and_rejects_tampering():
+    url = build_internal_download_url("blobs/ab/abcdef")
+    assert verify_internal_download_url(url)
+    assert not verify_internal_download_url(url.replace("abcdef", "abcdee"))
+    assert not verify_internal_download_url(url, now=10**12)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is needed to run the njs verifier")
+def test_njs_verifier_accepts_urls_signed_by_the_backend():
+    url = build_internal_download_url("blobs/ab/abcdef")
+    assert _njs_verify(url) == "1"
+    assert _njs_verify(url.replace("abcdef", "abcdee")) == "0"
+    assert _njs_verify(url[:-1]) == "0"  # truncated signature
+    assert _njs_verify(url, secret="another-secret") == "0"
+
+
+def test_accel_redirect_requires_a_dedicated_secret():
+    with pytest.raises(RuntimeError, match="PACKAGE_DOWNLOAD_URL_SECRET"):
+        AppSettings(PACKAGE_DOWNLOAD_ACCEL_REDIRECT=True, PACKAGE_DOWNLOAD_URL_SECRET="")
+    assert AppSettings(PACKAGE_DOWNLOAD_ACCEL_REDIRECT=False).PACKAGE_DOWNLOAD_URL_SECRET != settings.SECRET_KEY
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.infrastructure.storage.caching import STALE_FILL_SECONDS, CachingStorageBackend
+from app.infrastructure.storage.local_fs import LocalFileSystemStorage
+
+pytestmark = pytest.mark.anyio
+
+
+class _CountingStorage(LocalFileSystemStorage):
+    fetches = 0
+
+    async def stream_object(self, storage_key, *, start=0, end=None, chunk_size=1024 * 1024):
+        self.fetches += 1
+        async for chunk in super().stream_object(storage_key, start=start, end=end, chunk_size=64 * 1024):
+            await asyncio.sleep(0)
+            yield chunk
+
+
+async def _store(backend, upload_id: str, storage_key: str, data: bytes) -> None:
+    await backend.init_upload(upload_id)
+    await backend.append_upload_chunk(upload_id, data)
+    await backend.promote_upload(upload_id, storage_key)
+
+
+def test_temp_dirs_are_per_process_and_stale_ones_are_swept(tmp_path):
+    tmp = tmp_path / "cache" / "tmp"
+    live, dead = tmp / "111" / "fill-live", tmp / "222" / "fill-dead"
+    for path in (live, dead):
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"partial")
+    old = time.time() - STALE_FILL_SECONDS - 60
+    for path in (dead, dead.parent):
+        os.utime(path, (old, old))
+
+    cache = CachingStorageBackend(
+        LocalFileSystemStorage(tmp_path / "inner"), tmp_path / "cache", max_bytes=1000, max_object_bytes=1000
+    )
+
+    assert cache.temp_root == tmp / str(os.getpid())
+    assert live.exists()
+    assert not dead.parent.exists()
+
+
+def test_budget_is_split_between_workers(tmp_path):
+    cache = CachingStorageBackend(
+        LocalFileSystemStorage(tmp_path / "inner"), tmp_path / "cache", max_bytes=1000, max_object_bytes=900, workers=4
+    )
+    assert cache.max_bytes == 250
+    assert cache.max_object_bytes == 250
+
+
+async def test_concurrent_misses_share_one_fill(tmp_path):
+    inner = _CountingStorage(tmp_path / "inner")
+    cache = CachingStorageBackend(inner, tmp_path / "cache", max_bytes=10_000_000, max_object_bytes=10_000_000)
+    data = os.urandom(1_000_000)
+    await _store(cache, "u1", "k/blob", data)
+
+    async def _read(start: int, end: int | None) -> bytes:
+        return b"".join([chunk async for chunk in cache.stream_object("k/blob", start=start, end=end)])
+
+    results = await asyncio.gather(_read(0, None), _read(10, 99), _read(500_000, None))
+    assert results == [data, data[10:100], data[500_000:]]
+    assert inner.fetches == 1
+
+    for _ in range(100):
+        if await cache.get_local_path("k/blob") is not None:
+            break
+        await asyncio.sleep(0.01)
+    assert await cache.get_object_size("k/blob") == len(data)
+    assert not list(cache.temp_root.iterdir())
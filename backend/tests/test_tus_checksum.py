@@ -0,0 +1,63 @@
+import hashlib
+import os
+
+import anyio
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import app.infrastructure.checksum as checksum_module
+from app.api.v1.tus_uploads import HTTP_460_CHECKSUM_MISMATCH, _spool_and_verify
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+def _request(body: bytes, piece: int = 64 * 1024) -> Request:
+    messages = [
+        {"type": "http.request", "body": body[i:i + piece], "more_body": i + piece < len(body)}
+        for i in range(0, len(body), piece)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    return Request({"type": "http", "method": "PATCH", "headers": []}, receive)
+
+
+@pytest.fixture
+def offloads(monkeypatch):
+    """Count hash updates sent to the bounded hash thread pool."""
+    calls = []
+    limiter = anyio.CapacityLimiter(1)
+
+    def _limiter():
+        calls.append(1)
+        return limiter
+
+    monkeypatch.setattr(checksum_module, "_get_hash_limiter", _limiter)
+    monkeypatch.setattr(settings, "PACKAGE_UPLOAD_CHUNK_SIZE_BYTES", 256 * 1024)
+    monkeypatch.setattr(settings, "PACKAGE_HASH_OFFLOAD_MIN_BYTES", 256 * 1024)
+    return calls
+
+
+async def test_spool_hashes_whole_blocks_off_the_event_loop(offloads):
+    body = os.urandom(1024 * 1024 + 100)
+    spool = await _spool_and_verify(
+        _request(body), algorithm="sha256", digest=hashlib.sha256(body).digest(), limit=len(body)
+    )
+    try:
+        assert spool.read() == body
+    finally:
+        spool.close()
+    # Four full 256 KiB blocks leave the loop; the 100-byte remainder is hashed inline.
+    assert len(offloads) == 4
+
+
+async def test_spool_rejects_a_corrupted_chunk(offloads):
+    body = os.urandom(300 * 1024)
+    with pytest.raises(HTTPException) as excinfo:
+        await _spool_and_verify(
+            _request(body), algorithm="md5", digest=hashlib.md5(body[:-1]).digest(), limit=len(body)
+        )
+    assert excinfo.value.status_code == HTTP_460_CHECKSUM_MISMATCH
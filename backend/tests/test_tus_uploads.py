@@ -0,0 +1,73 @@
+import base64
+import hashlib
+import os
+
+import httpx
+import pytest
+from starlette.requests import ClientDisconnect
+
+import app.api.v1.software_packages as software_packages_api
+from app.core.security import get_current_user
+from app.database.db_setup import SessionLocal
+from app.infrastructure.upload_progress import upload_progress
+from app.main import app
+from app.models.file_version import FileVersion
+from app.models.upload_session import UploadSession
+
+pytestmark = pytest.mark.anyio
+
+TUS = {"Tus-Resumable": "1.0.0"}
+PATCH_HEADERS = {**TUS, "Content-Type": "application/offset+octet-stream"}
+
+
+@pytest.fixture
+async def client(make_service, user_id):
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": user_id, "role": "user"}
+    app.dependency_overrides[software_packages_api.get_service] = make_service
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as http:
+        yield http
+    app.dependency_overrides.clear()
+
+
+async def _create(client, length: int, package_name: str) -> str:
+    metadata = {
+        "filename": "tool.zip",
+        "package_name": package_name,
+        "description": "A test package",
+        "category": "student projects",
+        "language": "python",
+        "version": "v1.0.0",
+    }
+    encoded = ",".join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in metadata.items())
+    response = await client.post(
+        "/api/v1/software-packages/tus",
+        headers={**TUS, "Upload-Length": str(length), "Upload-Metadata": encoded},
+    )
+    assert response.status_code == 201
+    return httpx.URL(response.headers["Location"]).path
+
+
+async def test_dropped_patch_keeps_the_session_resumable(client):
+    data = os.urandom(300_000)
+    url = await _create(client, len(data), "dropped-patch")
+
+    async def _dropped_body():
+        yield data[:200_000]
+        raise ClientDisconnect()
+
+    with pytest.raises(ClientDisconnect):
+        await client.patch(url, content=_dropped_body(), headers={**PATCH_HEADERS, "Upload-Offset": "0"})
+
+    # The progress record survives the failure, so completion does not depend on a row flush.
+    assert (await upload_progress.get(url.rsplit("/", 1)[1])).offset == 200_000
+    head = await client.head(url, headers=TUS)
+    assert head.status_code == 200
+    offset = int(head.headers["Upload-Offset"])
+    assert offset == 200_000
+
+    response = await client.patch(url, content=data[offset:], headers={**PATCH_HEADERS, "Upload-Offset": str(offset)})
+    assert response.status_code == 204
+    with SessionLocal() as db:
+        version = db.get(FileVersion, int(response.headers["X-File-Version-Id"]))
+        assert version.checksum_sha256 == hashlib.sha256(data).hexdigest()
+        assert db.get(UploadSession, url.rsplit("/", 1)[1]).status == "COMPLETED"
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import sys
+
+import pytest
+
+import app.infrastructure.checksum as checksum_module
+from app.core.config import settings
+from app.database.db_setup import SessionLocal
+from app.infrastructure.checksum import StreamingSHA256
+from app.infrastructure.upload_checkpoint import upload_checkpoints
+from app.models.file_version import FileVersion
+from app.models.upload_session import UploadSession
+from tests.conftest import PACKAGE_FIELDS, chunks
+
+pytestmark = pytest.mark.anyio
+
+
+def _require_resumable_hash() -> None:
+    if StreamingSHA256().export_state() is None:
+        pytest.skip("OpenSSL SHA256_CTX is not available on this platform")
+
+
+def test_hash_state_round_trip():
+    _require_resumable_hash()
+    data = os.urandom(300_001)
+    hasher = StreamingSHA256()
+    hasher.update(data[:100_003])
+
+    restored = StreamingSHA256.restore(hasher.export_state(), hasher.size_bytes)
+    restored.update(data[100_003:])
+
+    assert restored.size_bytes == len(data)
+    assert restored.hexdigest() == hashlib.sha256(data).hexdigest()
+    assert StreamingSHA256.restore(b"garbage", 10) is None
+
+
+def test_hash_state_from_another_build_is_not_restored(monkeypatch):
+    _require_resumable_hash()
+    hasher = StreamingSHA256()
+    hasher.update(b"x" * 1000)
+    state = hasher.export_state()
+    assert sys.byteorder.encode() in state
+
+    # Same layout bytes, but exported by a different OpenSSL build or on a machine of other endianness.
+    monkeypatch.setattr(checksum_module, "_state_tag", b"ossl-sha256-v1:OpenSSL 9.9.9:middle:")
+    assert StreamingSHA256.restore(state, 1000) is None
+
+
+@pytest.mark.parametrize("wrap", [bytes, bytearray, memoryview, lambda data: memoryview(bytearray(data))])
+def test_update_accepts_any_buffer(wrap):
+    data = os.urandom(70_001)
+    hasher = StreamingSHA256()
+    hasher.update(wrap(data[:1234]))
+    hasher.update(wrap(data[1234:]))
+    assert hasher.hexdigest() == hashlib.sha256(data).hexdigest()
+
+
+async def test_complete_resumes_from_persisted_hash_state(make_service, storage, user_id, monkeypatch):
+    _require_resumable_hash()
+    monkeypatch.setattr(settings, "PACKAGE_UPLOAD_PROGRESS_FLUSH_BYTES", 100)
+    head, tail = os.urandom(150_000), os.urandom(70_000)
+    init = await make_service().init_upload_session(
+        user_id=user_id, **{**PACKAGE_FIELDS, "package_name": "resume-hash"}
+    )
+    await make_service().start_upload(init)
+    await make_service().append_upload_stream(
+        upload_id=init.upload_id, user_id=user_id, expected_offset=0, chunk_stream=chunks(head)
+    )
+    with SessionLocal() as db:
+        assert db.get(UploadSession, init.upload_id).hash_state_offset == len(head)
+
+    # Simulate the next request landing on another worker: no live checkpoint survives.
+    upload_checkpoints.discard(init.upload_id)
+    await make_service().append_upload_stream(
+        upload_id=init.upload_id, user_id=user_id, expected_offset=len(head), chunk_stream=chunks(tail)
+    )
+
+    starts = []
+    stream_upload = storage.stream_upload
+
+    def _recording_stream_upload(upload_id, *, start=0, **kwargs):
+        starts.append(start)
+        return stream_upload(upload_id, start=start, **kwargs)
+
+    monkeypatch.setattr(storage, "stream_upload", _recording_stream_upload)
+    version_id = await make_service().complete_upload(upload_id=init.upload_id, user_id=user_id)
+
+    assert len(head) in starts
+    with SessionLocal() as db:
+        assert db.get(FileVersion, version_id).checksum_sha256 == hashlib.sha256(head + tail).hexdigest()
+        session = db.get(UploadSession, init.upload_id)
+        assert session.hash_state is None and session.hash_state_offset is None
@@ -0,0 +1,204 @@
+import os
+
+import anyio
+import pytest
+
+import app.infrastructure.upload_progress as upload_progress_module
+from app.core.config import settings
+from app.database.db_setup import SessionLocal
+from app.exceptions.exceptions import ConflictError, ExternalServiceError
+from app.infrastructure.upload_progress import UploadProgressState, UploadProgressStore, upload_progress
+from app.models.file_version import FileVersion
+from app.models.upload_session import UploadSession
+from tests.conftest import PACKAGE_FIELDS, chunks
+
+pytestmark = pytest.mark.anyio
+
+SEED = UploadProgressState(
+    user_id=1,
+    offset=0,
+    status="PENDING",
+    max_size_bytes=1000,
+    file_name="pkg.zip",
+    content_type=None,
+    updated_at=0.0,
+)
+
+
+class _FakeRedisFactory:
+    @staticmethod
+    def from_url(url, **kwargs):
+        import fakeredis
+
+        return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+@pytest.fixture(params=["stand-in", "redis"])
+def store(request, monkeypatch):
+    monkeypatch.setattr(settings, "PACKAGE_UPLOAD_PROGRESS_FLUSH_BYTES", 100)
+    monkeypatch.setattr(settings, "PACKAGE_UPLOAD_PROGRESS_FLUSH_SECONDS", 3600)
+    if request.param == "redis":
+        pytest.importorskip("lupa", reason="fakeredis needs lupa to run Lua scripts")
+        monkeypatch.setattr(upload_progress_module, "Redis", _FakeRedisFactory)
+    else:
+        monkeypatch.setattr(upload_progress_module, "Redis", None)
+    return UploadProgressStore()
+
+
+async def test_claim_checks_owner_offset_and_lease(store):
+    await store.seed("u1", SEED)
+
+    assert (await store.claim("u1", user_id=2, expected_offset=0, token="a")).outcome == "missing"
+    mismatch = await store.claim("u1", user_id=1, expected_offset=7, token="a")
+    assert (mismatch.outcome, mismatch.offset) == ("offset", 0)
+
+    assert (await store.claim("u1", user_id=1, expected_offset=0, token="a")).outcome == "ok"
+    assert (await store.get("u1")).busy
+    assert (await store.claim("u1", user_id=1, expected_offset=0, token="b")).outcome == "busy"
+    assert await store.renew("u1", "a")
+    assert not await store.renew("u1", "b")
+
+
+async def test_advance_releases_lease_and_reports_flush_due(store):
+    await store.seed("u1", SEED)
+    await store.claim("u1", user_id=1, expected_offset=0, token="a")
+
+    assert not await store.advance("u1", "a", 60)
+    state = await store.get("u1")
+    assert (state.offset, state.status, state.busy) == (60, "UPLOADING", False)
+
+    await store.claim("u1", user_id=1, expected_offset=60, token="b")
+    assert await store.advance("u1", "b", 120)
+    await store.mark_flushed("u1", 120)
+    await store.claim("u1", user_id=1, expected_offset=120, token="c")
+    assert not await store.advance("u1", "c", 150)
+
+    # A stale token (lease lost to someone else) must not move the offset.
+    assert not await store.advance("u1", "a", 999)
+    assert (await store.get("u1")).offset == 150
+
+
+async def test_release_frees_the_lease_and_records_the_offset(store):
+    await store.seed("u1", SEED)
+    await store.claim("u1", user_id=1, expected_offset=0, token="a")
+
+    await store.release("u1", "a", 40)
+    state = await store.get("u1")
+    assert (state.offset, state.status, state.busy) == (40, "UPLOADING", False)
+    assert (await store.claim("u1", user_id=1, expected_offset=40, token="b")).outcome == "ok"
+    await store.release("u1", "a", 999)
+    assert (await store.get("u1")).busy
+
+
+async def test_claim_heals_offset_from_storage(store):
+    await store.seed("u1", SEED)
+    healed = await store.claim("u1", user_id=1, expected_offset=40, token="a", actual_offset=40)
+    assert (healed.outcome, healed.offset) == ("ok", 40)
+
+
+async def test_seed_keeps_live_state_and_discard_forgets_it(store):
+    await store.seed("u1", SEED)
+    await store.claim("u1", user_id=1, expected_offset=0, token="a")
+    await store.advance("u1", "a", 10)
+    assert (await store.seed("u1", SEED)).offset == 10
+
+    await store.discard("u1")
+    assert await store.get("u1") is None
+    await store.mark_flushed("u1", 10)
+    assert await store.get("u1") is None
+
+
+async def test_multiple_workers_fail_closed_without_redis(monkeypatch):
+    monkeypatch.setattr(upload_progress_module, "Redis", None)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 2)
+    with pytest.raises(ExternalServiceError):
+        await UploadProgressStore().get("u1")
+
+
+async def test_small_upload_completes_when_hot_state_is_not_visible(make_service, user_id):
+    data = os.urandom(1000)
+    init = await make_service().init_upload_session(user_id=user_id, **PACKAGE_FIELDS)
+    await make_service().start_upload(init)
+    await make_service().append_upload_stream(
+        upload_id=init.upload_id, user_id=user_id, expected_offset=0, chunk_stream=chunks(data)
+    )
+    with SessionLocal() as db:
+        assert db.get(UploadSession, init.upload_id).bytes_received == 0  # below the first milestone
+    # As seen from another worker whose in-process state never heard of this upload.
+    await upload_progress.discard(init.upload_id)
+
+    version_id = await make_service().complete_upload(upload_id=init.upload_id, user_id=user_id)
+
+    with SessionLocal() as db:
+        assert db.get(FileVersion, version_id).size_bytes == len(data)
+        assert db.get(UploadSession, init.upload_id).bytes_received == len(data)
+
+
+async def test_stalled_writer_keeps_its_lease(make_service, storage, user_id, monkeypatch):
+    monkeypatch.setattr(settings, "PACKAGE_UPLOAD_WRITER_LEASE_SECONDS", 1)
+    init = await make_service().init_upload_session(
+        user_id=user_id, **{**PACKAGE_FIELDS, "package_name": "stalled-writer"}
+    )
+    await make_service().start_upload(init)
+    stalled, resume = anyio.Event(), anyio.Event()
+
+    async def _stalling_body():
+        yield b"a" * 1000
+        stalled.set()
+        await resume.wait()
+        yield b"b" * 1000
+
+    async def _first_writer():
+        await make_service().append_upload_stream(
+            upload_id=init.upload_id, user_id=user_id, expected_offset=0, chunk_stream=_stalling_body()
+        )
+
+    async with anyio.create_task_group() as task_group:
+        task_group.start_soon(_first_writer)
+        await stalled.wait()
+        try:
+            await anyio.sleep(1.5)  # well past the lease a per-chunk renewal would have let lapse
+            with pytest.raises(ConflictError, match="busy"), anyio.fail_after(5):
+                await make_service().append_upload_stream(
+                    upload_id=init.upload_id, user_id=user_id, expected_offset=0, chunk_stream=chunks(b"c" * 1000)
+                )
+        finally:
+            resume.set()
+
+    assert await storage.get_upload_size(init.upload_id) == 2000
+    assert (await upload_progress.get(init.upload_id)).offset == 2000
+
+
+async def test_append_checks_the_claimed_offset_against_storage(make_service, storage, user_id):
+    init = await make_service().init_upload_session(
+        user_id=user_id, **{**PACKAGE_FIELDS, "package_name": "offset-ahead"}
+    )
+    await make_service().start_upload(init)
+    await make_service().append_upload_stream(
+        upload_id=init.upload_id, user_id=user_id, expected_offset=0, chunk_stream=chunks(b"a" * 100)
+    )
+    # The tracked offset runs ahead of the bytes that really reached storage.
+    await upload_progress.claim(init.upload_id, user_id=user_id, expected_offset=100, token="lost")
+    await upload_progress.release(init.upload_id, "lost", 500)
+
+    with pytest.raises(ConflictError, match="expected=100"):
+        await make_service().append_upload_stream(
+            upload_id=init.upload_id, user_id=user_id, expected_offset=500, chunk_stream=chunks(b"b" * 100)
+        )
+    state = await upload_progress.get(init.upload_id)
+    assert (state.offset, state.busy) == (100, False)
+    assert await storage.get_upload_size(init.upload_id) == 100
+
+
+async def test_state_is_handed_over_when_redis_comes_back(monkeypatch):
+    pytest.importorskip("lupa", reason="fakeredis needs lupa to run Lua scripts")
+    monkeypatch.setattr(upload_progress_module, "Redis", None)
+    store = UploadProgressStore()
+    await store.seed("u1", SEED)
+    await store.claim("u1", user_id=1, expected_offset=0, token="a")
+
+    monkeypatch.setattr(upload_progress_module, "Redis", _FakeRedisFactory)
+    assert (await store.claim("u1", user_id=1, expected_offset=0, token="b")).outcome == "busy"
+    await store.advance("u1", "a", 25)
+    assert (await store.get("u1")).offset == 25
+    assert store._local == {}
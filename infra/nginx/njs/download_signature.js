@@ -0,0 +1,28 @@
+// Verifies the HMAC that the backend attaches to X-Accel-Redirect download URLs
+// (app/infrastructure/signed_download.py): hex(HMAC-SHA256(secret, "<expires>:<path>")).
+const crypto = require('crypto');
+
+// Constant-time string comparison, so response timing does not reveal how much of a guess matched.
+function timingSafeEqual(a, b) {
+    if (a.length !== b.length) {
+        return false;
+    }
+    let diff = 0;
+    for (let i = 0; i < a.length; i++) {
+        diff |= a.charCodeAt(i) ^ b.charCodeAt(i);
+    }
+    return diff === 0;
+}
+
+function verify(r) {
+    const secret = process.env.PACKAGE_DOWNLOAD_URL_SECRET;
+    const expires = parseInt(r.args.expires, 10);
+    const signature = r.args.signature || '';
+    if (!secret || !expires || expires < Math.floor(Date.now() / 1000)) {
+        return '0';
+    }
+    const expected = crypto.createHmac('sha256', secret).update(expires + ':' + r.uri).digest('hex');
+    return timingSafeEqual(expected, signature) ? '1' : '0';
+}
+
+export default { verify };